@@ -0,0 +1,306 @@
+"""
+Benchmark des chemins d'interaction, sans réseau.
+
+Un faux transport remplace discord.Interaction / commands.Context : les appels
+à l'API répondent après une latence simulée (graine fixe), ce qui permet de
+faire tourner LanguageSelect, BookBrowser et QuizView pour des milliers
+d'utilisateurs et de salons concurrents et de comparer les résultats d'un
+commit à l'autre.
+
+    python bench.py --users 5000 --channels 500 --output bench.json
+"""
+import os
+import sys
+import gc
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+from statistics import mean
+from typing import Any, Dict, List, Optional
+
+# --- Faux Transport Discord ---
+
+class FakeUser:
+    __slots__ = ("id", "mention")
+
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.mention = f"<@{user_id}>"
+
+    def __eq__(self, other):
+        return getattr(other, "id", None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FakeChannel:
+    __slots__ = ("id",)
+
+    def __init__(self, channel_id: int):
+        self.id = channel_id
+
+
+class FakeGuild:
+    __slots__ = ("id", "shard_id")
+
+    def __init__(self, guild_id: int):
+        self.id = guild_id
+        self.shard_id = 0
+
+
+class FakeTransport:
+    """Latence simulée des appels REST, reproductible grâce à la graine."""
+
+    def __init__(self, latency_ms: float, jitter_ms: float, seed: int):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    async def round_trip(self):
+        self.calls += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self.rng.random() * self.jitter)
+
+
+class FakeMessage:
+    def __init__(self, transport: FakeTransport, **payload):
+        self.transport = transport
+        self.payload = payload
+
+    async def edit(self, **payload):
+        await self.transport.round_trip()
+        self.payload.update(payload)
+        return self
+
+
+class FakeResponse:
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _respond(self, **payload):
+        if self._done:
+            raise RuntimeError("interaction déjà acquittée")
+        self._done = True
+        await self.interaction.transport.round_trip()
+        self.interaction.payload = payload
+
+    async def edit_message(self, **payload):
+        await self._respond(**payload)
+
+    async def send_message(self, content: Optional[str] = None, **payload):
+        await self._respond(content=content, **payload)
+
+    async def defer(self, **payload):
+        await self._respond(**payload)
+
+
+class FakeInteraction:
+    _next_id = 1
+
+    def __init__(self, transport: FakeTransport, user: FakeUser, channel: FakeChannel, guild: FakeGuild):
+        self.transport = transport
+        self.user = user
+        self.channel = channel
+        self.channel_id = channel.id
+        self.guild = guild
+        self.guild_id = guild.id
+        self.id = FakeInteraction._next_id
+        FakeInteraction._next_id += 1
+        self.response = FakeResponse(self)
+        self.payload: Dict[str, Any] = {}
+
+
+class FakeContext:
+    def __init__(self, transport: FakeTransport, user: FakeUser, channel: FakeChannel, guild: FakeGuild):
+        self.transport = transport
+        self.author = user
+        self.channel = channel
+        self.guild = guild
+        self.message = None
+        self.interaction = None
+        self.last_message: Optional[FakeMessage] = None
+
+    async def send(self, content: Optional[str] = None, **payload):
+        await self.transport.round_trip()
+        self.last_message = FakeMessage(self.transport, content=content, **payload)
+        return self.last_message
+
+# --- Scénarios ---
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    def add(self, name: str, seconds: float):
+        self.samples.setdefault(name, []).append(seconds)
+
+    async def measure(self, name: str, awaitable):
+        started = time.perf_counter()
+        result = await awaitable
+        self.add(name, time.perf_counter() - started)
+        return result
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "mean_ms": round(mean(values) * 1000, 4) if values else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 4),
+        "max_ms": round(values[-1] * 1000, 4) if values else 0.0,
+    }
+
+async def click(maintest, view, index: int, interaction: FakeInteraction):
+    """Clique sur le bouton index d'une vue, classique ou persistante."""
+    item = view.children[index]
+    if isinstance(item, discord.ui.DynamicItem):
+        match = item.__discord_ui_compiled_template__.fullmatch(item.custom_id)
+        item = await type(item).from_custom_id(interaction, item.item, match)
+    await item.callback(interaction)
+    return interaction.payload
+
+async def run_session(maintest, transport: FakeTransport, recorder: Recorder, rng: random.Random,
+                      user: FakeUser, channel: FakeChannel, guild: FakeGuild, command: str):
+    ctx = FakeContext(transport, user, channel, guild)
+    lang_index = rng.randrange(2)
+
+    started = time.perf_counter()
+    await recorder.measure("send_language_select", maintest.send_language_select(ctx, command))
+    view = ctx.last_message.payload["view"]
+
+    interaction = FakeInteraction(transport, user, channel, guild)
+    payload = await recorder.measure(f"{command}:language", click(maintest, view, lang_index, interaction))
+
+    if command == "book":
+        for _ in range(rng.randrange(1, 4)):
+            view = payload.get("view")
+            if not view:
+                break
+            interaction = FakeInteraction(transport, user, channel, guild)
+            payload = await recorder.measure("book:page", click(maintest, view, 1, interaction))
+    elif command == "quiz":
+        while payload.get("view") is not None and payload["view"].children:
+            interaction = FakeInteraction(transport, user, channel, guild)
+            view = payload["view"]
+            payload = await recorder.measure("quiz:answer", click(maintest, view, rng.randrange(len(view.children)), interaction))
+
+    recorder.add(f"{command}:session", time.perf_counter() - started)
+    if not maintest.PERSISTENT_VIEWS and isinstance(view, discord.ui.View):
+        view.stop()
+
+async def run_load(maintest, args) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    transport = FakeTransport(args.api_latency_ms, args.api_jitter_ms, args.seed)
+    recorder = Recorder()
+    guilds = [FakeGuild(10_000 + g) for g in range(max(1, args.channels // 10))]
+    channels = [FakeChannel(20_000 + c) for c in range(args.channels)]
+    users = [FakeUser(100_000_000_000_000_000 + u) for u in range(args.users)]
+    commands_mix = ["hadith"] * 5 + ["book"] * 2 + ["quiz"] * 2 + ["commands"]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(user: FakeUser):
+        channel = channels[rng.randrange(len(channels))]
+        guild = guilds[channel.id % len(guilds)]
+        async with semaphore:
+            await run_session(maintest, transport, recorder, rng, user, channel, guild, rng.choice(commands_mix))
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        await asyncio.gather(*(one(user) for user in users))
+    elapsed = time.perf_counter() - started
+
+    interactions = sum(len(v) for k, v in recorder.samples.items() if not k.endswith(":session"))
+    return {
+        "elapsed_s": round(elapsed, 4),
+        "sessions": args.users * args.rounds,
+        "interactions": interactions,
+        "interactions_per_s": round(interactions / elapsed, 1) if elapsed else 0.0,
+        "api_calls": transport.calls,
+        "latency": {name: summarize(values) for name, values in sorted(recorder.samples.items())},
+    }
+
+def run_micro(maintest, corpus, iterations: int) -> Dict[str, Any]:
+    """Micro-benchmarks des étapes pures : parsing, rendu, construction des vues."""
+    results = {}
+
+    def bench(name: str, func, n: int = iterations):
+        started = time.perf_counter()
+        for _ in range(n):
+            func()
+        results[name] = {"iterations": n, "us_per_op": round((time.perf_counter() - started) / n * 1e6, 3)}
+
+    store = corpus.CorpusStore()
+    bench("corpus.build_snapshot", store.build_snapshot, max(1, iterations // 100))
+    books = corpus.store.get("FR").books
+    bench("build_book_pages", lambda: maintest.build_book_pages(books, "FR"))
+    bench("get_book_pages (cache)", lambda: maintest.get_book_pages("FR"))
+    bench("get_hadith_embeds", lambda: maintest.get_hadith_embeds("FR", 1))
+    bench("get_commands_embed (cache)", lambda: maintest.get_commands_embed("ENG"))
+    return results
+
+# --- Point d'entrée ---
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark HadithSahih sans réseau")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--channels", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--api-latency-ms", type=float, default=0.0)
+    parser.add_argument("--api-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--micro-iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--persistent", action="store_true", help="vues persistantes (HS_PERSISTENT_VIEWS=1)")
+    parser.add_argument("--output", help="fichier JSON (sinon sortie standard)")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    if args.persistent:
+        os.environ["HS_PERSISTENT_VIEWS"] = "1"
+    # Pas de rechargement ni de serveur web pendant le benchmark
+    os.environ.setdefault("HS_CORPUS_RELOAD_INTERVAL", "0")
+    os.environ.setdefault("HS_DB_PATH", ":memory:")
+    logging.disable(logging.WARNING)
+
+    global discord
+    import discord
+    import corpus
+    import maintest
+
+    random.seed(args.seed)
+    corpus.store.load()
+    gc.collect()
+
+    report = {
+        "config": vars(args),
+        "python": platform.python_version(),
+        "discord_py": discord.__version__,
+        "micro": run_micro(maintest, corpus, args.micro_iterations),
+        "load": asyncio.run(run_load(maintest, args)),
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    sys.exit(main())
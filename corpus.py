@@ -0,0 +1,431 @@
+"""
+Corpus du bot (hadiths, livres, quiz) chargé une seule fois en mémoire.
+
+Les fichiers texte restent la source éditable ; ils sont lus et validés au
+démarrage puis exposés sous forme de structures immuables (tuples de
+NamedTuple). Le chemin d'interaction Discord ne fait donc aucune lecture disque.
+"""
+import os
+import re
+import sys
+import time
+import asyncio
+import ctypes
+import logging
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import metrics
+
+logger = logging.getLogger('HadithSahih.corpus')
+
+# --- Configuration ---
+
+DATA_DIR = os.environ.get('HS_DATA_DIR', '.')
+MIN_QUIZ_QUESTIONS = 3
+SOURCE_KINDS = ("hadiths", "book", "quiz")
+# Ordre d'affichage des langues découvertes ; les autres suivent par ordre alphabétique
+LANGUAGE_ORDER = tuple(code.strip().upper() for code in os.environ.get('HS_LANGUAGES', 'FR,ENG').split(",") if code.strip())
+COMPILED_PATH = os.environ.get('HS_CORPUS_BIN', os.path.join(DATA_DIR, 'corpus.bin'))
+# Intervalle de scrutation des fichiers (secondes), 0 pour désactiver le rechargement
+RELOAD_INTERVAL = float(os.environ.get('HS_CORPUS_RELOAD_INTERVAL', 5))
+# Premier chargement en échec : nouvel essai après 1, 2, 4... secondes, au plus LOAD_RETRY_MAX
+LOAD_RETRY_MAX = float(os.environ.get('HS_CORPUS_RETRY_MAX', 60))
+
+# --- Métriques ---
+
+RELOAD_SECONDS = metrics.gauge('hs_corpus_parse_seconds', "Durée du dernier parsing complet du corpus")
+RELOADS = metrics.counter('hs_corpus_reloads_total', "Rechargements du corpus", ("result",))
+RECORDS = metrics.gauge('hs_corpus_records', "Nombre d'entrées chargées", ("lang", "kind"))
+VERSION = metrics.gauge('hs_corpus_version', "Version du snapshot courant")
+
+# --- Structures Immuables ---
+
+class Book(NamedTuple):
+    title: str
+    link: str
+
+class QuizQuestion(NamedTuple):
+    question: str
+    correct: str
+    wrong1: str
+    wrong2: str
+
+class LanguageCorpus(NamedTuple):
+    # Tuples depuis les .txt, séquences paresseuses depuis le corpus compilé
+    hadiths: Sequence[str]
+    books: Sequence[Book]
+    questions: Sequence[QuizQuestion]
+    # Tables des index dérivés précalculées par corpusbin.py (vide depuis les .txt)
+    tables: Mapping[str, Sequence] = MappingProxyType({})
+
+EMPTY_LANGUAGE = LanguageCorpus((), (), ())
+
+class CorpusSnapshot(NamedTuple):
+    version: int
+    languages: Mapping[str, LanguageCorpus]
+    # Index dérivés, construits avec le snapshot : (nom, langue) -> index
+    indexes: Mapping[Tuple[str, str], Any] = MappingProxyType({})
+
+    def get(self, lang: str) -> LanguageCorpus:
+        return self.languages.get(lang, EMPTY_LANGUAGE)
+
+    def index(self, name: str, lang: str) -> Any:
+        return self.indexes.get((name, lang))
+
+def data_file(kind: str, lang: str, data_dir: str = DATA_DIR) -> str:
+    """Chemin du fichier source, ex. data_file("hadiths", "FR") -> ./hadiths_fr.txt"""
+    return os.path.join(data_dir, f"{kind}_{lang.lower()}.txt")
+
+_SOURCE_NAME = re.compile(rf"^(?:{'|'.join(SOURCE_KINDS)})_([a-z]+)\.txt$")
+
+def discover_languages(data_dir: str = DATA_DIR, order: Tuple[str, ...] = LANGUAGE_ORDER) -> Tuple[str, ...]:
+    """Langues ayant au moins un fichier source (hadiths_ar.txt -> "AR"), dans l'ordre d'affichage."""
+    try:
+        names = os.listdir(data_dir)
+    except OSError as e:
+        logger.error(f"Dossier du corpus illisible {data_dir}: {e}")
+        names = []
+    found = {match.group(1).upper() for match in map(_SOURCE_NAME.match, names) if match}
+    rank = {code: i for i, code in enumerate(order)}
+    return tuple(sorted(found, key=lambda code: (rank.get(code, len(rank)), code)))
+
+# --- Parseurs des Fichiers Texte ---
+
+def get_hadiths(file_path: str) -> List[str] | None:
+    """Lit le fichier des hadiths (un hadith par ligne non vide)."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return [h.strip() for h in f if h.strip()]
+    except FileNotFoundError:
+        logger.error(f"Fichier non trouvé: {file_path}")
+        return None
+    except Exception as e:
+        logger.error(f"Erreur lecture {file_path}: {e}")
+        return None
+
+def bracket_parts(line: str) -> List[str]:
+    """Contenu de chaque paire de crochets, dans l'ordre : "[a] [b]" -> ["a", "b"]."""
+    parts = []
+    current_pos = 0
+    while True:
+        start = line.find('[', current_pos)
+        if start == -1:
+            break
+        end = line.find(']', start + 1)
+        if end == -1:
+            break
+        parts.append(line[start + 1:end].strip())
+        current_pos = end + 1
+    return parts
+
+def parse_book_line(line: str) -> Book:
+    """[LIEN] [TITRE] -> Book ; ValueError (avec la raison) si la ligne est invalide."""
+    if not line.startswith('[') or ']' not in line:
+        raise ValueError("format [lien] [titre] attendu")
+    # Trouver le lien (premier crochet)
+    link_end = line.find(']')
+    link = line[1:link_end].strip()
+    if not link:
+        raise ValueError("lien vide")
+
+    # Trouver le titre (deuxième crochet)
+    title_start = line.find('[', link_end + 1)
+    title_end = line.find(']', title_start + 1)
+    if title_start == -1 or title_end == -1:
+        raise ValueError("titre manquant")
+    title = line[title_start + 1:title_end].strip()
+    if not title:
+        raise ValueError("titre vide")
+    return Book(title, link)
+
+def parse_quiz_line(line: str) -> QuizQuestion:
+    """[Question] [Bonne réponse] [Mauvaise 1] [Mauvaise 2] -> QuizQuestion ; ValueError sinon."""
+    if not line.startswith('['):
+        raise ValueError("format [question] [bonne réponse] [mauvaise 1] [mauvaise 2] attendu")
+    parts = bracket_parts(line)
+    # Vérifier qu'on a bien 4 parties (question + 3 réponses)
+    if len(parts) != 4:
+        raise ValueError(f"{len(parts)} partie(s) entre crochets, 4 attendues")
+    return QuizQuestion(*parts)
+
+def parse_lines(file_path: str, parse: Callable[[str], Any]) -> List[Any]:
+    """Applique parse à chaque ligne non vide ; les lignes invalides sont signalées et ignorées."""
+    records = []
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(parse(line))
+            except ValueError as e:
+                logger.warning(f"Ligne ignorée {file_path}:{line_no} : {e}.")
+    return records
+
+def get_books(file_path: str) -> List[Book] | None:
+    """
+    Lit le fichier des livres.
+    Format attendu : [LIEN] [TITRE]
+    """
+    try:
+        return parse_lines(file_path, parse_book_line)
+    except FileNotFoundError:
+        logger.error(f"Fichier non trouvé: {file_path}")
+        return None
+    except Exception as e:
+        logger.error(f"Erreur lecture {file_path}: {e}")
+        return None
+
+def get_quiz_questions(file_path: str) -> List[QuizQuestion] | None:
+    """
+    Lit le fichier de quiz et retourne une liste de questions.
+    Format attendu : [Question] [Bonne réponse] [Mauvaise 1] [Mauvaise 2]
+    """
+    try:
+        return parse_lines(file_path, parse_quiz_line) or None
+    except FileNotFoundError:
+        logger.error(f"Fichier non trouvé: {file_path}")
+        return None
+    except Exception as e:
+        logger.error(f"Erreur lecture quiz {file_path}: {e}")
+        return None
+
+LANGUAGES = discover_languages() or LANGUAGE_ORDER
+
+# --- Chargement et Validation ---
+
+def validate_language(lang: str, data: LanguageCorpus) -> LanguageCorpus:
+    """Signale les langues incomplètes (hs!quiz exige MIN_QUIZ_QUESTIONS questions)."""
+    if not data.hadiths:
+        logger.warning(f"[{lang}] Aucun hadith chargé.")
+    if not data.books:
+        logger.warning(f"[{lang}] Aucun livre chargé.")
+    if len(data.questions) < MIN_QUIZ_QUESTIONS:
+        logger.warning(f"[{lang}] Seulement {len(data.questions)} question(s) de quiz, "
+                       f"minimum {MIN_QUIZ_QUESTIONS} pour hs!quiz.")
+    return data
+
+def load_language(lang: str, data_dir: str = DATA_DIR) -> LanguageCorpus:
+    """Charge et valide les trois fichiers d'une langue."""
+    hadiths = get_hadiths(data_file("hadiths", lang, data_dir)) or []
+    books = get_books(data_file("book", lang, data_dir)) or []
+    questions = get_quiz_questions(data_file("quiz", lang, data_dir)) or []
+    return validate_language(lang, LanguageCorpus(tuple(hadiths), tuple(books), tuple(questions)))
+
+
+class CorpusStore:
+    """Détient le snapshot courant du corpus, partagé par toutes les vues.
+
+    Le remplacement est une simple affectation de référence : les vues déjà
+    ouvertes gardent les tuples de l'ancien snapshot jusqu'à leur fin.
+    """
+
+    def __init__(self, data_dir: str = DATA_DIR, languages: Tuple[str, ...] = LANGUAGES,
+                 compiled_path: Optional[str] = COMPILED_PATH):
+        self.data_dir = data_dir
+        self.languages = languages
+        # Corpus binaire (corpusbin.py), utilisé s'il est présent et à jour
+        self.compiled_path = compiled_path
+        self._snapshot: Optional[CorpusSnapshot] = None
+        self._version = 0
+        # mtimes (ns) lus par le dernier build_snapshot, adoptés au swap
+        self._mtimes: Dict[str, int] = {}
+        self._pending_mtimes: Dict[str, int] = {}
+        self._listeners: List[Callable[[CorpusSnapshot], None]] = []
+        self._index_builders: Dict[str, Callable[[LanguageCorpus], Any]] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    @property
+    def snapshot(self) -> CorpusSnapshot:
+        if self._snapshot is None:
+            raise RuntimeError("Corpus non chargé : attendez startup.profile.wait() (chargé pendant la connexion) "
+                               "ou appelez store.load() hors du bot.")
+        return self._snapshot
+
+    def get(self, lang: str) -> LanguageCorpus:
+        return self.snapshot.get(lang)
+
+    def add_listener(self, callback: Callable[[CorpusSnapshot], None]):
+        """Appelé (dans la boucle) après chaque installation d'un snapshot."""
+        self._listeners.append(callback)
+
+    def add_index(self, name: str, builder: Callable[[LanguageCorpus], Any]):
+        """Enregistre un index dérivé, reconstruit avec chaque snapshot (hors boucle).
+
+        Le builder reçoit LanguageCorpus.tables : il peut y relire un index
+        précalculé par corpusbin.py au lieu de parcourir toutes les entrées.
+        """
+        self._index_builders[name] = builder
+
+    def source_files(self) -> List[str]:
+        return [data_file(kind, lang, self.data_dir) for lang in self.languages for kind in SOURCE_KINDS]
+
+    def watched_files(self) -> List[str]:
+        """Sources texte, plus le corpus compilé : sa recompilation déclenche un rechargement."""
+        files = self.source_files()
+        if self.compiled_path:
+            files.append(self.compiled_path)
+        return files
+
+    def scan_mtimes(self, paths: Optional[List[str]] = None) -> Dict[str, int]:
+        mtimes = {}
+        for path in self.watched_files() if paths is None else paths:
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                mtimes[path] = 0
+        return mtimes
+
+    def changed_files(self) -> List[str]:
+        """Fichiers sources modifiés depuis le dernier snapshot."""
+        current = self.scan_mtimes()
+        return [path for path, mtime in current.items() if self._mtimes.get(path) != mtime]
+
+    def build_snapshot(self) -> CorpusSnapshot:
+        """Lit et valide tous les fichiers sans toucher au snapshot courant.
+
+        Sans effet sur la boucle d'événements : peut tourner dans un exécuteur.
+        """
+        started = time.perf_counter()
+        mtimes = self.scan_mtimes()
+        self._version += 1
+        compiled = None
+        if self.compiled_path:
+            import corpusbin  # import local : corpusbin dépend de ce module
+            compiled = corpusbin.open_compiled(self, self.compiled_path)
+        languages = {}
+        for lang in self.languages:
+            data = compiled.language(lang) if compiled else None
+            languages[lang] = validate_language(lang, data) if data else load_language(lang, self.data_dir)
+        indexes = {(name, lang): builder(data)
+                   for name, builder in self._index_builders.items()
+                   for lang, data in languages.items()}
+        snapshot = CorpusSnapshot(self._version, MappingProxyType(languages), MappingProxyType(indexes))
+        self._pending_mtimes = mtimes
+        RELOAD_SECONDS.set(time.perf_counter() - started)
+        return snapshot
+
+    def swap(self, snapshot: CorpusSnapshot):
+        """Installe atomiquement un snapshot construit par build_snapshot()."""
+        self._snapshot = snapshot
+        self._mtimes = self._pending_mtimes
+        VERSION.set(snapshot.version)
+        for lang, data in snapshot.languages.items():
+            RECORDS.set(len(data.hadiths), lang=lang, kind="hadiths")
+            RECORDS.set(len(data.books), lang=lang, kind="books")
+            RECORDS.set(len(data.questions), lang=lang, kind="questions")
+            logger.info(f"[{lang}] Corpus v{snapshot.version} : {len(data.hadiths)} hadiths, "
+                        f"{len(data.books)} livres, {len(data.questions)} questions.")
+        for callback in self._listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.error(f"Erreur listener corpus {callback.__name__}: {e}")
+
+    def load(self) -> CorpusSnapshot:
+        snapshot = self.build_snapshot()
+        self.swap(snapshot)
+        return snapshot
+
+
+store = CorpusStore()
+
+# --- Rechargement à chaud ---
+
+_IN_MODIFY = 0x002
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_CLOSE_WRITE = 0x008
+
+def _open_inotify(directory: str) -> Optional[int]:
+    """Ouvre un descripteur inotify sur le dossier (Linux uniquement), sinon None."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_MODIFY
+        if libc.inotify_add_watch(fd, os.fsencode(os.path.abspath(directory)), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class CorpusWatcher:
+    """Surveille les fichiers sources et recharge le corpus hors de la boucle.
+
+    inotify réveille le watcher immédiatement quand il est disponible ; la
+    scrutation des mtimes reste le filet de sécurité (et le seul mécanisme
+    ailleurs que sous Linux).
+    """
+
+    DEBOUNCE = 0.5
+
+    def __init__(self, corpus_store: CorpusStore, interval: float = RELOAD_INTERVAL):
+        self.store = corpus_store
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._inotify_fd: Optional[int] = None
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._inotify_fd = _open_inotify(self.store.data_dir)
+            if self._inotify_fd is not None:
+                asyncio.get_running_loop().add_reader(self._inotify_fd, self._on_inotify)
+            self._task = asyncio.create_task(self._run(), name="corpus-watcher")
+            mode = "inotify + mtime" if self._inotify_fd is not None else "mtime"
+            logger.info(f"Surveillance du corpus active ({mode}, {self.interval}s).")
+
+    def stop(self):
+        if self._inotify_fd is not None:
+            asyncio.get_running_loop().remove_reader(self._inotify_fd)
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _on_inotify(self):
+        try:
+            while os.read(self._inotify_fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        self._wakeup.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+                # Laisser l'éditeur finir d'écrire avant de relire
+                await asyncio.sleep(self.DEBOUNCE)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.reload_if_changed(loop)
+
+    async def reload_if_changed(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> bool:
+        loop = loop or asyncio.get_running_loop()
+        changed = await loop.run_in_executor(None, self.store.changed_files)
+        if not changed:
+            return False
+        logger.info(f"Fichiers modifiés : {', '.join(os.path.basename(p) for p in changed)}")
+        try:
+            snapshot = await loop.run_in_executor(None, self.store.build_snapshot)
+        except Exception as e:
+            RELOADS.inc(result="error")
+            logger.error(f"Échec du rechargement du corpus : {e}")
+            return False
+        self.store.swap(snapshot)
+        RELOADS.inc(result="ok")
+        return True
@@ -0,0 +1,212 @@
+"""
+Format binaire compilé du corpus, chargé par mmap et décodé à la demande.
+
+Les fichiers .txt restent la source éditable ; `python corpusbin.py` les
+compile en un seul fichier :
+
+    en-tête   : b"HSCB", version (u16), nb de sections (u16), mtime max des sources (u64)
+    sections  : langue (8 o.), nom (16 o.), nb de champs (u8), nb d'entrées (u32),
+                position des offsets (u64), position du blob (u64)
+    offsets   : (entrées * champs + 1) u32, positions dans le blob
+    blob      : textes UTF-8 concaténés
+
+Une section de 0 champ est une table d'entiers : ses entrées u32 sont à la
+position des offsets, sans blob. Outre hadiths, book et quiz, chaque langue
+porte les tables des index dérivés (references.py, search.py), calculées à la
+compilation : au chargement, les index sont relus depuis le mmap au lieu de décoder
+et d'analyser chaque hadith.
+
+Le fichier est mappé en lecture seule : les pages sont partagées entre les
+processus des grappes de shards et une entrée n'est décodée qu'à l'accès.
+"""
+import os
+import sys
+import mmap
+import struct
+import logging
+import argparse
+from array import array
+from collections.abc import Sequence
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
+
+import corpus
+import references
+import search
+from corpus import Book, LanguageCorpus, QuizQuestion
+
+logger = logging.getLogger('HadithSahih.corpusbin')
+
+MAGIC = b"HSCB"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<4sHHQ")
+SECTION = struct.Struct("<8s16sBIQQ")
+KINDS = {"hadiths": 1, "book": 2, "quiz": 4}  # nb de champs
+# Index dont les tables (méthode tables()) sont précalculées ; relus par leur build_index
+INDEXES = (references.ReferenceIndex, search.SearchIndex)
+BIN_PATH = corpus.COMPILED_PATH
+
+
+def sources_mtime(store: corpus.CorpusStore) -> int:
+    return max(store.scan_mtimes(store.source_files()).values(), default=0)
+
+# --- Compilation ---
+
+def compile_corpus(store: corpus.CorpusStore, output: str = BIN_PATH) -> int:
+    """Écrit le fichier binaire à partir des .txt ; renvoie le nombre d'entrées."""
+    sections: List[Tuple[str, str, Sequence]] = []
+    for lang in store.languages:
+        hadiths = corpus.get_hadiths(corpus.data_file("hadiths", lang, store.data_dir)) or []
+        books = corpus.get_books(corpus.data_file("book", lang, store.data_dir)) or []
+        questions = corpus.get_quiz_questions(corpus.data_file("quiz", lang, store.data_dir)) or []
+        sections.append((lang, "hadiths", [(h,) for h in hadiths]))
+        sections.append((lang, "book", [tuple(b) for b in books]))
+        sections.append((lang, "quiz", [tuple(q) for q in questions]))
+        for index in INDEXES:
+            for name, table in index(hadiths).tables().items():
+                # Tables de textes : une section d'un champ, comme les hadiths
+                sections.append((lang, name, table if isinstance(table, array) else [(t,) for t in table]))
+
+    position = HEADER.size + SECTION.size * len(sections)
+    table = []
+    payloads = []
+    for lang, name, records in sections:
+        if len(name) > 16:
+            raise ValueError(f"nom de section trop long : {name}")
+        if isinstance(records, array):
+            offsets, blob, fields = array('I', records), bytearray(), 0
+        else:
+            fields = KINDS.get(name, 1)
+            offsets = array('I', [0])
+            blob = bytearray()
+            for record in records:
+                for field in record:
+                    blob += field.encode("utf-8")
+                    offsets.append(len(blob))
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        offsets_pos = position
+        blob_pos = offsets_pos + len(offsets) * offsets.itemsize
+        position = blob_pos + len(blob)
+        table.append(SECTION.pack(lang.encode("ascii"), name.encode("ascii"), fields, len(records),
+                                  offsets_pos, blob_pos))
+        payloads.append(offsets.tobytes())
+        payloads.append(bytes(blob))
+
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(sections), sources_mtime(store)))
+        for entry in table:
+            f.write(entry)
+        for payload in payloads:
+            f.write(payload)
+    # Remplacement atomique : un processus qui a déjà mappé l'ancien fichier le garde
+    os.replace(tmp_path, output)
+    return sum(len(records) for _, name, records in sections if name in KINDS)
+
+# --- Chargement ---
+
+def read_offsets(view: memoryview, start: int, end: int, byteorder: str = sys.byteorder):
+    """Offsets u32 petit-boutistes : vue directe sur le mmap, ou copie retournée sur un hôte gros-boutiste."""
+    if byteorder == "little":
+        return view[start:end].cast("I")
+    offsets = array('I')
+    offsets.frombytes(view[start:end])
+    offsets.byteswap()
+    return offsets
+
+class LazyRecords(Sequence):
+    """Séquence en lecture seule dont les entrées sont décodées à l'accès."""
+
+    __slots__ = ('_buffer', '_offsets', '_fields', '_count', '_factory')
+
+    def __init__(self, buffer: memoryview, offsets: Sequence, fields: int, count: int, factory=None):
+        self._buffer = buffer
+        self._offsets = offsets
+        self._fields = fields
+        self._count = count
+        self._factory = factory
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _decode(self, slot: int) -> str:
+        return str(self._buffer[self._offsets[slot]:self._offsets[slot + 1]], "utf-8")
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("index hors limites")
+        if self._fields == 1:
+            return self._decode(index)
+        base = index * self._fields
+        return self._factory(*(self._decode(base + i) for i in range(self._fields)))
+
+
+class CompiledCorpus:
+    """Fichier binaire mappé ; les sections sont exposées en LazyRecords (ou en entiers mappés)."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, version, count, self.sources_mtime = HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} n'est pas un corpus compilé v{FORMAT_VERSION}")
+        factories = {1: None, 2: Book, 4: QuizQuestion}
+        self.sections: Dict[Tuple[str, str], Sequence] = {}
+        for i in range(count):
+            raw_lang, raw_name, fields, records, offsets_pos, blob_pos = SECTION.unpack_from(view, HEADER.size + i * SECTION.size)
+            lang = raw_lang.rstrip(b"\0").decode("ascii")
+            name = raw_name.rstrip(b"\0").decode("ascii")
+            if fields == 0:
+                self.sections[(lang, name)] = read_offsets(view, offsets_pos, blob_pos)
+                continue
+            offsets = read_offsets(view, offsets_pos, blob_pos)
+            blob = view[blob_pos:]
+            self.sections[(lang, name)] = LazyRecords(blob, offsets, fields, records, factories[fields])
+
+    def language(self, lang: str) -> Optional[LanguageCorpus]:
+        tables = {name: records for (section_lang, name), records in self.sections.items()
+                  if section_lang == lang and name not in KINDS}
+        try:
+            return LanguageCorpus(self.sections[(lang, "hadiths")], self.sections[(lang, "book")],
+                                  self.sections[(lang, "quiz")], MappingProxyType(tables))
+        except KeyError:
+            return None
+
+
+def open_compiled(store: corpus.CorpusStore, path: str = BIN_PATH) -> Optional[CompiledCorpus]:
+    """Corpus compilé s'il existe et reste à jour par rapport aux .txt, sinon None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        compiled = CompiledCorpus(path)
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f"Corpus compilé illisible ({e}), lecture des fichiers texte.")
+        return None
+    if compiled.sources_mtime < sources_mtime(store):
+        logger.info(f"{path} est plus ancien que les fichiers texte : lancez `python corpusbin.py`.")
+        return None
+    return compiled
+
+# --- Ligne de commande ---
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compile les .txt du corpus en format binaire")
+    parser.add_argument("--output", default=BIN_PATH)
+    parser.add_argument("--check", action="store_true", help="code 1 si le fichier compilé est absent ou périmé")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s: %(message)s')
+    store = corpus.CorpusStore(compiled_path=None)
+    if args.check:
+        return 0 if open_compiled(store, args.output) else 1
+    count = compile_corpus(store, args.output)
+    logger.info(f"{count} entrées compilées dans {args.output} ({os.path.getsize(args.output)} octets).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""
+Vérification des fichiers du corpus avant déploiement.
+
+Le bot ignore les lignes invalides au chargement : une mauvaise modification
+peut réduire la banque de quiz sous MIN_QUIZ_QUESTIONS sans autre signe
+qu'un avertissement dans les logs. Ce script relit les .txt avec les mêmes
+parseurs que corpus.py et signale, avec le numéro de ligne :
+
+  - erreurs : lignes illisibles, textes trop longs pour Discord (message,
+    libellé de bouton), réponses de quiz identiques, banque de quiz trop petite ;
+  - avertissements : doublons, hadiths sans référence, hadiths répartis sur
+    plusieurs embeds, écarts entre langues (nombre d'entrées, hadiths présents
+    dans une seule langue).
+
+    python corpuslint.py             # code 1 en cas d'erreur
+    python corpuslint.py --strict    # code 1 aussi sur les avertissements
+    python corpuslint.py --github    # annotations pour GitHub Actions
+
+Aucune dépendance hors bibliothèque standard : pas de discord.py à installer en CI.
+"""
+import sys
+import argparse
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import corpus
+import locales
+import references
+from layout import BUTTON_LABEL, DESCRIPTION as EMBED_DESCRIPTION, FIELD_VALUE, MESSAGE_TOTAL, embed_size
+from search import fold
+
+# --- Limites Discord (voir layout.py) ---
+
+# Au-delà, la page de hs!book n'affiche plus 10 livres (BOOKS_PER_PAGE) et le titre est raccourci
+BOOK_LINE = EMBED_DESCRIPTION // 10
+# Ligne du résumé de quiz : ":no_entry: **question** : réponse" dans un field
+QUIZ_SUMMARY_OVERHEAD = len(":no_entry: **** : \n")
+# Écarts de références entre langues affichés au plus
+MAX_LISTED = 5
+
+
+class Issue(NamedTuple):
+    severity: str  # "error" ou "warning"
+    path: str
+    line: Optional[int]
+    message: str
+
+    def __str__(self) -> str:
+        where = f"{self.path}:{self.line}" if self.line else self.path
+        return f"{where}: {self.severity}: {self.message}"
+
+    def annotation(self) -> str:
+        line = f",line={self.line}" if self.line else ""
+        return f"::{self.severity} file={self.path}{line}::{self.message}"
+
+
+def read_lines(path: str) -> List[Tuple[int, str]]:
+    """(numéro, ligne) des lignes non vides ; FileNotFoundError si le fichier manque."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [(line_no, line.strip()) for line_no, line in enumerate(f, 1) if line.strip()]
+
+
+class Linter:
+    def __init__(self, data_dir: str = corpus.DATA_DIR, languages: Iterable[str] = corpus.LANGUAGES):
+        self.data_dir = data_dir
+        self.languages = tuple(languages)
+        self.issues: List[Issue] = []
+        # (type, langue) -> nombre d'entrées valides
+        self.counts: Dict[Tuple[str, str], int] = {}
+        # langue -> clé de référence -> ligne
+        self.hadith_keys: Dict[str, Dict[Tuple[str, str], int]] = {}
+        # Titres et pieds des embeds : ils comptent dans les 6000 caractères d'un message
+        self.locales = locales.load_locales(self.languages, data_dir)
+
+    def error(self, path: str, line: Optional[int], message: str):
+        self.issues.append(Issue("error", path, line, message))
+
+    def warning(self, path: str, line: Optional[int], message: str):
+        self.issues.append(Issue("warning", path, line, message))
+
+    def too_long(self, path: str, line: int, what: str, text: str, limit: int):
+        if len(text) > limit:
+            self.error(path, line, f"{what} de {len(text)} caractères, limite Discord {limit}")
+
+    def source(self, kind: str, lang: str) -> Optional[List[Tuple[int, str]]]:
+        path = corpus.data_file(kind, lang, self.data_dir)
+        try:
+            return read_lines(path)
+        except FileNotFoundError:
+            self.warning(path, None, "fichier absent")
+        except (OSError, UnicodeDecodeError) as e:
+            self.error(path, None, f"fichier illisible : {e}")
+        return None
+
+    # --- Vérifications par fichier ---
+
+    def lint_hadiths(self, lang: str):
+        path = corpus.data_file("hadiths", lang, self.data_dir)
+        lines = self.source("hadiths", lang)
+        if lines is None:
+            return
+        texts: Dict[str, int] = {}
+        keys = self.hadith_keys[lang] = {}
+        strings = self.locales[lang].strings
+        for line_no, line in lines:
+            text, ref = references.split_hadith(line)
+            # Même mise en page que build_hadith_embeds : le texte continue dans
+            # d'autres embeds du message, il n'est coupé qu'au-delà de 6000 caractères
+            fields = []
+            if ref is not None:
+                fields.append((strings.get("hadith.reference", ""), ref.display()))
+                if ref.grade:
+                    fields.append((strings.get("hadith.grade", ""), ref.grade))
+            budget = MESSAGE_TOTAL - embed_size(strings.get("hadith.title", ""), "", fields,
+                                                strings.get("hadith.footer", ""))
+            if len(text) > budget:
+                self.error(path, line_no, f"hadith de {len(text)} caractères, coupé au-delà de {budget} "
+                                          f"(limite Discord de {MESSAGE_TOTAL} par message)")
+            elif len(text) > EMBED_DESCRIPTION:
+                self.warning(path, line_no, f"hadith de {len(text)} caractères, affiché sur plusieurs embeds")
+            first = texts.setdefault(fold(text), line_no)
+            if first != line_no:
+                self.warning(path, line_no, f"hadith en double (ligne {first})")
+            if ref is None:
+                self.warning(path, line_no, "référence ***[...]*** absente en fin de ligne")
+                continue
+            self.too_long(path, line_no, "référence", ref.display(), FIELD_VALUE)
+            first = keys.setdefault(ref.key, line_no)
+            if first != line_no:
+                self.warning(path, line_no, f"référence « {ref.raw} » déjà utilisée ligne {first}")
+        self.counts["hadiths", lang] = len(lines)
+
+    def lint_books(self, lang: str):
+        path = corpus.data_file("book", lang, self.data_dir)
+        lines = self.source("book", lang)
+        if lines is None:
+            return
+        links: Dict[str, int] = {}
+        count = 0
+        for line_no, line in lines:
+            try:
+                book = corpus.parse_book_line(line)
+            except ValueError as e:
+                self.error(path, line_no, f"ligne ignorée par le bot : {e}")
+                continue
+            count += 1
+            line_length = len(f"**10.** [{book.title}]({book.link})")
+            if line_length > BOOK_LINE:
+                self.warning(path, line_no, f"ligne de bibliographie de {line_length} caractères : "
+                                            f"moins de 10 livres par page au-delà de {BOOK_LINE}")
+            if not book.link.startswith(("https://", "http://")):
+                self.warning(path, line_no, f"lien sans http(s) : {book.link}")
+            first = links.setdefault(book.link, line_no)
+            if first != line_no:
+                self.warning(path, line_no, f"lien en double (ligne {first})")
+        self.counts["book", lang] = count
+
+    def lint_quiz(self, lang: str):
+        path = corpus.data_file("quiz", lang, self.data_dir)
+        # Sans fichier, hs!quiz échoue aussi : la banque vide est une erreur
+        lines = self.source("quiz", lang) or []
+        questions: Dict[str, int] = {}
+        count = 0
+        for line_no, line in lines:
+            try:
+                q = corpus.parse_quiz_line(line)
+            except ValueError as e:
+                self.error(path, line_no, f"ligne ignorée par le bot : {e}")
+                continue
+            count += 1
+            self.too_long(path, line_no, "question", f"**{q.question}**", EMBED_DESCRIPTION)
+            self.too_long(path, line_no, "ligne du résumé (question et bonne réponse)",
+                          q.question + q.correct, FIELD_VALUE - QUIZ_SUMMARY_OVERHEAD)
+            answers = (q.correct, q.wrong1, q.wrong2)
+            for answer in answers:
+                if not answer:
+                    self.error(path, line_no, "réponse vide (bouton sans libellé)")
+                else:
+                    self.too_long(path, line_no, f"réponse « {answer[:20]}… »", answer, BUTTON_LABEL)
+            folded = [fold(answer) for answer in answers]
+            if len(set(folded)) < len(folded):
+                self.error(path, line_no, "réponses identiques : les boutons seraient indiscernables")
+            first = questions.setdefault(fold(q.question), line_no)
+            if first != line_no:
+                self.warning(path, line_no, f"question en double (ligne {first})")
+        self.counts["quiz", lang] = count
+        if count < corpus.MIN_QUIZ_QUESTIONS:
+            self.error(path, None, f"{count} question(s) valide(s), hs!quiz en exige {corpus.MIN_QUIZ_QUESTIONS}")
+
+    # --- Vérifications entre langues ---
+
+    def lint_languages(self):
+        reference = self.languages[0]
+        for kind in corpus.SOURCE_KINDS:
+            expected = self.counts.get((kind, reference))
+            for lang in self.languages[1:]:
+                count = self.counts.get((kind, lang))
+                if expected is not None and count is not None and count != expected:
+                    self.warning(corpus.data_file(kind, lang, self.data_dir), None,
+                                 f"{count} entrée(s) contre {expected} en {reference}")
+        reference_keys = self.hadith_keys.get(reference, {})
+        for lang in self.languages[1:]:
+            keys = self.hadith_keys.get(lang)
+            if keys is None:
+                continue
+            path = corpus.data_file("hadiths", lang, self.data_dir)
+            extra = sorted((line_no, key) for key, line_no in keys.items() if key not in reference_keys)
+            for line_no, key in extra[:MAX_LISTED]:
+                self.warning(path, line_no, f"hadith absent de {reference} (référence {' '.join(key)})")
+            missing = [line_no for key, line_no in reference_keys.items() if key not in keys]
+            if missing:
+                listed = ", ".join(map(str, sorted(missing)[:MAX_LISTED]))
+                self.warning(path, None, f"{len(missing)} hadith(s) de {reference} sans traduction "
+                                         f"(lignes {listed}{'…' if len(missing) > MAX_LISTED else ''})")
+
+    def run(self) -> List[Issue]:
+        for lang in self.languages:
+            self.lint_hadiths(lang)
+            self.lint_books(lang)
+            self.lint_quiz(lang)
+        if len(self.languages) > 1:
+            self.lint_languages()
+        return self.issues
+
+
+# --- Ligne de commande ---
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Vérifie les fichiers du corpus (hadiths, livres, quiz)")
+    parser.add_argument("--data-dir", default=corpus.DATA_DIR)
+    parser.add_argument("--strict", action="store_true", help="code 1 aussi sur les avertissements")
+    parser.add_argument("--github", action="store_true", help="annotations ::error/::warning pour GitHub Actions")
+    args = parser.parse_args(argv)
+    languages = corpus.discover_languages(args.data_dir) or corpus.LANGUAGE_ORDER
+    issues = Linter(args.data_dir, languages).run()
+    for issue in issues:
+        print(issue.annotation() if args.github else issue)
+    errors = sum(issue.severity == "error" for issue in issues)
+    warnings = len(issues) - errors
+    print(f"{', '.join(languages)} : {errors} erreur(s), {warnings} avertissement(s).", file=sys.stderr)
+    return 1 if errors or (args.strict and warnings) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
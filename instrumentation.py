@@ -0,0 +1,85 @@
+"""
+Mesure des commandes et interactions : durée des handlers, aller-retour de
+l'API Discord, recherche dans le corpus, timeouts et erreurs.
+
+Les histogrammes sont exposés par /metrics et résumés périodiquement dans les logs.
+"""
+import time
+import asyncio
+import logging
+import functools
+from contextlib import contextmanager
+from typing import Awaitable, Callable, TypeVar
+
+import logs
+import metrics
+import sessions
+
+logger = logging.getLogger('HadithSahih.instrumentation')
+
+HANDLER = metrics.histogram('hs_handler_seconds', "Durée des handlers", ("kind", "name"))
+API = metrics.histogram('hs_discord_api_seconds', "Aller-retour des appels à l'API Discord", ("call",))
+LOOKUP = metrics.histogram('hs_corpus_lookup_seconds', "Durée des recherches dans le corpus", ("lookup",))
+TIMEOUTS = metrics.counter('hs_view_timeouts_total', "Vues expirées", ("view",))
+ERRORS = metrics.counter('hs_errors_total', "Erreurs par emplacement et type", ("where", "error"))
+
+SUMMARY_INTERVAL = 300
+
+T = TypeVar("T")
+
+
+@contextmanager
+def timed(histogram: metrics.Histogram, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started, **labels)
+
+def record_error(where: str, error: BaseException):
+    ERRORS.inc(where=where, error=type(error).__name__)
+
+async def api_call(call: str, awaitable: Awaitable[T]) -> T:
+    """Attend un appel à l'API Discord en mesurant son aller-retour."""
+    with timed(API, call=call):
+        return await awaitable
+
+def interaction_handler(name: str):
+    """Décorateur pour les callbacks de boutons : durée et erreurs."""
+    def decorator(func: Callable[..., Awaitable[None]]):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            # L'interaction est le premier argument qui a une réponse (après self)
+            interaction = next((arg for arg in args if hasattr(arg, "response")), None)
+            if interaction is not None:
+                logs.bind_interaction(interaction, command=name)
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                record_error(f"interaction:{name}", e)
+                raise
+            finally:
+                HANDLER.observe(time.perf_counter() - started, kind="interaction", name=name)
+        return wrapper
+    return decorator
+
+# --- Résumé dans les logs ---
+
+def summary_lines():
+    for histogram in (HANDLER, API, LOOKUP):
+        for key in list(histogram.counts):
+            count = sum(histogram.counts[key])
+            p50 = histogram.quantile(0.5, key) * 1000
+            p99 = histogram.quantile(0.99, key) * 1000
+            label = "/".join(key)
+            yield f"{histogram.name}[{label}] n={count} p50<={p50:g}ms p99<={p99:g}ms"
+    for counter in (TIMEOUTS, ERRORS, sessions.SESSIONS, sessions.SESSION_BYTES, sessions.EVICTIONS):
+        for key, value in list(counter.values.items()):
+            yield f"{counter.name}[{'/'.join(key)}] {int(value)}"
+
+async def summary_loop(interval: float = SUMMARY_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        for line in summary_lines():
+            logger.info(line)
@@ -0,0 +1,114 @@
+"""
+Mise en page des embeds dans les limites de Discord.
+
+Discord refuse tout le message si un seul texte dépasse sa limite (titre 256,
+description 4096, field 1024, 25 fields, 6000 caractères par message, libellé
+de bouton 80). Les fonctions ci-dessous mesurent les textes avant l'envoi :
+coupures de pages selon la taille, découpage des textes longs à une fin de
+phrase ou de mot, réduction équitable d'une liste de lignes.
+
+Le résultat est mis en cache avec les embeds (render.RenderCache) : la mise en
+page n'est recalculée qu'à un changement de version du corpus.
+"""
+import re
+from typing import List, Optional, Sequence, Tuple
+
+# --- Limites Discord (caractères) ---
+
+TITLE = 256
+DESCRIPTION = 4096
+FIELD_NAME = 256
+FIELD_VALUE = 1024
+FOOTER = 2048
+MAX_FIELDS = 25
+MESSAGE_TOTAL = 6000  # somme des embeds d'un même message
+MAX_EMBEDS = 10
+BUTTON_LABEL = 80
+
+ELLIPSIS = "…"
+
+# Coupures préférées, de la meilleure à la pire : paragraphe, phrase, mot
+_BREAKS = (re.compile(r"\n\s*\n"), re.compile(r"(?<=[.!?;:»\"])\s+"), re.compile(r"\s+"))
+
+
+def truncate(text: str, limit: int) -> str:
+    """text limité à limit caractères, coupé à un mot si possible, avec « … »."""
+    if len(text) <= limit:
+        return text
+    if limit <= len(ELLIPSIS):
+        return text[:limit]
+    cut = text[:limit - len(ELLIPSIS)]
+    space = cut.rfind(" ")
+    if space > limit // 2:
+        cut = cut[:space]
+    return cut.rstrip() + ELLIPSIS
+
+def split_text(text: str, limit: int) -> List[str]:
+    """Morceaux de text d'au plus limit caractères, coupés au meilleur endroit possible."""
+    chunks = []
+    while len(text) > limit:
+        window = text[:limit + 1]
+        end = None
+        for pattern in _BREAKS:
+            # Dernière coupure de ce type dans la seconde moitié de la fenêtre
+            matches = [m for m in pattern.finditer(window) if m.start() > limit // 2]
+            if matches:
+                end, resume = matches[-1].start(), matches[-1].end()
+                break
+        if end is None:
+            end = resume = limit
+        chunks.append(text[:end].rstrip())
+        text = text[resume:].lstrip()
+    if text or not chunks:
+        chunks.append(text)
+    return chunks
+
+def paginate(sizes: Sequence[int], budget: int, max_items: Optional[int] = None,
+             first_budget: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Coupures de pages (début, fin) : autant d'éléments par page que le budget le permet.
+
+    Chaque élément doit tenir seul dans le budget (l'appelant le tronque sinon).
+    first_budget : budget de la première page, si son en-tête est différent.
+    """
+    pages = []
+    start, used = 0, 0
+    current = budget if first_budget is None else first_budget
+    for i, size in enumerate(sizes):
+        full = max_items is not None and i - start >= max_items
+        if i > start and (full or used + size > current):
+            pages.append((start, i))
+            start, used, current = i, 0, budget
+        used += size
+    if start < len(sizes):
+        pages.append((start, len(sizes)))
+    return pages
+
+def pack_lines(lines: Sequence[str], limit: int) -> List[str]:
+    """Regroupe des lignes (terminées par \\n) en blocs d'au plus limit caractères."""
+    blocks = [""]
+    for line in lines:
+        for part in split_text(line, limit) if len(line) > limit else (line,):
+            if blocks[-1] and len(blocks[-1]) + len(part) > limit:
+                blocks.append("")
+            blocks[-1] += part
+    return blocks
+
+def fit_total(texts: Sequence[str], budget: int) -> List[str]:
+    """Tronque les textes les plus longs, d'abord, pour que leur somme tienne dans budget."""
+    if sum(map(len, texts)) <= budget:
+        return list(texts)
+    # Plafond commun c : sum(min(len, c)) <= budget (les textes courts restent entiers)
+    lengths = sorted(map(len, texts))
+    remaining, cap = max(budget, 0), 0
+    for i, length in enumerate(lengths):
+        share = remaining // (len(lengths) - i)
+        if length > share:
+            cap = share
+            break
+        remaining -= length
+    return [truncate(text, max(cap, 1)) if len(text) > cap else text for text in texts]
+
+def embed_size(title: str = "", description: str = "", fields: Sequence[Tuple[str, str]] = (),
+               footer: str = "") -> int:
+    """Caractères comptés par Discord pour la limite de 6000 par message."""
+    return len(title) + len(description) + len(footer) + sum(len(n) + len(v) for n, v in fields)
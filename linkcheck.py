@@ -0,0 +1,254 @@
+"""
+Vérification des liens de la bibliographie (PDF des book_<langue>.txt).
+
+Une tâche de fond interroge chaque lien (HEAD, GET si le serveur refuse HEAD)
+à travers un pool de connexions borné, avec If-None-Match : un PDF inchangé
+coûte une réponse 304 sans corps. Statut HTTP, taille, Last-Modified et ETag
+sont gardés dans SQLite et en mémoire ; les pages de hs!book affichent la
+taille de chaque PDF et signalent les liens cassés.
+
+Seul un statut HTTP d'erreur marque un lien cassé. Sans réponse (connexion
+refusée, délai dépassé), la vérification est retentée après une courte
+attente, puis le dernier état connu est gardé jusqu'au cycle suivant.
+
+Une seule grappe vérifie les liens, les autres relisent la table à chaque
+cycle. HS_LINKCHECK_REWRITE="préfixe=remplacement" redirige les requêtes
+(pas les clés du cache) vers un serveur local, pour essayer le vérificateur
+sans toucher aux vrais hébergeurs.
+
+    python linkcheck.py            # vérifie tous les liens maintenant
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import aiohttp
+
+import corpus
+import metrics
+import storage
+
+logger = logging.getLogger('HadithSahih.linkcheck')
+
+# --- Configuration ---
+
+INTERVAL = float(os.environ.get('HS_LINKCHECK_INTERVAL', 24 * 3600))  # 0 = jamais
+CONCURRENCY = int(os.environ.get('HS_LINKCHECK_CONCURRENCY', 4))
+TIMEOUT = float(os.environ.get('HS_LINKCHECK_TIMEOUT', 20))
+REWRITE = os.environ.get('HS_LINKCHECK_REWRITE', '')
+# Sans réponse HTTP : nouveaux essais après RETRY_DELAY, 2 * RETRY_DELAY... secondes
+RETRIES = int(os.environ.get('HS_LINKCHECK_RETRIES', 2))
+RETRY_DELAY = float(os.environ.get('HS_LINKCHECK_RETRY_DELAY', 5))
+USER_AGENT = "HadithSahih-linkcheck (+https://hadith-sahih.pages.dev)"
+
+CHECKS = metrics.counter('hs_link_checks_total', "Vérifications de liens", ("result",))
+BROKEN = metrics.gauge('hs_links_broken', "Liens de la bibliographie en erreur")
+CHECK_SECONDS = metrics.histogram('hs_link_check_seconds', "Durée d'une vérification de lien")
+
+storage.db.add_schema("""
+CREATE TABLE IF NOT EXISTS link_status (
+    url TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    size INTEGER,
+    last_modified TEXT,
+    etag TEXT,
+    checked_at REAL NOT NULL
+);
+""")
+
+
+class LinkStatus(NamedTuple):
+    url: str
+    status: int
+    size: Optional[int]
+    last_modified: Optional[str]
+    etag: Optional[str]
+    checked_at: float
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 400
+
+    def shown(self) -> Tuple[bool, Optional[int]]:
+        """Ce que les pages de hs!book affichent : un changement impose un nouveau rendu."""
+        return self.ok, self.size
+
+
+def parse_rewrite(spec: str) -> Optional[Tuple[str, str]]:
+    """"https://a/=http://127.0.0.1:8081/" -> (préfixe, remplacement)."""
+    prefix, sep, replacement = spec.partition("=")
+    return (prefix, replacement) if sep and prefix else None
+
+def book_urls(snapshot: Optional[corpus.CorpusSnapshot] = None) -> List[str]:
+    """Liens de tous les livres du corpus, sans doublons."""
+    snapshot = snapshot or corpus.store.snapshot
+    return list(dict.fromkeys(book.link for data in snapshot.languages.values() for book in data.books))
+
+
+class LinkStore:
+    """Table link_status : dernier résultat connu de chaque lien (relu par les autres grappes)."""
+
+    def __init__(self, db: storage.Database = storage.db):
+        self.db = db
+
+    def load_all(self) -> List[LinkStatus]:
+        return [LinkStatus(*row) for row in self.db.fetchall(
+            "SELECT url, status, size, last_modified, etag, checked_at FROM link_status")]
+
+    def save(self, statuses: Iterable[LinkStatus]):
+        self.db.executemany(
+            "INSERT OR REPLACE INTO link_status (url, status, size, last_modified, etag, checked_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)", list(statuses))
+
+
+class LinkChecker:
+    def __init__(self, store: Optional[LinkStore] = None, urls: Callable[[], List[str]] = book_urls,
+                 concurrency: int = CONCURRENCY, timeout: float = TIMEOUT, interval: float = INTERVAL,
+                 retries: int = RETRIES, retry_delay: float = RETRY_DELAY,
+                 rewrite: Optional[Tuple[str, str]] = parse_rewrite(REWRITE),
+                 on_change: Optional[Callable[[], None]] = None):
+        self.store = store or LinkStore()
+        self.urls = urls
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.interval = interval
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.rewrite = rewrite
+        self.on_change = on_change
+        self.statuses: Dict[str, LinkStatus] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def get(self, url: str) -> Optional[LinkStatus]:
+        return self.statuses.get(url)
+
+    def target(self, url: str) -> str:
+        if self.rewrite and url.startswith(self.rewrite[0]):
+            return self.rewrite[1] + url[len(self.rewrite[0]):]
+        return url
+
+    async def request(self, session: aiohttp.ClientSession, url: str, headers: Dict[str, str]):
+        """(statut, en-têtes) ; HEAD, puis GET si le serveur refuse HEAD."""
+        started = time.perf_counter()
+        try:
+            async with session.head(self.target(url), headers=headers, allow_redirects=True) as resp:
+                response = (resp.status, resp.headers.copy())
+            if response[0] in (405, 501):
+                # HEAD refusé : GET, en-têtes seulement (le corps n'est pas lu)
+                async with session.get(self.target(url), headers=headers, allow_redirects=True) as resp:
+                    response = (resp.status, resp.headers.copy())
+            return response
+        finally:
+            CHECK_SECONDS.observe(time.perf_counter() - started)
+
+    async def check(self, session: aiohttp.ClientSession, url: str) -> Optional[LinkStatus]:
+        """Nouvel état du lien ; le précédent (ou None) s'il n'a jamais répondu."""
+        previous = self.statuses.get(url)
+        headers = {}
+        if previous is not None and previous.ok and previous.etag:
+            headers["If-None-Match"] = previous.etag
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.request(session, url, headers)
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            if attempt < self.retries:
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+        else:
+            # Panne réseau, pas un lien cassé : ni statut ni ETag perdus
+            CHECKS.inc(result="error")
+            logger.warning(f"Lien injoignable {url} ({self.retries + 1} essai(s)) : {error!r}")
+            return previous
+
+        status, resp_headers = response
+        if status == 304 and previous is not None:
+            CHECKS.inc(result="not_modified")
+            return previous._replace(checked_at=time.time())
+        length = resp_headers.get("Content-Length")
+        result = LinkStatus(url, status, int(length) if length and length.isdigit() else None,
+                            resp_headers.get("Last-Modified"), resp_headers.get("ETag"), time.time())
+        CHECKS.inc(result="ok" if result.ok else "broken")
+        if not result.ok:
+            logger.warning(f"Lien cassé {url} : HTTP {status}")
+        return result
+
+    async def check_all(self, urls: Optional[Iterable[str]] = None) -> List[LinkStatus]:
+        """Vérifie les liens (tous ceux du corpus par défaut) et enregistre les résultats.
+
+        Un lien qui n'a jamais répondu n'a pas encore d'état : il est absent du résultat.
+        """
+        urls = list(self.urls() if urls is None else urls)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers={"User-Agent": USER_AGENT}) as session:
+            checked = await asyncio.gather(*(self.check(session, url) for url in urls))
+        results = [result for result in checked if result is not None]
+        await storage.db.run(self.store.save, results)
+        self.apply(results)
+        return results
+
+    def apply(self, results: Iterable[LinkStatus]):
+        changed = False
+        for result in results:
+            previous = self.statuses.get(result.url)
+            changed |= previous is None or previous.shown() != result.shown()
+            self.statuses[result.url] = result
+        BROKEN.set(sum(not s.ok for s in self.statuses.values()))
+        if changed and self.on_change is not None:
+            self.on_change()
+
+    # --- Tâche de fond ---
+
+    def start(self, check: bool = True):
+        """check=False : relit seulement la table (grappes qui ne vérifient pas)."""
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run(check), name="link-checker")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self, check: bool):
+        while True:
+            try:
+                self.apply(await storage.db.run(self.store.load_all))
+                if check:
+                    results = await self.check_all()
+                    broken = sum(not r.ok for r in results)
+                    logger.info(f"{len(results)} lien(s) vérifié(s), {broken} en erreur.")
+            except Exception as e:
+                logger.error(f"Vérification des liens impossible : {e!r}", exc_info=e)
+            await asyncio.sleep(self.interval)
+
+
+checker = LinkChecker()
+
+# --- Ligne de commande ---
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Vérifie les liens de la bibliographie")
+    parser.add_argument("--rewrite", default=REWRITE, help="préfixe=remplacement, ex. vers un serveur local")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s:%(name)s: %(message)s')
+    corpus.store.load()
+    link_checker = LinkChecker(rewrite=parse_rewrite(args.rewrite))
+    urls = link_checker.urls()
+    results = {result.url: result for result in asyncio.run(link_checker.check_all(urls))}
+    for url in urls:
+        result = results.get(url)
+        if result is None:
+            print(f"---  {'injoignable':>12}  {url}")
+            continue
+        size = f"{result.size} o" if result.size is not None else "?"
+        print(f"{result.status:3d}  {size:>12}  {result.url}")
+    return 1 if len(results) < len(urls) or any(not r.ok for r in results.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Textes de l'interface par langue (locale_<langue>.txt).
+
+Chaque table est lue une fois au démarrage, fusionnée avec la table de repli
+(FALLBACK) puis figée : une clé absente d'une langue reprend le texte anglais,
+sans branche ni recherche supplémentaire au moment de répondre. Ajouter une
+langue revient à déposer ses fichiers hadiths_/book_/quiz_/locale_<langue>.txt.
+
+Format : une ligne `clé = valeur` par texte, `#` pour un commentaire, `\\n`
+pour un saut de ligne. Les valeurs peuvent contenir des champs {nom}.
+"""
+import os
+import sys
+import logging
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, Optional
+
+import corpus
+
+logger = logging.getLogger('HadithSahih.locales')
+
+FALLBACK = "ENG"
+
+
+def locale_file(lang: str, data_dir: str = corpus.DATA_DIR) -> str:
+    return os.path.join(data_dir, f"locale_{lang.lower()}.txt")
+
+def read_table(file_path: str) -> Dict[str, str]:
+    """clé -> texte ; table vide si le fichier n'existe pas."""
+    table = {}
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                key, sep, value = line.partition("=")
+                if not sep:
+                    logger.warning(f"{file_path}:{line_no} ignorée (clé = valeur attendu).")
+                    continue
+                table[key.strip()] = sys.intern(value.strip().replace("\\n", "\n"))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"Erreur lecture locale {file_path}: {e}")
+    return table
+
+
+class Locale:
+    """Textes d'une langue, table de repli comprise."""
+
+    __slots__ = ('code', 'label', 'emoji', 'strings')
+
+    def __init__(self, code: str, strings: Mapping[str, str]):
+        self.code = code
+        self.strings = strings
+        self.label = strings.get("language.label") or code
+        self.emoji = strings.get("language.emoji") or None
+
+    def __getitem__(self, key: str) -> str:
+        return self.strings[key]
+
+
+def load_locales(languages: Iterable[str], data_dir: str = corpus.DATA_DIR) -> Dict[str, Locale]:
+    fallback = read_table(locale_file(FALLBACK, data_dir))
+    if not fallback:
+        logger.error(f"Table de repli {locale_file(FALLBACK, data_dir)} absente ou vide.")
+    locales = {}
+    for lang in languages:
+        own = fallback if lang == FALLBACK else read_table(locale_file(lang, data_dir))
+        missing = fallback.keys() - own.keys()
+        if missing and lang != FALLBACK:
+            logger.warning(f"[{lang}] {len(missing)} texte(s) d'interface repris de {FALLBACK}.")
+        # Les métadonnées de langue ne sont pas reprises de la table de repli
+        strings = {key: value for key, value in fallback.items() if not key.startswith("language.")}
+        strings.update(own)
+        locales[lang] = Locale(lang, MappingProxyType(strings))
+    return locales
+
+
+LOCALES = load_locales(corpus.LANGUAGES)
+DEFAULT = corpus.LANGUAGES[0]
+
+def get(lang: Optional[str]) -> Locale:
+    """Locale d'une langue du corpus ; langue par défaut sinon."""
+    return LOCALES.get(lang) or LOCALES[DEFAULT]
+
+def text(lang: Optional[str], key: str, **values) -> str:
+    strings = get(lang).strings
+    return strings[key].format(**values) if values else strings[key]
@@ -0,0 +1,209 @@
+"""
+Journalisation non bloquante : les coroutines déposent leurs enregistrements
+dans une file (QueueHandler), un thread (QueueListener) les formate et les écrit.
+
+La boucle d'événements ne paie plus que le filtrage et la mise en file : le
+formatage (JSON, traces d'exception) et l'écriture sur stdout se font hors de
+la boucle. Chaque enregistrement porte le contexte de la commande ou de
+l'interaction en cours (serveur, salon, commande, id d'interaction), lié par
+`bind` dans une ContextVar : chaque tâche asyncio a le sien.
+
+Les avertissements répétés (même ligne de code) sont limités : BURST par
+fenêtre de WINDOW secondes, puis un sur SAMPLE ; l'enregistrement qui passe
+indique combien ont été écartés depuis le précédent. Les erreurs passent toujours.
+
+    HS_LOG_LEVEL=INFO                           # niveau global
+    HS_LOG_LEVELS="corpus=WARNING,discord=INFO" # niveau par sous-système
+    HS_LOG_FORMAT=json                          # ou text
+"""
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, Tuple
+
+import metrics
+
+# --- Configuration ---
+
+LEVEL = os.environ.get('HS_LOG_LEVEL', 'INFO').upper()
+LEVELS = os.environ.get('HS_LOG_LEVELS', '')
+FORMAT = os.environ.get('HS_LOG_FORMAT', 'json')
+WINDOW = float(os.environ.get('HS_LOG_WINDOW', 60))
+BURST = int(os.environ.get('HS_LOG_BURST', 10))
+SAMPLE = int(os.environ.get('HS_LOG_SAMPLE', 100))
+
+ROOT = 'HadithSahih'
+# Sous-systèmes désignés par leur propre nom de logger, pas HadithSahih.<nom>
+EXTERNAL = ('discord', 'aiohttp', 'asyncio')
+CONTEXT_FIELDS = ('guild', 'channel', 'command', 'interaction')
+
+SUPPRESSED = metrics.counter('hs_log_suppressed_total', "Enregistrements de log écartés par la limitation", ("logger",))
+
+# --- Contexte de la requête en cours ---
+
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar('hs_log_context', default={})
+
+def bind(**fields):
+    """Ajoute des champs au contexte de log de la tâche courante."""
+    _context.set({**_context.get(), **{k: v for k, v in fields.items() if v is not None}})
+
+def bind_interaction(interaction: Any, command: Optional[str] = None):
+    """Contexte d'une interaction (bouton, menu, commande slash)."""
+    bind(guild=getattr(interaction, 'guild_id', None), channel=getattr(interaction, 'channel_id', None),
+         interaction=getattr(interaction, 'id', None), command=command)
+
+def current() -> Dict[str, Any]:
+    return _context.get()
+
+
+class ContextFilter(logging.Filter):
+    """Copie le contexte sur l'enregistrement, dans la tâche qui journalise."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.hs_context = _context.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Limite les enregistrements répétés d'une même ligne de code (WARNING et moins)."""
+
+    def __init__(self, window: float = WINDOW, burst: int = BURST, sample: int = SAMPLE):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.sample = max(1, sample)
+        # (logger, ligne) -> [début de fenêtre, vus dans la fenêtre, écartés non signalés]
+        self._sites: Dict[Tuple[str, str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.WARNING or self.window <= 0:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = record.created
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.window:
+                suppressed = site[2] if site is not None else 0
+                site = self._sites[key] = [now, 0, suppressed]
+            site[1] += 1
+            seen = site[1]
+            if seen > self.burst and (seen - self.burst) % self.sample:
+                site[2] += 1
+                SUPPRESSED.inc(logger=record.name)
+                return False
+            record.hs_suppressed, site[2] = site[2], 0
+        return True
+
+
+# --- Formatage (thread d'écriture) ---
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, 'hs_context', None) or {})
+        if getattr(record, 'hs_suppressed', 0):
+            entry["suppressed"] = record.hs_suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Format historique, suivi du contexte : « ... [guild=1 command=hadith] »."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s:%(levelname)s:%(name)s: %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        context = getattr(record, 'hs_context', None)
+        extra = [f"{k}={context[k]}" for k in CONTEXT_FIELDS if context and k in context]
+        if getattr(record, 'hs_suppressed', 0):
+            extra.append(f"suppressed={record.hs_suppressed}")
+        if not extra:
+            return line
+        first, newline, rest = line.partition("\n")
+        return f"{first} [{' '.join(extra)}]{newline}{rest}"
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Met l'enregistrement en file sans le formater : le thread d'écriture s'en charge.
+
+    La file reste dans le processus : exc_info voyage tel quel, seul le message
+    est figé ici (ses arguments pourraient changer avant l'écriture).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+# --- Installation ---
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """"corpus=WARNING,discord=INFO" -> {"HadithSahih.corpus": 30, "discord": 20}."""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        name, level = name.strip(), level.strip().upper()
+        if not sep or not name:
+            continue
+        value = logging.getLevelName(level)
+        if not isinstance(value, int):
+            continue
+        if name != ROOT and "." not in name and name not in EXTERNAL:
+            name = f"{ROOT}.{name}"
+        levels[name] = value
+    return levels
+
+_listener: Optional[QueueListener] = None
+
+def setup(level: str = LEVEL, levels: str = LEVELS, fmt: str = FORMAT,
+          stream=None) -> QueueListener:
+    """Remplace les handlers du logger racine par la file ; idempotent."""
+    global _listener
+    if _listener is not None:
+        return _listener
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(RateLimitFilter())
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    for name, value in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(value)
+
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+    atexit.register(shutdown)
+    return _listener
+
+def shutdown():
+    """Vide la file et arrête le thread d'écriture."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
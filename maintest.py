@@ -1,169 +1,105 @@
+import startup  # en premier : l'horloge du démarrage part de cet import
+import os
+import sharding
+
+if __name__ == "__main__" and sharding.is_launcher():
+    # Processus parent du mode cluster : il lance les grappes sans importer
+    # discord.py ni le reste du bot (chaque enfant relance ce script)
+    import logs
+    logs.setup()
+    raise SystemExit(sharding.launch_clusters(os.path.abspath(__file__)))
+
 import discord
 from discord.ext import commands
-from discord import ui
-import os
+from discord import app_commands, ui
+import json
+import time
+import hashlib
+import asyncio
 import logging
 import random
-from typing import List, Tuple, Optional, Dict, Any
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
 import math
-# --- Ajouts pour le serveur web ---
-from flask import Flask
-from threading import Thread
-# ---------------------------------
+import corpus
+import instrumentation
+import layout
+import linkcheck
+import locales
+import logs
+import preferences
+import quizengine
+import ratelimit
+import references
+import routing
+import sampling
+import scores
+import search
+import sessions
+import storage
+import subscriptions
+import webserver
+from render import RenderCache
+from corpus import Book, QuizQuestion
 
 # --- Configuration du Logger ---
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s:%(levelname)s:%(name)s: %(message)s')
+# File + thread d'écriture, JSON par défaut (voir logs.py)
+logs.setup()
 logger = logging.getLogger('HadithSahih')
 
 # --- Configuration du Bot et des Intents ---
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
-
-bot = commands.Bot(command_prefix='hs!', intents=intents)
+# Les commandes slash n'ont besoin que de l'intent guilds : sans autre option,
+# le gateway n'envoie aucun message au bot.
+#   HS_PREFIX_COMMANDS=1 (défaut) : commandes hs!, avec les messages et leur
+#     contenu (intent privilégié). Activé par défaut : l'aide, les messages
+#     d'usage et les habitudes des serveurs existants reposent sur hs!.
+#   HS_MENTION_COMMANDS=1 : « @HadithSahih hadith » sans les commandes hs! ;
+#     reçoit les messages, mais seuls ceux qui mentionnent le bot gardent leur
+#     contenu, sans intent privilégié.
+PREFIX_COMMANDS = os.environ.get('HS_PREFIX_COMMANDS', '1') == '1'
+MENTION_COMMANDS = PREFIX_COMMANDS or os.environ.get('HS_MENTION_COMMANDS', '0') == '1'
+# Pas d'Intents.default() : ni réactions, ni saisie, ni vocal, ni invitations
+intents = discord.Intents.none()
+intents.guilds = True
+intents.guild_messages = MENTION_COMMANDS
+intents.dm_messages = MENTION_COMMANDS
+intents.message_content = PREFIX_COMMANDS
+
+# AutoShardedBot si HS_SHARDING vaut "auto" ou "cluster" (voir sharding.py)
+BotClass = commands.AutoShardedBot if sharding.ENABLED else commands.Bot
+bot = BotClass(command_prefix=commands.when_mentioned_or('hs!') if PREFIX_COMMANDS else commands.when_mentioned,
+               intents=intents, **sharding.bot_options())
 
 # --- Constantes de Pagination ---
-BOOKS_PER_PAGE = 10 
+# Au plus ; la page se coupe plus tôt si sa description dépasserait 4096 caractères
+BOOKS_PER_PAGE = 10
 
-# --- Sources de la Bibliographie (Dictionnaire par langue) ---
-BIBLIO_SOURCES = {
-    "FR": "• Site officiel de la mosquée de Médine\n• Site officiel du gouvernement Saoudien",
-    "ENG": "• Official website of the Prophet's Mosque (Medina)\n• Official website of the Saudi Government"
-}
+# --- Cache de Rendu (embeds précalculés par version du corpus) ---
+render_cache = RenderCache()
 
-# --- Fonctions Utilitaires de Fichier ---
+# --- Fonctions de Génération d'Embeds ---
 
-def get_random_hadith(file_path: str = "hadiths_eng.txt") -> str:
-    """Lit un fichier et renvoie une ligne aléatoire."""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            hadiths = [h.strip() for h in f.readlines() if h.strip()]
-            return random.choice(hadiths) if hadiths else "Empty file."
-    except FileNotFoundError:
-        return f"Error: {file_path} not found."
-    except Exception as e:
-        return "An error occurred."
-
-# MODIFIÉ : Fonction générique pour lire n'importe quel fichier de livres
-def get_books(file_path: str) -> List[Tuple[str, str]] | None:
-    """
-    Lit le fichier des livres. 
-    Format attendu : [LIEN] [TITRE]
-    """
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            books = []
-            for line in f:
-                line = line.strip()
-                if not line or not line.startswith('[') or ']' not in line:
-                    continue
-                try:
-                    # Trouver le lien (premier crochet)
-                    link_end = line.find(']')
-                    link = line[1:link_end].strip()
-                    
-                    # Trouver le titre (deuxième crochet)
-                    title_start = line.find('[', link_end + 1)
-                    title_end = line.find(']', title_start + 1)
-
-                    if link and title_start != -1 and title_end != -1:
-                        title = line[title_start + 1:title_end].strip()
-                        if title:
-                            books.append((title, link))
-                except Exception as e:
-                    logger.warning(f"Ligne ignorée : {line}. Erreur: {e}")
-                    continue
-            return books
-    except FileNotFoundError:
-        logger.error(f"Fichier non trouvé: {file_path}")
-        return None
-    except Exception as e:
-        logger.error(f"Erreur lecture {file_path}: {e}")
-        return None
+LANGUAGE_CODES = "|".join(corpus.LANGUAGES)  # pour les messages d'usage : FR|ENG
 
-def get_quiz_questions(file_path: str) -> List[Dict[str, Any]] | None:
-    """
-    Lit le fichier de quiz et retourne une liste de questions.
-    Format attendu : [Question] [Bonne réponse] [Mauvaise 1] [Mauvaise 2]
-    """
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            questions = []
-            for line in f:
-                line = line.strip()
-                if not line or not line.startswith('['):
-                    continue
-                
-                parts = []
-                current_pos = 0
-                
-                # Parser tous les crochets
-                while True:
-                    start = line.find('[', current_pos)
-                    if start == -1:
-                        break
-                    end = line.find(']', start + 1)
-                    if end == -1:
-                        break
-                    parts.append(line[start + 1:end].strip())
-                    current_pos = end + 1
-                
-                # Vérifier qu'on a bien 4 parties (question + 3 réponses)
-                if len(parts) == 4:
-                    question_data = {
-                        "question": parts[0],
-                        "correct": parts[1],
-                        "wrong1": parts[2],
-                        "wrong2": parts[3]
-                    }
-                    questions.append(question_data)
-            
-            return questions if questions else None
-    except FileNotFoundError:
-        logger.error(f"Fichier non trouvé: {file_path}")
-        return None
-    except Exception as e:
-        logger.error(f"Erreur lecture quiz {file_path}: {e}")
-        return None
+# Ordre des commandes dans hs!commands ; textes dans locale_<langue>.txt (help.<commande>.*)
+HELP_COMMANDS = ("hadith", "book", "search", "quiz", "leaderboard", "stats", "language", "subscribe",
+                 "site", "commands", "ping", "info")
 
-# --- Fonctions de Génération d'Embeds ---
+def build_commands_embed(lang: str) -> discord.Embed:
+    strings = locales.get(lang).strings
+    embed = discord.Embed(
+        title=strings["commands.title"],
+        description=strings["commands.description"],
+        color=discord.Color.purple()
+    )
+    for name in HELP_COMMANDS:
+        usage = strings[f"help.{name}.usage"].format(languages=LANGUAGE_CODES)
+        embed.add_field(name=f" • {usage}", value=f"*{strings[f'help.{name}.text']}*", inline=False)
+    return embed
 
 def get_commands_embed(lang: str) -> discord.Embed:
-    if lang == "FR":
-        embed = discord.Embed(
-            title="Commandes de HadithSahih",
-            description="Toutes les commandes de ce bot :satellite:",
-            color=discord.Color.purple()
-        )
-        commands_list = [
-            (" • hs!hadith", "*Affiche un hadith sahih aléatoire*"),
-            (" • hs!book", "*Affiche une liste de livres islamiques*"),
-            (" • hs!quiz", "*Lance un quiz sur l'Islam*"),
-            (" • hs!site", "*Lien vers le site web*"),
-            (" • hs!commands", "*Toutes les commandes du bot*"),
-            (" • hs!ping", "*Vérifie la latence du bot*"),
-            (" • hs!info", "*Informations sur le bot*")
-        ]
-    else:
-        embed = discord.Embed(
-            title="HadithSahih's Commands",
-            description="All commands for this bot :satellite:",
-            color=discord.Color.purple()
-        )
-        commands_list = [
-            (" • hs!hadith", "*Displays a random Sahih hadith*"),
-            (" • hs!book", "*Displays a list of Islamic books*"),
-            (" • hs!quiz", "*Start a quiz about Islam*"),
-            (" • hs!site", "*Link to the website*"),
-            (" • hs!commands", "*All commands for this bot*"),
-            (" • hs!ping", "*Check the bot's latency*"),
-            (" • hs!info", "*Bot information*")
-        ]
-
-    for name, value in commands_list:
-        embed.add_field(name=name, value=value, inline=False)
-    return embed
+    """Embed des commandes, construit une fois par version du corpus."""
+    return render_cache.get(("commands", lang), corpus.store.snapshot.version,
+                            lambda: build_commands_embed(lang))
 
 def get_info_embed(lang: str, server_count: int) -> discord.Embed:
     # Toujours description FR et champs ENG comme demandé
@@ -172,54 +108,106 @@ def get_info_embed(lang: str, server_count: int) -> discord.Embed:
         description="Des Hadiths Sahih pour vous chaque jour ! :books:", 
         color=discord.Color.pink())
     embed.add_field(name="Owner", value="@n9rs9", inline=True)
-    embed.add_field(name="Servers", value="??", inline=True)
+    embed.add_field(name="Servers", value=str(server_count), inline=True)
     return embed
 
-def get_hadith_embed(lang: str) -> discord.Embed:
-    if lang == "FR":
-        hadith_text = get_random_hadith("hadiths_fr.txt")
-        embed = discord.Embed(title="✨ Hadith Sahih Aléatoire", description=hadith_text, color=discord.Color.blue())
-        footer_text = "رَبِّ زِدْنِي عِلْمًا - Rabbi zidnī ʿilman - Mon Seigneur, augmente ma connaissance"
+corpus.store.add_index("refs", references.build_index)
+
+def draw_hadith(lang: str, scope: Optional[int] = None) -> Optional[int]:
+    """Indice d'un hadith du corpus en mémoire, sans répétition pour une même portée."""
+    with instrumentation.timed(instrumentation.LOOKUP, lookup="hadith"):
+        hadiths = corpus.store.get(lang).hadiths
+        if not hadiths:
+            return None
+        return sampling.sampler.draw(scope, lang, len(hadiths))
+
+def lookup_hadith(lang: str, reference: str) -> Optional[int]:
+    """Indice du hadith désigné par « bukhari 15 » ou « muslim 1:23 » (livre:hadith)."""
+    collection, _, number = reference.strip().rpartition(" ")
+    if not collection or not number:
+        return None
+    with instrumentation.timed(instrumentation.LOOKUP, lookup="reference"):
+        return corpus.store.snapshot.index("refs", lang).lookup(collection, number)
+
+def sampling_scope(source: commands.Context | discord.Interaction) -> Optional[int]:
+    """Portée du sac de tirage : le salon, ou le serveur selon HS_SAMPLER_SCOPE."""
+    if sampling.SCOPE == "guild" and source.guild is not None:
+        return source.guild.id
+    return source.channel.id
+
+def build_hadith_embeds(lang: str, doc_id: Optional[int]) -> tuple[discord.Embed, ...]:
+    """Embeds d'un hadith : un hadith trop long continue dans les embeds suivants du message."""
+    strings = locales.get(lang).strings
+    if doc_id is None:
+        hadith_text, ref = strings["hadith.empty"], None
     else:
-        hadith_text = get_random_hadith("hadiths_eng.txt")
-        embed = discord.Embed(title="✨ Random Sahih Hadith", description=hadith_text, color=discord.Color.blue())
-        footer_text = "رَبِّ زِدْنِي عِلْمًا - Rabbi zidnī ʿilman - My Lord, increase me in knowledge"
-    
-    embed.set_footer(text=footer_text)
-    return embed
+        refs = corpus.store.snapshot.index("refs", lang)
+        hadith_text, ref = refs.body(doc_id), refs.refs[doc_id]
+    title, footer = strings["hadith.title"], strings["hadith.footer"]
+    fields = []
+    if ref is not None:
+        fields.append((strings["hadith.reference"], layout.truncate(ref.display(), layout.FIELD_VALUE)))
+        if ref.grade:
+            fields.append((strings["hadith.grade"], layout.truncate(ref.grade, layout.FIELD_VALUE)))
+
+    # Tous les embeds d'un message partagent 6000 caractères : au-delà, le texte est coupé
+    budget = layout.MESSAGE_TOTAL - layout.embed_size(title, "", fields, footer)
+    chunks = layout.split_text(layout.truncate(hadith_text, budget), layout.DESCRIPTION)
+    embeds = []
+    for i, chunk in enumerate(chunks):
+        embed = discord.Embed(title=title if i == 0 else None, description=chunk, color=discord.Color.blue())
+        embeds.append(embed)
+    for name, value in fields:
+        embeds[-1].add_field(name=name, value=value, inline=True)
+    embeds[-1].set_footer(text=footer)
+    return tuple(embeds)
+
+def get_hadith_embeds_at(lang: str, doc_id: Optional[int]) -> tuple[discord.Embed, ...]:
+    """Embeds d'un hadith précis, construits une fois par version du corpus."""
+    return render_cache.get(("hadith", lang, doc_id), corpus.store.snapshot.version,
+                            lambda: build_hadith_embeds(lang, doc_id))
+
+def get_hadith_embeds(lang: str, scope: Optional[int] = None) -> tuple[discord.Embed, ...]:
+    return get_hadith_embeds_at(lang, draw_hadith(lang, scope))
 
 # --- Pagination des Livres (MODIFIÉ pour la langue) ---
 
-def get_book_page_embed(books: List[Tuple[str, str]], page_num: int, total_pages: int, lang: str) -> discord.Embed:
+def book_link_note(strings: Mapping[str, str], link: str) -> str:
+    """Taille du PDF, ou lien signalé cassé, d'après le dernier passage de linkcheck."""
+    status = linkcheck.checker.get(link)
+    if status is None:
+        return ""
+    if not status.ok:
+        return f" • {strings['book.broken']}"
+    if status.size is None:
+        return ""
+    if status.size >= 1_000_000:
+        return " • " + strings["book.size_mb"].format(size=status.size / 1_000_000)
+    return " • " + strings["book.size_kb"].format(size=status.size / 1000)
+
+
+def book_header(strings: Mapping[str, str], page_num: int) -> str:
+    if page_num == 0:
+        return f"**{strings['book.sources']}**\n\n{strings['book.instruction']}\n\n"
+    return f"{strings['book.instruction']}\n\n"
+
+def book_line(strings: Mapping[str, str], number: int, book: Book, budget: int) -> str:
+    """Ligne d'un livre ; le titre est raccourci si la ligne seule dépasse budget."""
+    note = book_link_note(strings, book.link)
+    line = f"**{number}.** [{book.title}]({book.link}){note}\n"
+    if len(line) > budget:
+        title = layout.truncate(book.title, max(1, len(book.title) - (len(line) - budget)))
+        line = f"**{number}.** [{title}]({book.link}){note}\n"
+    return line
+
+def get_book_page_embed(description_list: str, page_num: int, total_pages: int, lang: str) -> discord.Embed:
     """Génère l'embed pour une page de livres avec gestion de langue."""
-    global BOOKS_PER_PAGE 
-    
-    start_index = page_num * BOOKS_PER_PAGE
-    end_index = start_index + BOOKS_PER_PAGE
-    page_books = books[start_index:end_index]
-
-    description_list = ""
-    for i, (title, link) in enumerate(page_books, start=start_index + 1):
-        description_list += f"**{i}.** [{title}]({link})\n"
-
     # Textes traduits
-    if lang == "FR":
-        title_text = "📚 Bibliographie"
-        instruction = "*Copiez le lien et collez-le si cela ne fonctionne pas*"
-        sources = BIBLIO_SOURCES["FR"]
-        empty_msg = "**Fin de la bibliographie.**" if page_num > 0 else "**Aucun livre trouvé.**"
-        footer_pg = f"Page {page_num + 1}/{total_pages}"
-    else:
-        title_text = "📚 Bibliography"
-        instruction = "*Copy the link and paste it if it doesn't work*"
-        sources = BIBLIO_SOURCES["ENG"]
-        empty_msg = "**End of bibliography.**" if page_num > 0 else "**No books found.**"
-        footer_pg = f"Page {page_num + 1}/{total_pages}"
-
-    if page_num == 0:
-        header_text = f"**{sources}**\n\n{instruction}\n\n"
-    else:
-        header_text = f"{instruction}\n\n"
+    strings = locales.get(lang).strings
+    title_text = strings["book.title"]
+    empty_msg = strings["book.end"] if page_num > 0 else strings["book.empty"]
+    footer_pg = f"Page {page_num + 1}/{total_pages}"
+    header_text = book_header(strings, page_num)
 
     full_description = f"{header_text}{description_list}" if description_list else f"{header_text}{empty_msg}"
     
@@ -228,39 +216,108 @@ def get_book_page_embed(books: List[Tuple[str, str]], page_num: int, total_pages
     return embed
 
 
-class BookBrowser(ui.View):
-    """Vue interactive pour naviguer entre les pages."""
+def build_book_pages(books: Sequence[Book], lang: str) -> tuple[discord.Embed, ...]:
+    """Construit toutes les pages de la bibliographie d'une langue, coupées selon leur taille."""
+    strings = locales.get(lang).strings
+    first_budget = layout.DESCRIPTION - len(book_header(strings, 0))
+    budget = layout.DESCRIPTION - len(book_header(strings, 1))
+    lines = [book_line(strings, number, book, min(first_budget, budget))
+             for number, book in enumerate(books, start=1)]
+    breaks = layout.paginate([len(line) for line in lines], budget, BOOKS_PER_PAGE, first_budget)
+    # FORCE 2 PAGES MINIMUM (même si vide) comme demandé
+    total_pages = max(len(breaks), 2) if books else 0
+    breaks += [(len(lines), len(lines))] * (total_pages - len(breaks))
+    return tuple(get_book_page_embed("".join(lines[start:end]), page, total_pages, lang)
+                 for page, (start, end) in enumerate(breaks))
+
+def get_book_pages(lang: str) -> tuple[discord.Embed, ...]:
+    """Pages de la bibliographie, construites une fois par version du corpus."""
+    with instrumentation.timed(instrumentation.LOOKUP, lookup="book_pages"):
+        snapshot = corpus.store.snapshot
+        return render_cache.get(("book", lang), snapshot.version,
+                                lambda: build_book_pages(snapshot.get(lang).books, lang))
+
+def prerender(snapshot: corpus.CorpusSnapshot):
+    """Précalcule les embeds statiques dès qu'un snapshot est installé."""
+    render_cache.invalidate(snapshot.version)
+    for lang in snapshot.languages:
+        get_book_pages(lang)
+        get_commands_embed(lang)
+
+corpus.store.add_listener(prerender)
+# Un lien cassé ou réparé, une taille qui change : pages de hs!book à refaire
+linkcheck.checker.on_change = lambda: prerender(corpus.store.snapshot) if corpus.store.loaded else None
+
+
+class SessionView(ui.View):
+    """Vue comptée dans le registre des sessions (sessions.py).
+
+    Ne garde que les identifiants de l'auteur et du salon, pas le contexte de
+    la commande. Les attributs nommés dans `shared` référencent le corpus ou le
+    cache de rendu et ne comptent pas dans l'estimation mémoire.
+    """
+
+    kind = "view"
+    shared: Tuple[str, ...] = ()
+
+    def __init__(self, source: commands.Context | discord.Interaction, timeout: float):
+        super().__init__(timeout=timeout)
+        # Context.author ou Interaction.user
+        author = getattr(source, 'author', None) or source.user
+        self.author_id = author.id
+        self.guild_id = source.guild.id if source.guild else None
+        self.channel_id = source.channel.id
+        self.message: Optional[discord.Message] = None
+
+    def open_session(self):
+        """À appeler une fois la vue prête : ferme les vues qu'elle remplace."""
+        for old in sessions.registry.open(self.author_id, self.channel_id, self.kind, self, self.shared):
+            old.stop()
+            asyncio.create_task(old.disable())
+
+    def stop(self):
+        sessions.registry.close(self.author_id, self.channel_id, self)
+        super().stop()
+
+    async def disable(self):
+        for item in self.children:
+            item.disabled = True
+        try:
+            if self.message: await instrumentation.api_call("edit", self.message.edit(view=self))
+        except discord.HTTPException as e:
+            # Message supprimé ou permissions retirées : rien à désactiver
+            instrumentation.record_error(f"on_timeout:{self.kind}", e)
+
+    async def on_timeout(self):
+        instrumentation.TIMEOUTS.inc(view=self.kind)
+        sessions.registry.close(self.author_id, self.channel_id, self)
+        await self.disable()
+
+    def foreign_user_message(self) -> str:
+        return "This is not your command! / Ce n'est pas ta commande!"
+
+    async def check_author(self, interaction: discord.Interaction) -> bool:
+        return not await reject_foreign_user(interaction, self.author_id, self.foreign_user_message())
+
 
-    def __init__(self, ctx: commands.Context, books: List[Tuple[str, str]], lang: str):
-        super().__init__(timeout=180)
-        self.ctx = ctx
-        self.books = books
+class BookBrowser(SessionView):
+    """Vue interactive pour naviguer entre les pages précalculées."""
+
+    kind = "book"
+    shared = ("pages",)
+
+    def __init__(self, source: commands.Context | discord.Interaction, pages: Sequence[discord.Embed], lang: str):
+        super().__init__(source, timeout=180)
+        self.pages = pages  # pages du cache de rendu, partagées
         self.lang = lang  # On stocke la langue
-        self.total_books = len(books)
-        self.total_pages = math.ceil(self.total_books / BOOKS_PER_PAGE)
+        self.total_pages = len(pages)
         self.current_page = 0
-        self.message: Optional[discord.Message] = None 
-        
-        # FORCE 2 PAGES MINIMUM (même si vide) comme demandé
-        if self.total_pages < 2 and self.total_books > 0:
-            self.total_pages = 2 
         
         self.update_buttons()
+        self.open_session()
 
-    async def on_timeout(self):
-        for item in self.children:
-            item.disabled = True
-        try:
-            if self.message: await self.message.edit(view=self)
-        except: pass
-
-    def check_author(self, interaction: discord.Interaction) -> bool:
-        if interaction.user != self.ctx.author:
-            msg = "Ce n'est pas ta commande!" if self.lang == "FR" else "This is not your command!"
-            if not interaction.response.is_done():
-                interaction.response.send_message(msg, ephemeral=True)
-            return False
-        return True
+    def foreign_user_message(self) -> str:
+        return locales.text(self.lang, "not_your_command")
 
     def update_buttons(self):
         left_button = self.children[0]
@@ -287,56 +344,225 @@ class BookBrowser(ui.View):
             right_button.emoji = "➡️"
 
     @ui.button(style=discord.ButtonStyle.primary, emoji="⬅️")
+    @instrumentation.interaction_handler("book_page")
     async def previous_page(self, interaction: discord.Interaction, button: ui.Button):
-        if not self.check_author(interaction): return
+        if not await self.check_author(interaction): return
         
         if self.current_page > 0:
             self.current_page -= 1
             self.update_buttons()
-            # On passe self.lang ici
-            embed = get_book_page_embed(self.books, self.current_page, self.total_pages, self.lang)
-            await interaction.response.edit_message(embed=embed, view=self)
+            embed = self.pages[self.current_page]
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(embed=embed, view=self))
         else:
-            await interaction.response.edit_message(view=self) 
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(view=self))
 
     @ui.button(style=discord.ButtonStyle.primary, emoji="➡️")
+    @instrumentation.interaction_handler("book_page")
     async def next_page(self, interaction: discord.Interaction, button: ui.Button):
-        if not self.check_author(interaction): return
+        if not await self.check_author(interaction): return
         
         if self.current_page < self.total_pages - 1:
             self.current_page += 1
             self.update_buttons()
-            # On passe self.lang ici
-            embed = get_book_page_embed(self.books, self.current_page, self.total_pages, self.lang)
-            await interaction.response.edit_message(embed=embed, view=self)
+            embed = self.pages[self.current_page]
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(embed=embed, view=self))
         else:
-            await interaction.response.edit_message(view=self)
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(view=self))
+
+# --- Recherche ---
+
+SEARCH_RESULTS_PER_PAGE = 5
+SEARCH_MAX_RESULTS = 25
+SEARCH_SNIPPET_LENGTH = 350
+
+corpus.store.add_index("search", search.build_index)
+
+def get_search_pages(lang: str, query: str) -> tuple[discord.Embed, ...]:
+    """Pages de résultats BM25 pour une requête, au format de la bibliographie."""
+    snapshot = corpus.store.snapshot
+    with instrumentation.timed(instrumentation.LOOKUP, lookup="search"):
+        results = snapshot.index("search", lang).search(query, SEARCH_MAX_RESULTS)
+    hadiths = snapshot.get(lang).hadiths
+
+    title = layout.truncate(locales.text(lang, "search.title", query=query), layout.TITLE)
+    if not results:
+        return (discord.Embed(title=title, description=locales.text(lang, "search.empty"), color=discord.Color.blue()),)
+
+    total_pages = math.ceil(len(results) / SEARCH_RESULTS_PER_PAGE)
+    count_text = locales.text(lang, "search.count", count=len(results))
+    pages = []
+    for page_num in range(total_pages):
+        start_index = page_num * SEARCH_RESULTS_PER_PAGE
+        page_results = results[start_index:start_index + SEARCH_RESULTS_PER_PAGE]
+        entries = []
+        for rank, (doc_id, score) in enumerate(page_results, start=start_index + 1):
+            text = hadiths[doc_id]
+            if len(text) > SEARCH_SNIPPET_LENGTH:
+                text = text[:SEARCH_SNIPPET_LENGTH].rstrip() + "…"
+            entries.append(f"**{rank}.** {text}")
+        embed = discord.Embed(title=title, description="\n\n".join(entries), color=discord.Color.blue())
+        embed.set_footer(text=f"Page {page_num + 1}/{total_pages} • {count_text}")
+        pages.append(embed)
+    return tuple(pages)
 
 # --- Vue Quiz ---
 
-class QuizView(ui.View):
-    """Vue interactive pour le quiz avec 3 questions."""
+def get_question_embed(q: QuizQuestion, index: int, total: int) -> discord.Embed:
+    """Génère l'embed pour la question numéro index (à partir de 0) sur total."""
+    # Titre et couleur uniformes
+    title = f"📝 Quiz - Question {index + 1}/{total}"
+    color = discord.Color.green()
+    
+    embed = discord.Embed(
+        title=title,
+        description=f"**{layout.truncate(q.question, layout.DESCRIPTION - 4)}**",
+        color=color
+    )
+    return embed
+
+# Longueur maximale d'une question dans le résumé : une ligne doit tenir dans un field
+QUIZ_SUMMARY_QUESTION = 900
+
+def get_quiz_result_embed(lang: str, score: int, history: List[Dict[str, Any]]) -> discord.Embed:
+    """Génère l'embed du résultat final avec le résumé."""
+    total = len(history)
+    # Paliers proportionnels à la longueur du quiz (2/3 et 1/3 des réponses)
+    perfect, good, fair = score == total, score * 3 >= total * 2, score > 0 and score * 3 >= total
+
+    # 1. Textes de la langue
+    strings = locales.get(lang).strings
+    title = strings["quiz.title"]
+    score_text = strings["quiz.score"].format(score=score, total=total)
+    summary_title = strings["quiz.summary"]
+    message = strings["quiz.perfect" if perfect else "quiz.good" if good else "quiz.fair" if fair else "quiz.low"]
+    
+    # 2. Création de l'Embed de base
+    embed = discord.Embed(
+        title=title,
+        description=score_text,
+        color=discord.Color.gold()
+    )
+
+    # 3. Construction du résumé (Format demandé)
+    # Un field est limité à 1024 caractères : les quiz longs sont répartis sur plusieurs.
+    # Le message entier est limité à 6000 : les questions les plus longues sont raccourcies.
+    answers = [layout.truncate(item["correct_answer"], layout.BUTTON_LABEL) for item in history]
+    fixed = sum(len(f":white_check_mark: **** : {answer}\n") for answer in answers)
+    # len(history) : noms « \u200b » des fields de résumé supplémentaires, au pire un par ligne
+    budget = (layout.MESSAGE_TOTAL - fixed - len(history)
+              - layout.embed_size(title, score_text, ((summary_title, ""), ("\u200b", f"*{message}*"))))
+    questions = layout.fit_total([layout.truncate(item["question"], QUIZ_SUMMARY_QUESTION) for item in history], budget)
+    lines = []
+    for item, question, answer in zip(history, questions, answers):
+        emoji = ":white_check_mark:" if item["is_correct"] else ":no_entry:"
+        # Format: Emoji 'Question' : 'Bonne réponse'
+        lines.append(f"{emoji} **{question}** : {answer}\n")
+    chunks = layout.pack_lines(lines, layout.FIELD_VALUE)
+
+    # Ajout du Field Résumé
+    for i, chunk in enumerate(chunks):
+        embed.add_field(name=summary_title if i == 0 else "\u200b", value=chunk, inline=False)
+
+    # 4. Ajout du message d'encouragement (dans un field séparé pour être en bas)
+    # \u200b est un caractère invisible pour faire un titre vide
+    embed.add_field(name="\u200b", value=f"*{message}*", inline=False)
+    
+    return embed
+
+
+LEADERBOARD_SIZE = 10
+
+def get_leaderboard_embed(lang: str, guild_name: Optional[str], ranking: scores.Ranking, user_id: int) -> discord.Embed:
+    """Top LEADERBOARD_SIZE du serveur (ou global si guild_name est None)."""
+    strings = locales.get(lang).strings
+    title = strings["leaderboard.title"].format(guild=guild_name) if guild_name else strings["leaderboard.global"]
+    empty, unit, you = strings["leaderboard.empty"], strings["leaderboard.unit"], strings["leaderboard.you"]
+    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+    lines = [f"{medals.get(rank, f'**{rank}.**')} <@{member_id}> • {totals.correct} {unit} ({totals.quizzes} quiz)"
+             for rank, (member_id, totals) in enumerate(ranking.top(LEADERBOARD_SIZE), start=1)]
+    embed = discord.Embed(title=title, description="\n".join(lines) or empty, color=discord.Color.gold())
+    rank = ranking.rank(user_id)
+    if rank is not None:
+        embed.set_footer(text=f"{you} : {rank}/{len(ranking)}")
+    return embed
+
+def get_stats_embed(lang: str, user: discord.abc.User, guild_name: Optional[str],
+                    local: Tuple[Optional[scores.Totals], Optional[int], int],
+                    overall: Tuple[Optional[scores.Totals], Optional[int], int]) -> discord.Embed:
+    """Statistiques de quiz d'un utilisateur : (totaux, place, joueurs) par portée."""
+    strings = locales.get(lang).strings
+    title, none = strings["stats.title"].format(name=user.display_name), strings["stats.none"]
+    labels = tuple(strings[f"stats.{key}"] for key in ("quizzes", "correct", "accuracy", "perfect", "rank"))
+    scopes = (guild_name or strings["stats.server"], strings["stats.global"])
+    embed = discord.Embed(title=title, color=discord.Color.purple())
+    for scope_name, (totals, rank, players) in zip(scopes, (local, overall)):
+        if totals is None:
+            if guild_name or scope_name == scopes[1]:
+                embed.add_field(name=scope_name, value=none, inline=False)
+            continue
+        value = (f"{labels[0]} : **{totals.quizzes}**\n"
+                 f"{labels[1]} : **{totals.correct}/{totals.answered}**\n"
+                 f"{labels[2]} : **{totals.accuracy:.0%}**\n"
+                 f"{labels[3]} : **{totals.perfect}**\n"
+                 f"{labels[4]} : **{rank}/{players}**")
+        embed.add_field(name=scope_name, value=value, inline=True)
+    return embed
+
+
+def quiz_length(text: str) -> int:
+    """Longueur demandée (hs!quiz 5), bornée à HS_QUIZ_MAX_LENGTH."""
+    length = int(text) if text.isdigit() else quizengine.QUIZ_LENGTH
+    return max(1, min(length, quizengine.MAX_QUIZ_LENGTH))
+
+async def draw_quiz(lang: str, user_id: int, length: int) -> Optional[List[int]]:
+    """Indices des questions, choisies selon l'historique du joueur ; None si la banque est trop petite."""
+    snapshot = corpus.store.snapshot
+    questions = snapshot.get(lang).questions
+    if len(questions) < corpus.MIN_QUIZ_QUESTIONS:
+        return None
+    with instrumentation.timed(instrumentation.LOOKUP, lookup="quiz"):
+        return await quizengine.engine.select(user_id, lang, questions, snapshot.version, length)
+
+def finish_quiz(user_id: int, guild_id: Optional[int], lang: str, questions: Sequence[QuizQuestion], outcomes: List[bool]):
+    """Met à jour l'historique adaptatif et enregistre le score."""
+    history = quizengine.engine.record(user_id, lang, questions, outcomes)
+    scores.board.record(user_id, guild_id, lang, sum(outcomes), len(outcomes), history)
 
-    def __init__(self, ctx: commands.Context, questions: List[Dict[str, Any]], lang: str):
-        super().__init__(timeout=180)
-        self.ctx = ctx
-        self.questions = questions
+
+class QuizView(SessionView):
+    """Vue interactive pour le quiz (quizengine.QUIZ_LENGTH questions par défaut)."""
+
+    kind = "quiz"
+    shared = ("questions",)
+
+    def __init__(self, source: commands.Context | discord.Interaction, questions: Sequence[QuizQuestion],
+                 indices: Sequence[int], lang: str):
+        super().__init__(source, timeout=180)
+        self.questions = questions  # banque du corpus, partagée
+        self.indices = tuple(indices)  # questions tirées, dans l'ordre
         self.lang = lang
         self.current_question = 0
         self.score = 0
-        self.history = []  # NOUVEAU : Pour stocker le résumé
-        self.message: Optional[discord.Message] = None
+        self.outcomes: List[bool] = []  # Pour le résumé final
         
         # Mélanger les réponses pour la première question
         self.shuffle_answers()
         self.create_buttons()
+        self.open_session()
+
+    def foreign_user_message(self) -> str:
+        return locales.text(self.lang, "quiz.not_yours")
+
+    @property
+    def question(self) -> QuizQuestion:
+        return self.questions[self.indices[self.current_question]]
 
     def shuffle_answers(self):
         """Mélange les réponses pour la question actuelle."""
-        q = self.questions[self.current_question]
-        self.answers = [q["correct"], q["wrong1"], q["wrong2"]]
+        q = self.question
+        self.answers = [q.correct, q.wrong1, q.wrong2]
         random.shuffle(self.answers)
-        self.correct_answer = q["correct"]
+        self.correct_answer = q.correct
 
     def create_buttons(self):
         """Crée les boutons de réponse."""
@@ -344,7 +570,7 @@ class QuizView(ui.View):
         
         for i, answer in enumerate(self.answers):
             button = ui.Button(
-                label=answer,
+                label=layout.truncate(answer, layout.BUTTON_LABEL),
                 style=discord.ButtonStyle.primary,
                 custom_id=f"answer_{i}"
             )
@@ -353,10 +579,9 @@ class QuizView(ui.View):
 
     def create_answer_callback(self, answer: str):
         """Crée un callback pour un bouton de réponse."""
+        @instrumentation.interaction_handler("quiz_answer")
         async def callback(interaction: discord.Interaction):
-            if interaction.user != self.ctx.author:
-                msg = "Ce n'est pas ton quiz!" if self.lang == "FR" else "This is not your quiz!"
-                await interaction.response.send_message(msg, ephemeral=True)
+            if not await self.check_author(interaction):
                 return
             
             # Vérifier la réponse
@@ -364,280 +589,943 @@ class QuizView(ui.View):
             if is_correct:
                 self.score += 1
             
-            # NOUVEAU : Sauvegarder le résultat pour le résumé final
-            current_q_text = self.questions[self.current_question]["question"]
-            self.history.append({
-                "question": current_q_text,
-                "correct_answer": self.correct_answer,
-                "is_correct": is_correct
-            })
+            # Sauvegarder le résultat pour le résumé final
+            self.outcomes.append(is_correct)
 
             # Passer à la question suivante
             self.current_question += 1
             
-            if self.current_question < len(self.questions):
+            if self.current_question < len(self.indices):
                 # Encore des questions
                 self.shuffle_answers()
                 self.create_buttons()
                 embed = self.get_question_embed()
-                await interaction.response.edit_message(embed=embed, view=self)
+                await instrumentation.api_call("edit_message", interaction.response.edit_message(embed=embed, view=self))
             else:
                 # Fin du quiz
+                finish_quiz(self.author_id, self.guild_id, self.lang,
+                            [self.questions[i] for i in self.indices], self.outcomes)
                 embed = self.get_result_embed()
                 self.clear_items()
-                await interaction.response.edit_message(embed=embed, view=self)
+                self.stop()
+                await instrumentation.api_call("edit_message", interaction.response.edit_message(embed=embed, view=self))
         
         return callback
 
     def get_question_embed(self) -> discord.Embed:
         """Génère l'embed pour la question actuelle."""
-        q = self.questions[self.current_question]
-        
-        # Titre et couleur uniformes
-        title = f"📝 Quiz - Question {self.current_question + 1}/3"
-        color = discord.Color.green()
-        
-        embed = discord.Embed(
-            title=title,
-            description=f"**{q['question']}**",
-            color=color
-        )
-        return embed
+        return get_question_embed(self.question, self.current_question, len(self.indices))
 
     def get_result_embed(self) -> discord.Embed:
         """Génère l'embed du résultat final avec le résumé."""
-        
-        # 1. Définition des textes selon la langue
-        if self.lang == "FR":
-            title = "🏆 Résultat du Quiz"
-            score_text = f"**Score : {self.score}/3**"
-            summary_title = "📝 Résumé des questions"
-            
-            if self.score == 3:
-                message = "Parfait ! Macha Allah ! 🌟"
-            elif self.score == 2:
-                message = "Très bien ! Continue comme ça ! 💎"
-            elif self.score == 1:
-                message = "Pas mal ! Tu peux faire mieux ! 💪"
-            else:
-                message = "Continue d'apprendre ! 📚"
-        else:
-            title = "🏆 Quiz Result"
-            score_text = f"**Score: {self.score}/3**"
-            summary_title = "📝 Questions Summary"
-            
-            if self.score == 3:
-                message = "Perfect! Masha Allah! 🌟"
-            elif self.score == 2:
-                message = "Very good! Keep it up! 💎"
-            elif self.score == 1:
-                message = "Not bad! You can do better! 💪"
-            else:
-                message = "Keep learning! 📚"
-        
-        # 2. Création de l'Embed de base
-        embed = discord.Embed(
-            title=title,
-            description=score_text,
-            color=discord.Color.gold()
-        )
-
-        # 3. Construction du résumé (Format demandé)
-        summary_content = ""
-        for item in self.history:
-            emoji = ":white_check_mark:" if item["is_correct"] else ":no_entry:"
-            # Format: Emoji 'Question' : 'Bonne réponse'
-            summary_content += f"{emoji} **{item['question']}** : {item['correct_answer']}\n"
-
-        # Ajout du Field Résumé
-        embed.add_field(name=summary_title, value=summary_content, inline=False)
-
-        # 4. Ajout du message d'encouragement (dans un field séparé pour être en bas)
-        # \u200b est un caractère invisible pour faire un titre vide
-        embed.add_field(name="\u200b", value=f"*{message}*", inline=False)
-        
-        return embed
-
-    async def on_timeout(self):
-        for item in self.children:
-            item.disabled = True
-        try:
-            if self.message:
-                await self.message.edit(view=self)
-        except:
-            pass
+        history = [{
+            "question": self.questions[idx].question,
+            "correct_answer": self.questions[idx].correct,
+            "is_correct": is_correct
+        } for idx, is_correct in zip(self.indices, self.outcomes)]
+        return get_quiz_result_embed(self.lang, self.score, history)
 
 # --- Vue Sélection de Langue (MODIFIÉE pour gérer Book et Quiz) ---
 
-class LanguageSelect(ui.View):
-    def __init__(self, command_name: str, ctx: commands.Context):
-        super().__init__(timeout=60)
-        self.command_name = command_name
-        self.ctx = ctx
-        self.language = None
+# Un bouton par langue découverte (corpus.LANGUAGES) : la première en avant
+LANGUAGE_BUTTONS = tuple((lang, discord.ButtonStyle.primary if i == 0 else discord.ButtonStyle.secondary,
+                          locales.get(lang).emoji) for i, lang in enumerate(corpus.LANGUAGES))
+# Au-delà d'une rangée de boutons, menu déroulant
+MAX_LANGUAGE_BUTTONS = 5
 
-    async def on_timeout(self):
-        for item in self.children:
-            item.disabled = True
-        try:
-            await self.message.edit(view=self)
-        except: pass
-
-    async def send_initial_message(self):
-        embed = discord.Embed(
-            title=":abcd: Choisissez votre langue / Choose your language",
-            description="*Cliquez sur un bouton ci-dessous*\n*Click a button below*",
-            color=discord.Color.red())
-        self.message = await self.ctx.send(embed=embed, view=self)
-
-    def check_author(self, interaction: discord.Interaction) -> bool:
-        if interaction.user != self.ctx.author:
-            interaction.response.send_message("This is not your command! / Ce n'est pas ta commande!", ephemeral=True)
-            return False
-        return True
+def all_languages(key: str) -> List[str]:
+    """Texte d'une clé dans chaque langue, sans doublon : avant le choix, on s'adresse à toutes."""
+    return list(dict.fromkeys(locales.text(lang, key) for lang in corpus.LANGUAGES))
 
-    @ui.button(label="FR", style=discord.ButtonStyle.primary, emoji="🇫🇷")
-    async def french_button(self, interaction: discord.Interaction, button: ui.Button):
-        self.language = "FR"
-        if not self.check_author(interaction): return
-        await self.handle_selection(interaction)
+def get_language_select_embed() -> discord.Embed:
+    return discord.Embed(
+        title=layout.truncate(":abcd: " + " / ".join(all_languages("select.title")), layout.TITLE),
+        description=layout.truncate("\n".join(all_languages("select.hint")), layout.DESCRIPTION),
+        color=discord.Color.red())
 
-    @ui.button(label="ENG", style=discord.ButtonStyle.secondary, emoji="🇬🇧")
-    async def english_button(self, interaction: discord.Interaction, button: ui.Button):
-        self.language = "ENG"
-        if not self.check_author(interaction): return
-        await self.handle_selection(interaction)
+class LanguageSelect(SessionView):
+    kind = "language"
+
+    def __init__(self, command_name: str, ctx: commands.Context, query: str = ""):
+        super().__init__(ctx, timeout=60)
+        self.command_name = command_name
+        self.query = query  # Texte recherché (hs!search), référence (hs!hadith bukhari 15) ou longueur (hs!quiz 5)
+        self.language = None
+        self.create_language_items()
+
+    async def send_initial_message(self, ctx: commands.Context):
+        self.message = await instrumentation.api_call("send", ctx.send(embed=get_language_select_embed(), view=self))
+        self.open_session()
+
+    def create_language_items(self):
+        """Boutons des langues, ou menu déroulant s'il y en a trop pour une rangée."""
+        if len(LANGUAGE_BUTTONS) <= MAX_LANGUAGE_BUTTONS:
+            for lang, style, emoji in LANGUAGE_BUTTONS:
+                button = ui.Button(label=lang, style=style, emoji=emoji)
+                button.callback = self.create_language_callback(lambda lang=lang: lang)
+                self.add_item(button)
+            return
+        menu = ui.Select(placeholder=layout.truncate(" / ".join(all_languages("select.placeholder")), 150), options=[
+            discord.SelectOption(label=locales.get(lang).label, value=lang, emoji=emoji, description=lang)
+            for lang, _, emoji in LANGUAGE_BUTTONS])
+        menu.callback = self.create_language_callback(lambda: menu.values[0])
+        self.add_item(menu)
+
+    def create_language_callback(self, pick: Callable[[], str]):
+        @instrumentation.interaction_handler("language")
+        async def callback(interaction: discord.Interaction):
+            if not await self.check_author(interaction): return
+            self.language = pick()
+            await self.handle_selection(interaction)
+        return callback
 
     async def handle_selection(self, interaction: discord.Interaction):
         """Gère le choix de la langue et lance la bonne action."""
-        
+        # Le message passe à une autre vue (ou à un embed final) : session terminée
+        self.stop()
+
         # Cas spécial pour BOOK : on doit lancer une nouvelle Vue (BookBrowser)
         if self.command_name == "book":
-            # 1. Charger le bon fichier
-            filename = "book_fr.txt" if self.language == "FR" else "book_eng.txt"
-            books = get_books(filename)
+            # 1. Récupérer les pages précalculées depuis le cache de rendu
+            pages = get_book_pages(self.language)
             
-            if not books:
-                err_msg = "Erreur: Fichier introuvable." if self.language == "FR" else "Error: File not found."
-                await interaction.response.edit_message(content=err_msg, embed=None, view=None)
+            if not pages:
+                err_msg = locales.text(self.language, "book.missing")
+                await instrumentation.api_call("edit_message", interaction.response.edit_message(content=err_msg, embed=None, view=None))
                 return
 
             # 2. Créer le BookBrowser
             # On désactive les boutons de langue avant de changer de vue (optionnel mais propre)
             for item in self.children: item.disabled = True
             
-            browser_view = BookBrowser(self.ctx, books, self.language)
-            first_page_embed = get_book_page_embed(books, 0, browser_view.total_pages, self.language)
+            browser_view = BookBrowser(interaction, pages, self.language)
+            first_page_embed = pages[0]
             
             # 3. Mettre à jour le message existant avec la nouvelle vue
             browser_view.message = self.message # Lier le message à la vue
-            await interaction.response.edit_message(embed=first_page_embed, view=browser_view)
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(embed=first_page_embed, view=browser_view))
+            return
+
+        # Cas spécial pour SEARCH : résultats paginés comme la bibliographie
+        if self.command_name == "search":
+            for item in self.children: item.disabled = True
+            pages = get_search_pages(self.language, self.query)
+            browser_view = BookBrowser(interaction, pages, self.language)
+            browser_view.message = self.message
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(embed=pages[0], view=browser_view))
             return
 
         # Cas spécial pour QUIZ
         if self.command_name == "quiz":
-            filename = "quiz_fr.txt" if self.language == "FR" else "quiz_eng.txt"
-            all_questions = get_quiz_questions(filename)
+            # Questions choisies selon l'historique du joueur (quizengine.py)
+            indices = await draw_quiz(self.language, self.author_id, quiz_length(self.query))
             
-            if not all_questions or len(all_questions) < 3:
-                err_msg = "Erreur: Pas assez de questions disponibles." if self.language == "FR" else "Error: Not enough questions available."
-                await interaction.response.edit_message(content=err_msg, embed=None, view=None)
+            if indices is None:
+                err_msg = locales.text(self.language, "quiz.not_enough")
+                await instrumentation.api_call("edit_message", interaction.response.edit_message(content=err_msg, embed=None, view=None))
                 return
             
-            # Sélectionner 3 questions aléatoires
-            selected_questions = random.sample(all_questions, 3)
+            all_questions = corpus.store.get(self.language).questions
             
             # Désactiver les boutons de langue
             for item in self.children: item.disabled = True
             
             # Créer la vue du quiz
-            quiz_view = QuizView(self.ctx, selected_questions, self.language)
+            quiz_view = QuizView(interaction, all_questions, indices, self.language)
             first_question_embed = quiz_view.get_question_embed()
             
             quiz_view.message = self.message
-            await interaction.response.edit_message(embed=first_question_embed, view=quiz_view)
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(embed=first_question_embed, view=quiz_view))
             return
 
         # Pour les autres commandes (Info, Hadith, Commands), on génère juste un Embed
         for item in self.children: item.disabled = True
+
+        # Cas spécial pour HADITH : bouton de traduction sous le hadith
+        if self.command_name == "hadith":
+            if self.query:
+                doc_id = lookup_hadith(self.language, self.query)
+                if doc_id is None:
+                    await instrumentation.api_call("edit_message", interaction.response.edit_message(
+                        content=get_reference_not_found(self.language, self.query), embed=None, view=None))
+                    return
+            else:
+                doc_id = draw_hadith(self.language, sampling_scope(interaction))
+            add_translation_buttons(self, self.language, doc_id)
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(embeds=get_hadith_embeds_at(self.language, doc_id), view=self))
+            return
         
         embed_generators = {
             "commands": lambda lang: get_commands_embed(lang),
-            "hadith": lambda lang: get_hadith_embed(lang),
             # Info n'est plus ici car hs!info est direct, mais au cas où :
-            "info": lambda lang: get_info_embed(lang, len(bot.guilds))
+            "info": lambda lang: get_info_embed(lang, sharding.total_guild_count(len(bot.guilds)))
         }
 
         embed_func = embed_generators.get(self.command_name)
         if embed_func:
             result_embed = embed_func(self.language)
-            await interaction.response.edit_message(embed=result_embed, view=self)
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(embed=result_embed, view=self))
         else:
-            await interaction.response.edit_message(content="Error", view=None)
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(content="Error", view=None))
+
+
+# --- Vues Persistantes (état encodé dans le custom_id) ---
+# Avec HS_PERSISTENT_VIEWS=1, aucune vue n'est gardée en mémoire : chaque bouton
+# porte la langue, la page, les questions, l'ordre des réponses et l'auteur.
+# Un redémarrage du bot ne casse donc ni la bibliographie ni un quiz en cours.
+
+PERSISTENT_VIEWS = os.environ.get('HS_PERSISTENT_VIEWS', '0') == '1'
+if PERSISTENT_VIEWS:
+    # Chaque question allonge le custom_id : au-delà, le clic échouerait (100 caractères)
+    _fits = routing.max_quiz_length(max(map(len, corpus.LANGUAGES)))
+    if quizengine.MAX_QUIZ_LENGTH > _fits:
+        logger.warning(f"HS_QUIZ_MAX_LENGTH={quizengine.MAX_QUIZ_LENGTH} ramené à {_fits} : "
+                       f"l'état d'un quiz persistant doit tenir dans un custom_id.")
+        quizengine.MAX_QUIZ_LENGTH = _fits
+
+async def reject_foreign_user(interaction: discord.Interaction, author_id: int, msg: str) -> bool:
+    """Répond en éphémère et renvoie True si l'utilisateur n'est pas l'auteur."""
+    if interaction.user.id == author_id:
+        return False
+    await instrumentation.api_call("send_message", interaction.response.send_message(msg, ephemeral=True))
+    return True
+
+def get_quiz_fingerprint(lang: str) -> str:
+    snapshot = corpus.store.snapshot
+    return render_cache.get(("quiz_fp", lang), snapshot.version,
+                            lambda: routing.fingerprint(snapshot.get(lang).questions))
+
+
+class PersistentLanguageButton(ui.DynamicItem[ui.Button], template=r'hs:l:(?P<cmd>[a-z]+)(?P<arg>[0-9]*):(?P<lang>[A-Z]+):(?P<author>[0-9a-z]+)'):
+    def __init__(self, command_name: str, lang: str, author_id: int, style: discord.ButtonStyle,
+                 emoji: str, disabled: bool = False, arg: str = ""):
+        self.command_name = command_name
+        self.lang = lang
+        self.author_id = author_id
+        self.arg = arg  # argument numérique de la commande (longueur du quiz)
+        super().__init__(ui.Button(
+            label=lang, style=style, emoji=emoji, disabled=disabled,
+            custom_id=routing.check_length(f"hs:l:{command_name}{arg}:{lang}:{routing.b36(author_id)}")))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: ui.Button, match):
+        return cls(match["cmd"], match["lang"], routing.from_b36(match["author"]), item.style, str(item.emoji),
+                   arg=match["arg"])
+
+    @instrumentation.interaction_handler("language")
+    async def callback(self, interaction: discord.Interaction):
+        if await reject_foreign_user(interaction, self.author_id, "This is not your command! / Ce n'est pas ta commande!"):
+            return
+        lang = self.lang
 
+        if self.command_name == "book":
+            pages = get_book_pages(lang)
+            if not pages:
+                err_msg = locales.text(lang, "book.missing")
+                await instrumentation.api_call("edit_message", interaction.response.edit_message(content=err_msg, embed=None, view=None))
+                return
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(embed=pages[0], view=persistent_book_view(lang, 0, self.author_id)))
+            return
+
+        if self.command_name == "quiz":
+            indices = await draw_quiz(lang, self.author_id, quiz_length(self.arg))
+            if indices is None:
+                err_msg = locales.text(lang, "quiz.not_enough")
+                await instrumentation.api_call("edit_message", interaction.response.edit_message(content=err_msg, embed=None, view=None))
+                return
+            state = QuizState(lang, self.author_id, get_quiz_fingerprint(lang), indices, 0, 0)
+            embed = get_question_embed(corpus.store.get(lang).questions[indices[0]], 0, len(indices))
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(embed=embed, view=persistent_quiz_view(state)))
+            return
+
+        if self.command_name == "hadith":
+            doc_id = draw_hadith(lang, sampling_scope(interaction))
+            view = persistent_language_view(self.command_name, self.author_id, disabled=True)
+            add_translation_buttons(view, lang, doc_id)
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(embeds=get_hadith_embeds_at(lang, doc_id), view=view))
+            return
+
+        embed_generators = {
+            "commands": lambda: get_commands_embed(lang),
+            "info": lambda: get_info_embed(lang, sharding.total_guild_count(len(bot.guilds)))
+        }
+        embed_func = embed_generators.get(self.command_name)
+        if embed_func:
+            view = persistent_language_view(self.command_name, self.author_id, disabled=True)
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(embed=embed_func(), view=view))
+        else:
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(content="Error", view=None))
+
+def persistent_language_view(command_name: str, author_id: int, disabled: bool = False, arg: str = "") -> ui.View:
+    view = ui.View(timeout=None)
+    for lang, style, emoji in LANGUAGE_BUTTONS:
+        view.add_item(PersistentLanguageButton(command_name, lang, author_id, style, emoji, disabled, arg))
+    return view
+
+
+class PersistentBookButton(ui.DynamicItem[ui.Button], template=r'hs:b:(?P<lang>[A-Z]+):(?P<dir>[pn]):(?P<page>[0-9a-z]+):(?P<author>[0-9a-z]+)'):
+    def __init__(self, lang: str, direction: str, page: int, author_id: int, total_pages: int):
+        self.lang = lang
+        self.page = page
+        self.author_id = author_id
+        # Même rendu que BookBrowser.update_buttons : ❌ rouge aux extrémités
+        disabled = page < 0 or page >= total_pages
+        if disabled:
+            style, emoji = discord.ButtonStyle.red, "❌"
+        else:
+            style, emoji = discord.ButtonStyle.primary, "⬅️" if direction == "p" else "➡️"
+        target = max(page, 0)
+        super().__init__(ui.Button(
+            style=style, emoji=emoji, disabled=disabled,
+            custom_id=routing.check_length(f"hs:b:{lang}:{direction}:{routing.b36(target)}:{routing.b36(author_id)}")))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: ui.Button, match):
+        lang = match["lang"]
+        return cls(lang, match["dir"], routing.from_b36(match["page"]),
+                   routing.from_b36(match["author"]), len(get_book_pages(lang)))
+
+    @instrumentation.interaction_handler("book_page")
+    async def callback(self, interaction: discord.Interaction):
+        msg = locales.text(self.lang, "not_your_command")
+        if await reject_foreign_user(interaction, self.author_id, msg):
+            return
+        pages = get_book_pages(self.lang)
+        page = min(self.page, len(pages) - 1)
+        await instrumentation.api_call("edit_message", interaction.response.edit_message(embed=pages[page], view=persistent_book_view(self.lang, page, self.author_id)))
+
+def persistent_book_view(lang: str, page: int, author_id: int) -> ui.View:
+    total_pages = len(get_book_pages(lang))
+    view = ui.View(timeout=None)
+    view.add_item(PersistentBookButton(lang, "p", page - 1, author_id, total_pages))
+    view.add_item(PersistentBookButton(lang, "n", page + 1, author_id, total_pages))
+    return view
+
+
+class QuizState(NamedTuple):
+    lang: str
+    author_id: int
+    fingerprint: str  # empreinte de la banque de questions
+    indices: List[int]  # questions tirées, dans l'ordre
+    position: int  # question en cours
+    results: int  # bit i = réponse i correcte
+
+
+class PersistentQuizButton(ui.DynamicItem[ui.Button],
+                           template=r'hs:q:(?P<lang>[A-Z]+):(?P<author>[0-9a-z]+):(?P<fp>[0-9a-z]+):(?P<idx>[0-9a-z.]+):(?P<pos>[0-9a-z]+):(?P<res>[0-9a-z]+):(?P<perm>[0-5]):(?P<choice>[0-2])'):
+    def __init__(self, state: QuizState, perm: int, choice: int, label: str = "\u200b"):
+        self.state = state
+        self.perm = perm
+        self.choice = choice
+        custom_id = (f"hs:q:{state.lang}:{routing.b36(state.author_id)}:{state.fingerprint}:"
+                     f"{routing.encode_indices(state.indices)}:{routing.b36(state.position)}:"
+                     f"{routing.b36(state.results)}:{perm}:{choice}")
+        super().__init__(ui.Button(label=label, style=discord.ButtonStyle.primary,
+                                   custom_id=routing.check_length(custom_id)))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: ui.Button, match):
+        state = QuizState(match["lang"], routing.from_b36(match["author"]), match["fp"],
+                          routing.decode_indices(match["idx"]), routing.from_b36(match["pos"]),
+                          routing.from_b36(match["res"]))
+        return cls(state, int(match["perm"]), int(match["choice"]), item.label)
+
+    @instrumentation.interaction_handler("quiz_answer")
+    async def callback(self, interaction: discord.Interaction):
+        state = self.state
+        lang = state.lang
+        msg = locales.text(lang, "quiz.not_yours")
+        if await reject_foreign_user(interaction, state.author_id, msg):
+            return
+        questions = corpus.store.get(lang).questions
+        if state.fingerprint != get_quiz_fingerprint(lang):
+            # Banque de questions modifiée depuis le début du quiz
+            msg = locales.text(lang, "quiz.expired")
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(content=msg, embed=None, view=None))
+            return
+
+        # La réponse d'origine 0 est toujours la bonne
+        is_correct = routing.PERMUTATIONS[self.perm][self.choice] == 0
+        results = state.results | (is_correct << state.position)
+        state = state._replace(position=state.position + 1, results=results)
+
+        if state.position < len(state.indices):
+            embed = get_question_embed(questions[state.indices[state.position]], state.position, len(state.indices))
+            await instrumentation.api_call("edit_message", interaction.response.edit_message(embed=embed, view=persistent_quiz_view(state)))
+            return
+
+        history = [{
+            "question": questions[idx].question,
+            "correct_answer": questions[idx].correct,
+            "is_correct": bool(results >> i & 1)
+        } for i, idx in enumerate(state.indices)]
+        finish_quiz(state.author_id, interaction.guild_id, lang, [questions[idx] for idx in state.indices],
+                    [item["is_correct"] for item in history])
+        embed = get_quiz_result_embed(lang, bin(results).count("1"), history)
+        await instrumentation.api_call("edit_message", interaction.response.edit_message(embed=embed, view=None))
+
+def persistent_quiz_view(state: QuizState) -> ui.View:
+    q = corpus.store.get(state.lang).questions[state.indices[state.position]]
+    answers = (q.correct, q.wrong1, q.wrong2)
+    perm = random.randrange(len(routing.PERMUTATIONS))
+    view = ui.View(timeout=None)
+    for choice, original in enumerate(routing.PERMUTATIONS[perm]):
+        view.add_item(PersistentQuizButton(state, perm, choice, layout.truncate(answers[original], layout.BUTTON_LABEL)))
+    return view
+
+
+# --- Traduction d'un Hadith (relié par sa référence) ---
+
+class HadithTranslateButton(ui.DynamicItem[ui.Button], template=r'hs:h:(?P<lang>[A-Z]+):(?P<ref>[a-z0-9]*\.~?[a-z0-9]+)'):
+    """Affiche en éphémère le même hadith dans une autre langue.
+
+    Le bouton porte le jeton de référence (« bukhari.15 »), pas la position
+    dans le fichier : il reste juste après un rechargement qui ajoute ou
+    retire des lignes, y compris sous les hadiths quotidiens déjà postés.
+    """
+
+    def __init__(self, lang: str, token: str):
+        self.lang = lang
+        self.token = token
+        super().__init__(ui.Button(
+            label=lang, emoji=locales.get(lang).emoji, style=discord.ButtonStyle.secondary,
+            custom_id=routing.check_length(f"hs:h:{lang}:{token}")))
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: ui.Button, match):
+        return cls(match["lang"], match["ref"])
+
+    @instrumentation.interaction_handler("hadith_translate")
+    async def callback(self, interaction: discord.Interaction):
+        doc_id = corpus.store.snapshot.index("refs", self.lang).by_token.get(self.token)
+        if doc_id is None:
+            msg = locales.text(self.lang, "hadith.unavailable")
+            await instrumentation.api_call("send_message", interaction.response.send_message(msg, ephemeral=True))
+            return
+        embeds = get_hadith_embeds_at(self.lang, doc_id)
+        await instrumentation.api_call("send_message", interaction.response.send_message(embeds=embeds, ephemeral=True))
+
+def linked_hadiths(lang: str, doc_id: Optional[int]) -> Dict[str, str]:
+    """Autres langues où le même hadith existe -> son jeton de référence : un accès dict par langue."""
+    if doc_id is None:
+        return {}
+    snapshot = corpus.store.snapshot
+    ref = snapshot.index("refs", lang).refs[doc_id]
+    if ref is None:
+        return {}
+    return {other: ref.token for other in snapshot.languages
+            if other != lang and ref.token in snapshot.index("refs", other).by_token}
+
+def add_translation_buttons(view: ui.View, lang: str, doc_id: Optional[int]):
+    for other, token in linked_hadiths(lang, doc_id).items():
+        # Nom de recueil démesuré : pas de bouton plutôt qu'un envoi refusé
+        if len(f"hs:h:{other}:{token}") <= routing.CUSTOM_ID_MAX:
+            view.add_item(HadithTranslateButton(other, token))
+
+def get_reference_not_found(lang: str, reference: str) -> str:
+    return locales.text(lang, "hadith.not_found", reference=reference)
+
+
+# --- Hadith Quotidien (abonnements, voir subscriptions.py) ---
+
+async def deliver_daily_hadith(sub: subscriptions.Subscription) -> bool:
+    """Envoie le hadith du jour ; False si le salon n'est plus accessible."""
+    try:
+        channel = bot.get_channel(sub.channel_id) or await instrumentation.api_call("fetch_channel", bot.fetch_channel(sub.channel_id))
+        scope = sub.guild_id if sampling.SCOPE == "guild" and sub.guild_id else sub.channel_id
+        doc_id = draw_hadith(sub.lang, scope)
+        view = ui.View(timeout=None)
+        add_translation_buttons(view, sub.lang, doc_id)
+        await instrumentation.api_call("send", channel.send(embeds=get_hadith_embeds_at(sub.lang, doc_id), view=view))
+    except (discord.NotFound, discord.Forbidden):
+        return False
+    return True
+
+daily_scheduler = subscriptions.DailyScheduler(deliver_daily_hadith,
+                                               owns=lambda sub: sharding.owns_guild(bot, sub.guild_id))
 
 # --- Commandes ---
 
+corpus_watcher = corpus.CorpusWatcher(corpus.store)
+web_runner = None
+
+# Le premier snapshot installé (après le rendu des pages) ouvre la porte des commandes
+corpus.store.add_listener(lambda snapshot: startup.profile.reach("corpus"))
+
+@bot.event
+async def setup_hook():
+    startup.profile.checkpoint("login")
+    # Corpus et index en parallèle de la connexion au gateway
+    asyncio.create_task(start_after_corpus(), name="corpus-load")
+    asyncio.create_task(sharding.report_loop(bot), name="shard-report")
+    asyncio.create_task(instrumentation.summary_loop(), name="metrics-summary")
+    scores.board.start()
+    # Santé et métriques HTTP sur la même boucle que le bot
+    global web_runner
+    with startup.profile.phase("webserver"):
+        web_runner = await webserver.start(bot)
+    # Une seule grappe publie les commandes slash
+    if sharding.CLUSTER_ID in (None, 0):
+        asyncio.create_task(sync_app_commands(), name="app-commands-sync")
+    startup.profile.checkpoint("setup_hook")
+
+async def start_after_corpus():
+    """Charge le corpus hors de la boucle, puis démarre les sous-systèmes qui en dépendent."""
+    loop = asyncio.get_running_loop()
+    # Le watcher ne recharge que des fichiers modifiés (et peut être désactivé) :
+    # le premier chargement est réessayé ici, sinon les commandes attendraient indéfiniment
+    delay = 1.0
+    while not corpus.store.loaded:
+        try:
+            with startup.profile.phase("corpus"):
+                snapshot = await loop.run_in_executor(None, corpus.store.build_snapshot)
+            with startup.profile.phase("prerender"):
+                corpus.store.swap(snapshot)
+        except Exception as e:
+            logger.error(f"Chargement du corpus impossible, nouvel essai dans {delay:.0f} s : {e!r}", exc_info=e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, corpus.LOAD_RETRY_MAX)
+    # Rechargement à chaud des fichiers du corpus sans redémarrer le bot
+    corpus_watcher.start()
+    daily_scheduler.start()
+    # Boutons des anciens messages : seulement une fois le corpus là
+    bot.add_dynamic_items(HadithTranslateButton)
+    if PERSISTENT_VIEWS:
+        bot.add_dynamic_items(PersistentLanguageButton, PersistentBookButton, PersistentQuizButton)
+    # Une seule grappe vérifie les liens de la bibliographie, les autres relisent les résultats
+    linkcheck.checker.start(check=sharding.CLUSTER_ID in (None, 0))
+
+async def sync_app_commands():
+    """Publie les commandes slash, seulement si leur définition a changé (la synchro est limitée par Discord)."""
+    payload = [command.to_dict(bot.tree) for command in bot.tree.get_commands()]
+    digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    key = f"app_commands:{bot.application_id}"
+    try:
+        if await storage.db.run(storage.db.get_setting, key) == digest:
+            return
+        synced = await instrumentation.api_call("tree_sync", bot.tree.sync())
+        await storage.db.run(storage.db.set_setting, key, digest)
+        logger.info(f"{len(synced)} commande(s) slash synchronisée(s).")
+    except discord.HTTPException as e:
+        instrumentation.record_error("tree_sync", e)
+        logger.error(f"Synchronisation des commandes slash impossible : {e!r}")
+
 @bot.event
 async def on_ready():
+    startup.profile.reach("gateway")
     logger.info(f'{bot.user} is connected to Discord!')
-    activity = discord.Activity(type=discord.ActivityType.listening, name="hs!commands")
+    activity = discord.Activity(type=discord.ActivityType.listening, name="/commands · hs!commands" if PREFIX_COMMANDS else "/commands")
     await bot.change_presence(status=discord.Status.online, activity=activity)
 
-async def send_language_select(ctx: commands.Context, command_name: str):
-    view = LanguageSelect(command_name, ctx)
-    await view.send_initial_message()
+class RequestShed(commands.CheckFailure):
+    """Commande abandonnée ou fusionnée par le limiteur : pas de réponse en préfixe."""
+
+class NotReady(commands.CheckFailure):
+    """Corpus toujours pas chargé après HS_READY_TIMEOUT secondes."""
+
+async def defer_once(ctx: commands.Context):
+    """Acquitte l'interaction (3 s pour répondre) si ce n'est pas déjà fait ; rien en préfixe."""
+    if ctx.interaction is not None and not ctx.interaction.response.is_done():
+        await ctx.defer()
+
+@bot.check_once
+async def bind_log_context(ctx: commands.Context) -> bool:
+    # Premier check, en préfixe comme en slash : les logs de la commande
+    # (et de on_command_error, lancé depuis cette tâche) portent son contexte
+    logs.bind(guild=ctx.guild.id if ctx.guild else None, channel=ctx.channel.id,
+              command=ctx.command.qualified_name,
+              interaction=ctx.interaction.id if ctx.interaction is not None else None)
+    return True
+
+@bot.check_once
+async def wait_until_ready(ctx: commands.Context) -> bool:
+    # Commande reçue pendant le chargement du corpus : elle attend la porte
+    if startup.profile.ready:
+        return True
+    await defer_once(ctx)
+    if not await startup.profile.wait(startup.READY_TIMEOUT):
+        raise NotReady()
+    return True
+
+@bot.check_once
+async def rate_limit(ctx: commands.Context) -> bool:
+    # Même commande, même texte, même utilisateur dans la fenêtre : déjà servie
+    # (une commande slash n'est jamais envoyée deux fois par erreur : pas de fusion)
+    if ctx.interaction is None and ratelimit.coalescer.is_duplicate(
+            (ctx.author.id, ctx.channel.id, ctx.command.qualified_name, ctx.message.content)):
+        raise RequestShed("merged")
+    wait = ratelimit.limiter.reserve({
+        "user": ctx.author.id,
+        "channel": ctx.channel.id,
+        "guild": ctx.guild.id if ctx.guild else None,
+    })
+    if wait is None:
+        raise RequestShed("shed")
+    if wait:
+        ratelimit.QUEUE_WAIT.observe(wait)
+        # Une interaction doit être acquittée en 3 s : on diffère avant d'attendre
+        await defer_once(ctx)
+        await asyncio.sleep(wait)
+    return True
+
+@bot.before_invoke
+async def start_command_timer(ctx: commands.Context):
+    ctx.hs_started = time.perf_counter()
+
+@bot.after_invoke
+async def stop_command_timer(ctx: commands.Context):
+    started = getattr(ctx, "hs_started", None)
+    if started is not None:
+        instrumentation.HANDLER.observe(time.perf_counter() - started, kind="command", name=ctx.command.name)
 
-@bot.command(name='commands')
-async def list_commands(ctx: commands.Context):
-    await send_language_select(ctx, "commands")
+@bot.event
+async def on_command_error(ctx: commands.Context, error: commands.CommandError):
+    if isinstance(error, commands.CommandNotFound):
+        return
+    if isinstance(error, RequestShed):
+        # En slash, l'interaction doit recevoir une réponse
+        if ctx.interaction is not None:
+            lang = await preferred_language(ctx) or locales.DEFAULT
+            await instrumentation.api_call("send", ctx.send(locales.text(lang, "error.busy"), ephemeral=True))
+        return
+    lang = await preferred_language(ctx) or locales.DEFAULT
+    if isinstance(error, NotReady):
+        await instrumentation.api_call("send", ctx.send(locales.text(lang, "error.starting"), ephemeral=True))
+        return
+    if isinstance(error, commands.MissingPermissions):
+        permissions = ", ".join(p.replace("_", " ") for p in error.missing_permissions)
+        await instrumentation.api_call("send", ctx.send(
+            f"{ctx.author.mention} {locales.text(lang, 'error.permissions', permissions=permissions)}", ephemeral=True))
+        return
+    if isinstance(error, commands.NoPrivateMessage):
+        await instrumentation.api_call("send", ctx.send(locales.text(lang, "error.guild_only"), ephemeral=True))
+        return
+    if isinstance(error, commands.MissingRequiredArgument) and ctx.command is subscribe:
+        # hs!subscribe sans arguments : l'usage complet plutôt que le nom du paramètre
+        await send_subscribe_usage(ctx)
+        return
+    if isinstance(error, commands.UserInputError):
+        await instrumentation.api_call("send", ctx.send(f"{ctx.author.mention} {error}", ephemeral=True))
+        return
+    original = getattr(error, "original", error)
+    instrumentation.record_error(f"command:{ctx.command.name if ctx.command else '?'}", original)
+    logger.error(f"Erreur dans hs!{ctx.command}: {original!r}", exc_info=original)
+    if ctx.interaction is not None and not ctx.interaction.response.is_done():
+        await instrumentation.api_call("send", ctx.send(locales.text(lang, "error.internal"), ephemeral=True))
 
-@bot.command(name='ping')
-async def ping(ctx: commands.Context):
-    latency_ms = round(bot.latency * 1000)
-    await ctx.send(f"{ctx.author.mention} :small_blue_diamond: Latence : **{latency_ms}ms**")
+@bot.event
+async def on_shard_ready(shard_id: int):
+    logger.info(f"Shard {shard_id} prêt.")
+    sharding.record_event(shard_id, "ready")
 
-@bot.command(name='info')
-async def info(ctx: commands.Context):
-    # Directement en Anglais pour l'interface, mais description FR
-    embed = get_info_embed("ENG", len(bot.guilds))
-    await ctx.send(embed=embed)
+@bot.event
+async def on_shard_disconnect(shard_id: int):
+    sharding.record_event(shard_id, "disconnect")
 
-@bot.command(name='hadith')
-async def hadith(ctx: commands.Context):
-    await send_language_select(ctx, "hadith")
+@bot.event
+async def on_shard_resumed(shard_id: int):
+    sharding.record_event(shard_id, "resumed")
+
+@bot.listen('on_message')
+async def count_message(message: discord.Message):
+    if message.guild is not None:
+        sharding.record_event(message.guild.shard_id, "message")
+
+@bot.listen('on_interaction')
+async def count_interaction(interaction: discord.Interaction):
+    if interaction.guild is not None:
+        sharding.record_event(interaction.guild.shard_id, "interaction")
+
+async def preferred_language(ctx: commands.Context) -> Optional[str]:
+    """Langue par défaut de l'utilisateur, sinon du serveur (hs!language)."""
+    lang = await preferences.store.resolve(ctx.author.id, ctx.guild.id if ctx.guild else None)
+    return lang if lang in corpus.LANGUAGES else None
+
+async def send_in_language(ctx: commands.Context, command_name: str, lang: str, arg: str = ""):
+    """Réponse finale directe, sans sélecteur : un seul appel à l'API."""
+    if command_name == "book":
+        pages = get_book_pages(lang)
+        if not pages:
+            await instrumentation.api_call("send", ctx.send(locales.text(lang, "book.missing")))
+            return
+        if PERSISTENT_VIEWS:
+            await instrumentation.api_call("send", ctx.send(embed=pages[0], view=persistent_book_view(lang, 0, ctx.author.id)))
+            return
+        view = BookBrowser(ctx, pages, lang)
+        view.message = await instrumentation.api_call("send", ctx.send(embed=pages[0], view=view))
+        return
 
-@bot.command(name="book")
-async def book(ctx: commands.Context):
-    # Lance maintenant le sélecteur de langue au lieu de charger directement le FR
-    await send_language_select(ctx, "book")
+    if command_name == "quiz":
+        indices = await draw_quiz(lang, ctx.author.id, quiz_length(arg))
+        if indices is None:
+            err_msg = locales.text(lang, "quiz.not_enough")
+            await instrumentation.api_call("send", ctx.send(err_msg))
+            return
+        all_questions = corpus.store.get(lang).questions
+        if PERSISTENT_VIEWS:
+            state = QuizState(lang, ctx.author.id, get_quiz_fingerprint(lang), indices, 0, 0)
+            embed = get_question_embed(all_questions[indices[0]], 0, len(indices))
+            await instrumentation.api_call("send", ctx.send(embed=embed, view=persistent_quiz_view(state)))
+            return
+        view = QuizView(ctx, all_questions, indices, lang)
+        view.message = await instrumentation.api_call("send", ctx.send(embed=view.get_question_embed(), view=view))
+        return
 
-@bot.command(name="quiz")
-async def quiz(ctx: commands.Context):
-    """Lance un quiz de 3 questions aléatoires."""
-    await send_language_select(ctx, "quiz")
+    if command_name == "hadith":
+        doc_id = draw_hadith(lang, sampling_scope(ctx))
+        view = ui.View(timeout=None)
+        add_translation_buttons(view, lang, doc_id)
+        await instrumentation.api_call("send", ctx.send(embeds=get_hadith_embeds_at(lang, doc_id), view=view))
+        return
 
-@bot.command(name='site')
-async def site(ctx: commands.Context):
-    """Affiche le lien vers le site web."""
-    await ctx.send(f"{ctx.author.mention} 🌐 https://hadith-sahih.pages.dev")
+    await instrumentation.api_call("send", ctx.send(embed=get_commands_embed(lang)))
+
+async def send_language_select(ctx: commands.Context, command_name: str, arg: str = ""):
+    # Langue par défaut de l'utilisateur ou du serveur : pas d'aller-retour
+    lang = await preferred_language(ctx)
+    if lang is not None:
+        await send_in_language(ctx, command_name, lang, arg)
+        return
+    if PERSISTENT_VIEWS:
+        await instrumentation.api_call("send", ctx.send(embed=get_language_select_embed(), view=persistent_language_view(command_name, ctx.author.id, arg=arg)))
+        return
+    view = LanguageSelect(command_name, ctx, arg)
+    await view.send_initial_message(ctx)
+
+# Commandes hybrides : /commande (slash) et hs!commande (préfixe, si HS_PREFIX_COMMANDS=1).
+# En préfixe, une option `language` invalide est ignorée et le mot passe au paramètre suivant.
+
+class LanguageOption(commands.Converter):
+    """Code d'une langue du corpus (FR, ENG...), insensible à la casse."""
+
+    async def convert(self, ctx: commands.Context, argument: str) -> str:
+        lang = argument.upper()
+        if lang not in corpus.LANGUAGES:
+            raise commands.BadArgument(f"Langue inconnue : {argument}")
+        return lang
+
+# Discord limite une option à 25 choix (dont un pour « reset » dans /language)
+LANGUAGE_CHOICES = [app_commands.Choice(name=lang if locales.get(lang).label == lang else f"{locales.get(lang).label} ({lang})",
+                                         value=lang) for lang in corpus.LANGUAGES[:24]]
+LANGUAGE_DESCRIPTION = "Langue / Language (sinon votre langue par défaut)"
+
+async def send_command(ctx: commands.Context, command_name: str, language: Optional[str], arg: str = ""):
+    """Langue donnée en option : réponse directe ; sinon préférence ou sélecteur."""
+    if language is not None:
+        await send_in_language(ctx, command_name, language, arg)
+    else:
+        await send_language_select(ctx, command_name, arg)
+
+@bot.hybrid_command(name='commands')
+@app_commands.choices(language=LANGUAGE_CHOICES)
+@app_commands.describe(language=LANGUAGE_DESCRIPTION)
+async def list_commands(ctx: commands.Context, language: Optional[LanguageOption] = None):
+    """Toutes les commandes du bot / All bot commands."""
+    await send_command(ctx, "commands", language)
+
+@bot.hybrid_command(name='ping')
+async def ping(ctx: commands.Context):
+    """Vérifie la latence du bot / Check the bot's latency."""
+    lang = await preferred_language(ctx) or locales.DEFAULT
+    latencies = sharding.shard_latencies(bot)
+    if len(latencies) == 1:
+        latency_ms = round(latencies[0][1] * 1000)
+        await instrumentation.api_call("send", ctx.send(f"{ctx.author.mention} {locales.text(lang, 'ping.latency', ms=latency_ms)}"))
+        return
+    current = ctx.guild.shard_id if ctx.guild else 0
+    lines = [f"{'▸' if shard_id == current else '•'} {locales.text(lang, 'ping.shard', shard=shard_id, ms=round(latency * 1000))}"
+             for shard_id, latency in latencies]
+    await instrumentation.api_call("send", ctx.send(f"{ctx.author.mention} {locales.text(lang, 'ping.shards')}\n" + "\n".join(lines)))
 
-# --- Serveur Web ---
+@bot.hybrid_command(name='info')
+async def info(ctx: commands.Context):
+    """Informations sur le bot / Bot information."""
+    # Directement en Anglais pour l'interface, mais description FR
+    embed = get_info_embed("ENG", sharding.total_guild_count(len(bot.guilds)))
+    await instrumentation.api_call("send", ctx.send(embed=embed))
+
+@bot.hybrid_command(name='hadith')
+@app_commands.choices(language=LANGUAGE_CHOICES)
+@app_commands.describe(language=LANGUAGE_DESCRIPTION, reference="Recueil et numéro, ex. bukhari 15 ou muslim 1:23")
+async def hadith(ctx: commands.Context, language: Optional[LanguageOption] = None, *, reference: str = ""):
+    """Hadith sahih aléatoire, ou précis / Random or specific Sahih hadith."""
+    if not reference.strip():
+        await send_command(ctx, "hadith", language)
+        return
+    lang = language or await preferred_language(ctx)
+    if lang is None:
+        # La référence ne tient pas dans un custom_id : sélecteur classique
+        view = LanguageSelect("hadith", ctx, reference)
+        await view.send_initial_message(ctx)
+        return
+    doc_id = lookup_hadith(lang, reference)
+    if doc_id is None:
+        await instrumentation.api_call("send", ctx.send(get_reference_not_found(lang, reference)))
+        return
+    view = ui.View(timeout=None)
+    add_translation_buttons(view, lang, doc_id)
+    await instrumentation.api_call("send", ctx.send(embeds=get_hadith_embeds_at(lang, doc_id), view=view))
+
+@bot.hybrid_command(name="book")
+@app_commands.choices(language=LANGUAGE_CHOICES)
+@app_commands.describe(language=LANGUAGE_DESCRIPTION)
+async def book(ctx: commands.Context, language: Optional[LanguageOption] = None):
+    """Liste de livres islamiques / List of Islamic books."""
+    await send_command(ctx, "book", language)
+
+@bot.hybrid_command(name="quiz")
+@app_commands.choices(language=LANGUAGE_CHOICES)
+@app_commands.describe(language=LANGUAGE_DESCRIPTION, length="Nombre de questions / Number of questions")
+async def quiz(ctx: commands.Context, language: Optional[LanguageOption] = None,
+               length: commands.Range[int, 1, quizengine.MAX_QUIZ_LENGTH] = None):
+    """Quiz sur l'Islam adapté au joueur / Quiz about Islam."""
+    await send_command(ctx, "quiz", language, str(length) if length else "")
+
+@bot.hybrid_command(name="search")
+@app_commands.choices(language=LANGUAGE_CHOICES)
+@app_commands.describe(language=LANGUAGE_DESCRIPTION, query="Mots recherchés / Search words")
+async def search_command(ctx: commands.Context, language: Optional[LanguageOption] = None, *, query: str = ""):
+    """Cherche des hadiths par mots-clés / Search hadiths by keywords."""
+    lang = language or await preferred_language(ctx)
+    if not query:
+        usage = locales.text(lang or locales.DEFAULT, "search.usage", languages=LANGUAGE_CODES)
+        await instrumentation.api_call("send", ctx.send(f"{ctx.author.mention} {usage}"))
+        return
+    if lang is not None:
+        # Langue connue : pas de sélecteur
+        await defer_once(ctx)
+        pages = get_search_pages(lang, query)
+        view = BookBrowser(ctx, pages, lang)
+        view.message = await instrumentation.api_call("send", ctx.send(embed=pages[0], view=view))
+        return
+    # La requête ne tient pas dans un custom_id : sélecteur classique même en mode persistant
+    view = LanguageSelect("search", ctx, query)
+    await view.send_initial_message(ctx)
+
+@bot.hybrid_command(name='leaderboard', aliases=['top'])
+@app_commands.choices(scope=[app_commands.Choice(name="server", value="server"), app_commands.Choice(name="global", value="global")])
+@app_commands.describe(scope="Serveur ou global / Server or global")
+async def leaderboard(ctx: commands.Context, scope: str = ""):
+    """Classement des quiz / Quiz leaderboard."""
+    lang = await preferred_language(ctx) or locales.DEFAULT
+    guild = None if scope.lower() == "global" else ctx.guild
+    ranking = scores.board.ranking(guild.id if guild else scores.GLOBAL)
+    embed = get_leaderboard_embed(lang, guild.name if guild else None, ranking, ctx.author.id)
+    await instrumentation.api_call("send", ctx.send(embed=embed))
+
+@bot.hybrid_command(name='stats')
+@app_commands.describe(user="Membre (vous par défaut) / Member (yourself by default)")
+async def stats(ctx: commands.Context, user: Optional[discord.User] = None):
+    """Statistiques de quiz / Quiz statistics."""
+    lang = await preferred_language(ctx) or locales.DEFAULT
+    user = user or ctx.author
+
+    def summary(guild_id: Optional[int]):
+        ranking = scores.board.ranking(guild_id)
+        return ranking.totals.get(user.id), ranking.rank(user.id), len(ranking)
+
+    local = summary(ctx.guild.id) if ctx.guild else (None, None, 0)
+    embed = get_stats_embed(lang, user, ctx.guild.name if ctx.guild else None, local, summary(scores.GLOBAL))
+    await instrumentation.api_call("send", ctx.send(embed=embed))
+
+@bot.hybrid_command(name='language', aliases=['lang'])
+@app_commands.choices(value=LANGUAGE_CHOICES + [app_commands.Choice(name="reset", value="reset")],
+                      scope=[app_commands.Choice(name="user", value="user"), app_commands.Choice(name="server", value="server")])
+@app_commands.describe(value="Langue par défaut, ou reset", scope="Pour vous ou pour le serveur / For you or the server")
+async def language(ctx: commands.Context, value: str = "", scope: str = ""):
+    """Langue par défaut / Default language."""
+    # hs!language server FR est aussi accepté
+    if value.lower() in ("server", "serveur", "user"):
+        value, scope = scope, value
+    target = "guild" if scope.lower() in ("server", "serveur") else "user"
+    if target == "guild":
+        if ctx.guild is None:
+            raise commands.NoPrivateMessage()
+        if not ctx.author.guild_permissions.manage_guild:
+            raise commands.MissingPermissions(["manage_guild"])
+    target_id = ctx.author.id if target == "user" else ctx.guild.id
+
+    await defer_once(ctx)
+    lang = await preferred_language(ctx) or locales.DEFAULT
+    choice = value.upper()
+    if choice in corpus.LANGUAGES and target == "user":
+        # La confirmation est déjà dans la langue choisie
+        lang = choice
+    where = locales.text(lang, f"preference.{target}")
+    if not value:
+        current = await preferences.store.get(target, target_id)
+        await instrumentation.api_call("send", ctx.send(f"{ctx.author.mention} " + locales.text(
+            lang, "preference.current", where=where, current=current or "—", languages=LANGUAGE_CODES)))
+        return
+    if choice == "RESET":
+        await preferences.store.set(target, target_id, None)
+        await instrumentation.api_call("send", ctx.send(f"{ctx.author.mention} {locales.text(lang, 'preference.reset', where=where)}"))
+        return
+    if choice not in corpus.LANGUAGES:
+        available = locales.text(lang, "preference.unknown", languages=", ".join(corpus.LANGUAGES))
+        await instrumentation.api_call("send", ctx.send(f"{ctx.author.mention} {available}"))
+        return
+    await preferences.store.set(target, target_id, choice)
+    await instrumentation.api_call("send", ctx.send(
+        f"{ctx.author.mention} {locales.text(lang, 'preference.set', where=where, language=choice)}"))
+
+async def send_subscribe_usage(ctx: commands.Context):
+    usage = locales.text(await preferred_language(ctx) or locales.DEFAULT, "subscribe.usage",
+                         languages=LANGUAGE_CODES, tz=subscriptions.DEFAULT_TZ)
+    await instrumentation.api_call("send", ctx.send(f"{ctx.author.mention} {usage}"))
+
+@bot.hybrid_command(name='subscribe')
+@commands.guild_only()
+@commands.has_permissions(manage_channels=True)
+@app_commands.default_permissions(manage_channels=True)
+@app_commands.choices(language=LANGUAGE_CHOICES)
+@app_commands.describe(language="Langue du hadith / Hadith language", at="Heure locale HH:MM",
+                       timezone=f"Fuseau horaire, ex. Europe/Paris (défaut : {subscriptions.DEFAULT_TZ})")
+async def subscribe(ctx: commands.Context, language: str, at: str, timezone: str = subscriptions.DEFAULT_TZ):
+    """Un hadith chaque jour dans ce salon / A daily hadith in this channel."""
+    lang = language.upper()
+    minute = subscriptions.parse_time(at)
+    zone = subscriptions.parse_timezone(timezone)
+    if lang not in corpus.LANGUAGES or minute is None or zone is None:
+        await send_subscribe_usage(ctx)
+        return
+    await defer_once(ctx)
+    sub = subscriptions.Subscription(ctx.channel.id, ctx.guild.id, lang, minute, zone)
+    due = await daily_scheduler.subscribe(sub)
+    # Confirmation dans la langue des hadiths envoyés au salon
+    await instrumentation.api_call("send", ctx.send(f"{ctx.author.mention} " + locales.text(
+        lang, "subscribe.done", language=lang, time=sub.time_text, tz=zone, due=int(due.timestamp()))))
+
+@bot.hybrid_command(name='unsubscribe')
+@commands.guild_only()
+@commands.has_permissions(manage_channels=True)
+@app_commands.default_permissions(manage_channels=True)
+async def unsubscribe(ctx: commands.Context):
+    """Arrête le hadith quotidien dans ce salon / Stop the daily hadith."""
+    await defer_once(ctx)
+    lang = await preferred_language(ctx) or locales.DEFAULT
+    key = "unsubscribe.done" if await daily_scheduler.unsubscribe(ctx.channel.id) else "unsubscribe.none"
+    await instrumentation.api_call("send", ctx.send(f"{ctx.author.mention} {locales.text(lang, key)}"))
+
+@bot.hybrid_command(name='site')
+async def site(ctx: commands.Context):
+    """Lien vers le site web / Link to the website."""
+    await instrumentation.api_call("send", ctx.send(f"{ctx.author.mention} 🌐 https://hadith-sahih.pages.dev"))
 
-def run_web_server():
-    app = Flask('')
-    @app.route('/')
-    def home(): return "Bot est en ligne !"
-    port = int(os.environ.get('PORT', 8080))
-    app.run(host='0.0.0.0', port=port, debug=False)
+# Imports, construction du bot et enregistrement des commandes
+startup.profile.checkpoint("import")
 
 def main():
+    if sharding.is_launcher():
+        # maintest importé puis main() appelé : même lanceur qu'en tête de ce fichier
+        raise SystemExit(sharding.launch_clusters(os.path.abspath(__file__)))
     token = os.environ.get('DISCORD_BOT_TOKEN')
     if not token:
         logger.error("Token introuvable.")
         return
-    Thread(target=run_web_server).start()
-    bot.run(token)
+    # Le corpus se charge pendant la connexion au gateway (voir start_after_corpus)
+    # log_handler=None : discord.py n'ajoute pas son propre handler à la racine
+    bot.run(token, log_handler=None)
 
 if __name__ == "__main__":
     main()
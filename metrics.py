@@ -0,0 +1,136 @@
+"""
+Registre de métriques minimal (compteurs, jauges, histogrammes) partagé par les sous-systèmes.
+"""
+import bisect
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+LabelKey = Tuple[str, ...]
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def get(self, **labels) -> float:
+        return self.values.get(self._key(labels), 0.0)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = float(value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name: str, help_text: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # clé -> [compte par bucket..., +Inf], somme
+        self.counts: Dict[LabelKey, List[int]] = {}
+        self.sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self.counts.get(key)
+            if counts is None:
+                counts = self.counts[key] = [0] * (len(self.buckets) + 1)
+            counts[index] += 1
+            self.sums[key] = self.sums.get(key, 0.0) + value
+
+    def count(self, **labels) -> int:
+        return sum(self.counts.get(self._key(labels), ()))
+
+    def quantile(self, q: float, key: LabelKey) -> float:
+        """Estimation par la borne haute du bucket contenant le quantile."""
+        counts = self.counts.get(key)
+        if not counts:
+            return 0.0
+        target = q * sum(counts)
+        running = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            running += count
+            if running >= target:
+                return bound
+        return float("inf")
+
+
+registry: Dict[str, Metric] = {}
+
+def _get_or_create(cls, name: str, help_text: str, labelnames: Iterable[str]):
+    metric = registry.get(name)
+    if metric is None:
+        metric = registry[name] = cls(name, help_text, labelnames)
+    return metric
+
+def counter(name: str, help_text: str, labelnames: Iterable[str] = ()) -> Counter:
+    return _get_or_create(Counter, name, help_text, labelnames)
+
+def gauge(name: str, help_text: str, labelnames: Iterable[str] = ()) -> Gauge:
+    return _get_or_create(Gauge, name, help_text, labelnames)
+
+def histogram(name: str, help_text: str, labelnames: Iterable[str] = ()) -> Histogram:
+    return _get_or_create(Histogram, name, help_text, labelnames)
+
+# --- Exposition au format texte Prometheus ---
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: LabelKey) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+def _render_histogram(metric: Histogram) -> List[str]:
+    lines = []
+    names = metric.labelnames + ("le",)
+    for key, counts in list(metric.counts.items()):
+        running = 0
+        for bound, count in zip(metric.buckets + (float("inf"),), counts):
+            running += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{metric.name}_bucket{_format_labels(names, key + (le,))} {running}")
+        labels = _format_labels(metric.labelnames, key)
+        lines.append(f"{metric.name}_sum{labels} {metric.sums.get(key, 0.0)}")
+        lines.append(f"{metric.name}_count{labels} {running}")
+    return lines
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in list(registry.values()):
+        lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if isinstance(metric, Histogram):
+            lines.extend(_render_histogram(metric))
+            continue
+        for key, value in list(metric.values.items()):
+            lines.append(f"{metric.name}{_format_labels(metric.labelnames, key)} {value}")
+    lines.append("")
+    return "\n".join(lines)
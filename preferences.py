@@ -0,0 +1,85 @@
+"""
+Langue par défaut par utilisateur et par serveur.
+
+Quand une préférence existe, les commandes répondent directement dans cette
+langue (un seul appel REST) au lieu de passer par le sélecteur de langue.
+La préférence de l'utilisateur l'emporte sur celle du serveur. Les valeurs
+sont stockées dans SQLite ; un cache LRU en mémoire, absences comprises,
+évite une requête à chaque commande.
+"""
+import os
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+import metrics
+import storage
+
+CACHE_SIZE = int(os.environ.get('HS_PREF_CACHE_SIZE', 50000))
+SCOPES = ("user", "guild")
+
+LOOKUPS = metrics.counter('hs_preference_cache_total', "Lectures du cache des préférences", ("outcome",))
+
+storage.db.add_schema("""
+CREATE TABLE IF NOT EXISTS language_preferences (
+    scope TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    lang TEXT NOT NULL,
+    PRIMARY KEY (scope, id)
+);
+""")
+
+_MISSING = object()
+
+
+class PreferenceStore:
+    def __init__(self, db: storage.Database = storage.db, cache_size: int = CACHE_SIZE):
+        self.db = db
+        self.cache_size = cache_size
+        # (portée, id) -> langue, ou None si aucune préférence
+        self._cache: "OrderedDict[Hashable, Optional[str]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def _remember(self, key: Tuple[str, int], lang: Optional[str]):
+        self._cache[key] = lang
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _read(self, scope: str, target_id: int) -> Optional[str]:
+        rows = self.db.fetchall("SELECT lang FROM language_preferences WHERE scope = ? AND id = ?", (scope, target_id))
+        return rows[0][0] if rows else None
+
+    def _write(self, scope: str, target_id: int, lang: Optional[str]):
+        if lang is None:
+            self.db.execute("DELETE FROM language_preferences WHERE scope = ? AND id = ?", (scope, target_id))
+        else:
+            self.db.execute("INSERT OR REPLACE INTO language_preferences (scope, id, lang) VALUES (?, ?, ?)",
+                            (scope, target_id, lang))
+
+    async def get(self, scope: str, target_id: Optional[int]) -> Optional[str]:
+        if target_id is None:
+            return None
+        key = (scope, target_id)
+        lang = self._cache.get(key, _MISSING)
+        if lang is not _MISSING:
+            LOOKUPS.inc(outcome="hit")
+            self._cache.move_to_end(key)
+            return lang
+        LOOKUPS.inc(outcome="miss")
+        lang = await self.db.run(self._read, scope, target_id)
+        self._remember(key, lang)
+        return lang
+
+    async def set(self, scope: str, target_id: int, lang: Optional[str]):
+        """Enregistre la langue (None efface la préférence)."""
+        await self.db.run(self._write, scope, target_id, lang)
+        self._remember((scope, target_id), lang)
+
+    async def resolve(self, user_id: int, guild_id: Optional[int]) -> Optional[str]:
+        """Langue de l'utilisateur, sinon celle du serveur, sinon None."""
+        return await self.get("user", user_id) or await self.get("guild", guild_id)
+
+
+store = PreferenceStore()
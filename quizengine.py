@@ -0,0 +1,186 @@
+"""
+Quiz adaptatif : choix des questions selon l'historique de chaque joueur.
+
+Chaque question vue par un joueur a une « boîte » de répétition espacée
+(Leitner) : une bonne réponse la fait monter, une erreur la renvoie à 0.
+Le poids de tirage d'une question dépend de cette boîte :
+
+  - jamais vue : NEW_WEIGHT ;
+  - ratée la dernière fois : MISSED_WEIGHT (revient plus souvent) ;
+  - réussie : 0.5 ** boîte (s'espace à chaque réussite) ;
+  - vue il y a moins de RECENT_SECONDS : poids multiplié par RECENT_FACTOR.
+
+Le tirage sans remise utilise un arbre de Fenwick des poids : l'arbre de base
+(toutes les questions au poids NEW_WEIGHT) est construit une fois par version
+du corpus, copié pour chaque quiz puis corrigé pour les seules questions de
+l'historique. Un quiz de k questions coûte une copie mémoire + O((h + k) log n).
+"""
+import os
+import time
+import zlib
+import random
+from array import array
+from collections import OrderedDict
+from typing import Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+import metrics
+import storage
+from corpus import QuizQuestion
+from scores import MAX_BOX, ScoreStore
+
+# --- Configuration ---
+
+QUIZ_LENGTH = int(os.environ.get('HS_QUIZ_LENGTH', 3))
+MAX_QUIZ_LENGTH = int(os.environ.get('HS_QUIZ_MAX_LENGTH', 10))
+RECENT_SECONDS = float(os.environ.get('HS_QUIZ_RECENT', 6 * 3600))
+HISTORY_CACHE = int(os.environ.get('HS_QUIZ_HISTORY_CACHE', 10000))
+NEW_WEIGHT = 1.0
+MISSED_WEIGHT = 4.0
+RECENT_FACTOR = 0.02
+
+HISTORY_LOOKUPS = metrics.counter('hs_quiz_history_cache_total', "Lectures du cache d'historique de quiz", ("outcome",))
+
+
+def question_key(q: QuizQuestion) -> int:
+    """Identifiant stable d'une question, indépendant de sa position dans le fichier."""
+    return zlib.crc32(q.question.encode("utf-8"))
+
+
+class QuestionStat(NamedTuple):
+    box: int  # 0 = ratée, 1..MAX_BOX = réussies d'affilée
+    seen_at: float
+
+    def weight(self, now: float) -> float:
+        weight = MISSED_WEIGHT if self.box == 0 else 0.5 ** self.box
+        if now - self.seen_at < RECENT_SECONDS:
+            weight *= RECENT_FACTOR
+        return weight
+
+    def answered(self, correct: bool, now: float) -> "QuestionStat":
+        return QuestionStat(min(self.box + 1, MAX_BOX) if correct else 0, now)
+
+
+class FenwickTree:
+    """Sommes préfixes de poids : mise à jour et recherche en O(log n)."""
+
+    __slots__ = ('tree', 'size')
+
+    def __init__(self, tree: array):
+        self.tree = tree  # indices 1..size
+        self.size = len(tree) - 1
+
+    @classmethod
+    def uniform(cls, size: int, weight: float) -> "FenwickTree":
+        # Le nœud i couvre (i & -i) éléments de même poids : construction O(n)
+        return cls(array('d', (weight * (i & -i) for i in range(size + 1))))
+
+    def copy(self) -> "FenwickTree":
+        return FenwickTree(array('d', self.tree))
+
+    def add(self, index: int, delta: float):
+        i = index + 1
+        tree = self.tree
+        while i <= self.size:
+            tree[i] += delta
+            i += i & -i
+
+    def total(self) -> float:
+        i, total = self.size, 0.0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, value: float) -> int:
+        """Plus petit indice dont la somme préfixe dépasse value."""
+        pos, step = 0, 1 << self.size.bit_length()
+        tree = self.tree
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and tree[nxt] <= value:
+                pos = nxt
+                value -= tree[nxt]
+            step >>= 1
+        return min(pos, self.size - 1)
+
+
+class QuizEngine:
+    def __init__(self, store: Optional[ScoreStore] = None, cache_size: int = HISTORY_CACHE,
+                 rng: random.Random = random):
+        self.store = store or ScoreStore()
+        self.cache_size = cache_size
+        self.rng = rng
+        # (utilisateur, langue) -> {clé de question: QuestionStat}, LRU
+        self._histories: "OrderedDict[Hashable, Dict[int, QuestionStat]]" = OrderedDict()
+        # langue -> (version, arbre de base, clé -> indice)
+        self._banks: Dict[str, Tuple[int, FenwickTree, Dict[int, int]]] = {}
+
+    def _bank(self, lang: str, questions: Sequence[QuizQuestion], version: int) -> Tuple[FenwickTree, Dict[int, int]]:
+        bank = self._banks.get(lang)
+        if bank is None or bank[0] != version or bank[1].size != len(questions):
+            positions = {question_key(q): i for i, q in enumerate(questions)}
+            bank = self._banks[lang] = (version, FenwickTree.uniform(len(questions), NEW_WEIGHT), positions)
+        return bank[1], bank[2]
+
+    async def history(self, user_id: int, lang: str) -> Dict[int, QuestionStat]:
+        key = (user_id, lang)
+        history = self._histories.get(key)
+        if history is not None:
+            HISTORY_LOOKUPS.inc(outcome="hit")
+            self._histories.move_to_end(key)
+            return history
+        HISTORY_LOOKUPS.inc(outcome="miss")
+        rows = await storage.db.run(self.store.load_history, user_id, lang)
+        # Un autre quiz a pu charger l'historique pendant la lecture
+        history = self._histories.setdefault(key, {k: QuestionStat(box, seen_at) for k, box, seen_at in rows})
+        self._histories.move_to_end(key)
+        if len(self._histories) > self.cache_size:
+            self._histories.popitem(last=False)
+        return history
+
+    async def select(self, user_id: int, lang: str, questions: Sequence[QuizQuestion], version: int,
+                     count: int, now: Optional[float] = None) -> List[int]:
+        """Indices de count questions distinctes, tirées selon les poids du joueur."""
+        now = time.time() if now is None else now
+        count = min(count, len(questions))
+        history = await self.history(user_id, lang)
+        base, positions = self._bank(lang, questions, version)
+        tree = base.copy()
+        weights: Dict[int, float] = {}
+        for key, stat in history.items():
+            index = positions.get(key)
+            if index is not None:
+                weights[index] = stat.weight(now)
+                tree.add(index, weights[index] - NEW_WEIGHT)
+
+        chosen: List[int] = []
+        for _ in range(count):
+            index = tree.find(self.rng.random() * tree.total())
+            if index in chosen:
+                # Erreur d'arrondi sur un arbre presque vide : premier restant
+                index = next(i for i in range(len(questions)) if i not in chosen)
+            chosen.append(index)
+            tree.add(index, -weights.get(index, NEW_WEIGHT))
+            weights[index] = 0.0
+        return chosen
+
+    def record(self, user_id: int, lang: str, questions: Sequence[QuizQuestion], outcomes: Sequence[bool],
+               now: Optional[float] = None) -> List[Tuple[int, int, float]]:
+        """Met à jour l'historique en cache ; renvoie les lignes (clé, bonne réponse, vu le) à enregistrer.
+
+        La base calcule la nouvelle boîte à partir de la ligne enregistrée
+        (ScoreStore.write_batch) : un historique évincé du cache pendant le quiz
+        ne remet pas les boîtes du joueur à zéro, il sera relu au prochain tirage.
+        """
+        now = time.time() if now is None else now
+        history = self._histories.get((user_id, lang))
+        rows = []
+        for q, correct in zip(questions, outcomes):
+            key = question_key(q)
+            if history is not None:
+                history[key] = history.get(key, QuestionStat(0, 0.0)).answered(correct, now)
+            rows.append((key, int(correct), now))
+        return rows
+
+
+engine = QuizEngine()
@@ -0,0 +1,137 @@
+"""
+Limitation de débit des commandes (utilisateur, salon, serveur) et fusion
+des requêtes en double, en amont des appels REST vers Discord.
+
+Une requête passe si les trois seaux à jetons ont un jeton. Sinon, si le
+jeton manquant revient en moins de QUEUE_MAX_WAIT secondes, elle attend son
+tour (file consciente du cooldown) ; au-delà elle est abandonnée. La même
+commande envoyée plusieurs fois par un utilisateur dans COALESCE_WINDOW
+secondes ne produit qu'une seule réponse.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+import metrics
+
+# --- Configuration ---
+
+def _rate(env: str, default: str) -> Tuple[float, float]:
+    """"5/10" -> (capacité 5, recharge de 5 jetons toutes les 10 s)."""
+    capacity, per = os.environ.get(env, default).split("/")
+    return float(capacity), float(per)
+
+RATES: Dict[str, Tuple[float, float]] = {
+    "user": _rate('HS_RATE_USER', "5/10"),
+    "channel": _rate('HS_RATE_CHANNEL', "20/10"),
+    "guild": _rate('HS_RATE_GUILD', "60/10"),
+}
+QUEUE_MAX_WAIT = float(os.environ.get('HS_RATE_QUEUE_MAX_WAIT', 3))
+COALESCE_WINDOW = float(os.environ.get('HS_COALESCE_WINDOW', 2))
+MAX_KEYS = 50000
+
+DECISIONS = metrics.counter('hs_ratelimit_total', "Décisions du limiteur de débit", ("scope", "outcome"))
+QUEUE_WAIT = metrics.histogram('hs_ratelimit_queue_seconds', "Attente en file avant exécution")
+
+
+class TokenBucket:
+    __slots__ = ('capacity', 'rate', 'tokens', 'updated')
+
+    def __init__(self, capacity: float, per: float, now: float):
+        self.capacity = capacity
+        self.rate = capacity / per
+        self.tokens = capacity
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Secondes avant qu'un jeton soit disponible (0 si immédiat)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self):
+        # Peut devenir négatif : le jeton est réservé pour une requête en file
+        self.tokens -= 1
+
+
+class BucketMap:
+    """Seaux par clé, bornés par une éviction LRU."""
+
+    def __init__(self, capacity: float, per: float, max_keys: int = MAX_KEYS):
+        self.capacity = capacity
+        self.per = per
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def get(self, key: Hashable, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.capacity, self.per, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+
+class RateLimiter:
+    def __init__(self, rates: Dict[str, Tuple[float, float]] = RATES, max_wait: float = QUEUE_MAX_WAIT):
+        self.max_wait = max_wait
+        self.scopes = {scope: BucketMap(capacity, per) for scope, (capacity, per) in rates.items()}
+
+    def reserve(self, keys: Dict[str, Optional[Hashable]], now: Optional[float] = None) -> Optional[float]:
+        """Réserve un jeton dans chaque portée.
+
+        Renvoie l'attente nécessaire (0 = immédiat), ou None si la requête doit
+        être abandonnée ; dans ce cas aucun jeton n'est consommé.
+        """
+        now = time.monotonic() if now is None else now
+        buckets = []
+        wait = 0.0
+        limiting = None
+        for scope, key in keys.items():
+            if key is None or scope not in self.scopes:
+                continue
+            bucket = self.scopes[scope].get(key, now)
+            delay = bucket.delay(now)
+            if delay > wait:
+                wait, limiting = delay, scope
+            buckets.append(bucket)
+        if wait > self.max_wait:
+            DECISIONS.inc(scope=limiting, outcome="shed")
+            return None
+        for bucket in buckets:
+            bucket.consume()
+        DECISIONS.inc(scope=limiting or "all", outcome="queued" if wait else "allowed")
+        return wait
+
+
+class Coalescer:
+    """Reconnaît une requête identique déjà servie dans la fenêtre."""
+
+    def __init__(self, window: float = COALESCE_WINDOW, max_keys: int = MAX_KEYS):
+        self.window = window
+        self.max_keys = max_keys
+        self._seen: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def is_duplicate(self, key: Hashable, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        # Purge des entrées expirées (les plus anciennes sont en tête)
+        while self._seen:
+            oldest_key, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.window and len(self._seen) <= self.max_keys:
+                break
+            self._seen.popitem(last=False)
+        if key in self._seen:
+            DECISIONS.inc(scope="user", outcome="merged")
+            return True
+        self._seen[key] = now
+        return False
+
+
+limiter = RateLimiter()
+coalescer = Coalescer()
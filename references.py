@@ -0,0 +1,226 @@
+"""
+Références structurées des hadiths et index par recueil / numéro / livre.
+
+Chaque ligne de hadiths_*.txt se termine par une référence du type
+***[Sahih al-Bukhari 15 In-book reference : Book 2, Hadith 8]***
+qui est découpée en champs au chargement du corpus. La même clé de
+référence relie les versions FR et ENG d'un hadith.
+"""
+import re
+import zlib
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from search import fold
+
+REFERENCE_RE = re.compile(r"\s*\*\*\*\[(?P<ref>[^\]]+)\]\*\*\*\s*$")
+NUMBERED_RE = re.compile(
+    r"^(?P<collection>.+?)\s+(?P<number>\d+[a-z]?)"
+    r"(?:\s+In-book reference\s*:\s*Book\s+(?P<book>\d+)\s*,\s*Hadith\s+(?P<hadith>\d+))?"
+    r"(?:\s*-\s*Graded\s+(?P<grade>.+))?$")
+UNNUMBERED_RE = re.compile(r"^(?P<collection>.+?)(?:\s*-\s*Graded\s+(?P<grade>.+))?$")
+
+# À incrémenter si le découpage des références ou les tables changent
+INDEX_VERSION = 1
+
+SLUG_NOISE = frozenset(("sahih", "sunan", "al", "an", "at", "as", "ad", "ar"))
+# Variantes saisies par les utilisateurs -> identifiant du recueil
+ALIASES = {
+    "boukhari": "bukhari",
+    "bokhari": "bukhari",
+    "mouslim": "muslim",
+    "majah": "ibnmajah",
+    "ibnmaja": "ibnmajah",
+    "tirmidhi": "tirmidhi",
+    "tirmidi": "tirmidhi",
+    "nasai": "nasai",
+    "adab": "adabmufrad",
+}
+
+
+class HadithRef(NamedTuple):
+    collection: str  # ex. "Sahih al-Bukhari"
+    slug: str  # ex. "bukhari"
+    number: Optional[str]  # numérotation globale, ex. "15" ou "534b"
+    book: Optional[int]  # livre (référence interne)
+    hadith: Optional[int]  # hadith dans le livre
+    grade: Optional[str]
+    raw: str
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        """Clé commune aux langues pour relier les traductions."""
+        if self.number is not None:
+            return (self.slug, self.number)
+        return (self.slug, fold(self.raw))
+
+    @property
+    def token(self) -> str:
+        """Clé en texte court, stable d'un rechargement à l'autre : « bukhari.15 »
+        (empreinte du texte pour une référence sans numéro). Pour les custom_id."""
+        slug, rest = self.key
+        if self.number is None:
+            rest = "~" + format(zlib.crc32(rest.encode("utf-8")), "x")
+        return f"{slug}.{rest}"
+
+    def display(self) -> str:
+        text = f"{self.collection} {self.number}" if self.number else self.collection
+        if self.book is not None:
+            text += f" • Book {self.book}, Hadith {self.hadith}"
+        return text
+
+
+def slugify(collection: str) -> str:
+    words = [w for w in re.split(r"[^a-z0-9]+", fold(collection)) if w and w not in SLUG_NOISE]
+    slug = "".join(words)
+    return ALIASES.get(slug, slug)
+
+def parse_reference(raw: str) -> HadithRef:
+    raw = raw.strip()
+    match = NUMBERED_RE.match(raw)
+    if match:
+        collection = match["collection"].strip()
+        # « Sahih al-Bukhari, Al-Adab Al-Mufrad 123 » : le recueil est le dernier segment
+        collection = collection.rsplit(",", 1)[-1].strip()
+        book = int(match["book"]) if match["book"] else None
+        hadith = int(match["hadith"]) if match["hadith"] else None
+        return HadithRef(collection, slugify(collection), match["number"].lower(), book, hadith, match["grade"], raw)
+    match = UNNUMBERED_RE.match(raw)
+    collection = match["collection"].strip()
+    return HadithRef(collection, slugify(collection), None, None, None, match["grade"], raw)
+
+def split_hadith(line: str) -> Tuple[str, Optional[HadithRef]]:
+    """Sépare le texte du hadith de sa référence finale."""
+    match = REFERENCE_RE.search(line)
+    if not match:
+        return line, None
+    return line[:match.start()].rstrip(), parse_reference(match["ref"])
+
+
+class SortedLookup(Mapping):
+    """Table clé -> indice en deux séquences triées : recherche par dichotomie.
+
+    Même forme en mémoire et dans le corpus compilé, où elle est mappée sans copie.
+    """
+
+    __slots__ = ('sorted_keys', 'doc_ids')
+
+    def __init__(self, sorted_keys: Sequence[str], doc_ids: Sequence[int]):
+        self.sorted_keys = sorted_keys
+        self.doc_ids = doc_ids
+
+    @classmethod
+    def of(cls, items: Dict[str, int]) -> "SortedLookup":
+        keys = sorted(items)
+        return cls(keys, array('I', (items[key] for key in keys)))
+
+    def __getitem__(self, key: str) -> int:
+        i = bisect_left(self.sorted_keys, key)
+        if i == len(self.sorted_keys) or self.sorted_keys[i] != key:
+            raise KeyError(key)
+        return self.doc_ids[i]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.sorted_keys)
+
+    def __len__(self) -> int:
+        return len(self.sorted_keys)
+
+
+class LazyRefs(Sequence):
+    """Références découpées à l'accès, pour un index relu depuis le corpus compilé."""
+
+    __slots__ = ('hadiths',)
+
+    def __init__(self, hadiths: Sequence[str]):
+        self.hadiths = hadiths
+
+    def __len__(self) -> int:
+        return len(self.hadiths)
+
+    def __getitem__(self, doc_id: int) -> Optional[HadithRef]:
+        return split_hadith(self.hadiths[doc_id])[1]
+
+
+def number_key(slug: str, number: str) -> str:
+    return f"{slug} {number}"
+
+def book_key(slug: str, book: int, hadith: int) -> str:
+    return f"{slug} {book}:{hadith}"
+
+
+class ReferenceIndex:
+    """Index d'une langue : numéro, (livre, hadith) et jeton de référence."""
+
+    __slots__ = ('hadiths', 'body_lengths', 'refs', 'by_number', 'by_book', 'by_token')
+
+    def __init__(self, hadiths: Sequence[str]):
+        # Seule la longueur du texte est gardée : les lignes restent dans le corpus
+        self.hadiths = hadiths
+        self.body_lengths = array('I')
+        refs: List[Optional[HadithRef]] = []
+        by_number: Dict[str, int] = {}
+        by_book: Dict[str, int] = {}
+        # Relie les traductions ; sert aussi aux boutons persistants (la position peut changer)
+        by_token: Dict[str, int] = {}
+        for doc_id, line in enumerate(hadiths):
+            body, ref = split_hadith(line)
+            self.body_lengths.append(len(body))
+            refs.append(ref)
+            if ref is None:
+                continue
+            by_token.setdefault(ref.token, doc_id)
+            if ref.number is not None:
+                by_number.setdefault(number_key(ref.slug, ref.number), doc_id)
+            if ref.book is not None:
+                by_book.setdefault(book_key(ref.slug, ref.book, ref.hadith), doc_id)
+        self.refs: Sequence[Optional[HadithRef]] = tuple(refs)
+        self.by_number = SortedLookup.of(by_number)
+        self.by_book = SortedLookup.of(by_book)
+        self.by_token = SortedLookup.of(by_token)
+
+    @classmethod
+    def from_tables(cls, hadiths: Sequence[str], tables: Mapping[str, Sequence]) -> Optional["ReferenceIndex"]:
+        """Index relu depuis les tables du corpus compilé, None si absentes ou d'un autre format."""
+        if list(tables.get("refs.version", ())) != [INDEX_VERSION]:
+            return None
+        index = cls.__new__(cls)
+        index.hadiths = hadiths
+        index.body_lengths = tables["refs.lengths"]
+        index.refs = LazyRefs(hadiths)
+        index.by_number = SortedLookup(tables["refs.number_keys"], tables["refs.number_docs"])
+        index.by_book = SortedLookup(tables["refs.book_keys"], tables["refs.book_docs"])
+        index.by_token = SortedLookup(tables["refs.token_keys"], tables["refs.token_docs"])
+        return index
+
+    def tables(self) -> Dict[str, Sequence]:
+        """Tables à écrire dans le corpus compilé (corpusbin.py)."""
+        return {"refs.version": array('I', [INDEX_VERSION]), "refs.lengths": self.body_lengths,
+                "refs.number_keys": self.by_number.sorted_keys, "refs.number_docs": self.by_number.doc_ids,
+                "refs.book_keys": self.by_book.sorted_keys, "refs.book_docs": self.by_book.doc_ids,
+                "refs.token_keys": self.by_token.sorted_keys, "refs.token_docs": self.by_token.doc_ids}
+
+    def body(self, doc_id: int) -> str:
+        """Texte du hadith sans sa référence."""
+        return self.hadiths[doc_id][:self.body_lengths[doc_id]]
+
+    def lookup(self, collection: str, number: str) -> Optional[int]:
+        """Indice du hadith pour « bukhari 15 » ou « bukhari 2:8 » (livre:hadith)."""
+        slug = slugify(collection)
+        number = number.strip().lower()
+        if ":" in number:
+            book, _, hadith = number.partition(":")
+            if book.isdigit() and hadith.isdigit():
+                return self.by_book.get(book_key(slug, int(book), int(hadith)))
+            return None
+        return self.by_number.get(number_key(slug, number))
+
+
+def build_index(language) -> ReferenceIndex:
+    """Références des hadiths d'une langue (recueil et numéro, livre, traduction) pour hs!hadith.
+
+    Mappé depuis le corpus compilé s'il en contient les tables, sinon construit.
+    """
+    return ReferenceIndex.from_tables(language.hadiths, language.tables) or ReferenceIndex(language.hadiths)
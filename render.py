@@ -0,0 +1,39 @@
+"""
+Cache des embeds précalculés, invalidé à chaque nouvelle version du corpus.
+
+Les objets mis en cache sont partagés entre toutes les interactions : ils ne
+doivent jamais être modifiés après construction.
+"""
+from typing import Any, Callable, Dict, Hashable
+
+import metrics
+
+HITS = metrics.counter('hs_render_cache_hits_total', "Embeds servis depuis le cache")
+MISSES = metrics.counter('hs_render_cache_misses_total', "Embeds construits")
+
+
+class RenderCache:
+    """Mémoïsation par clé, valable pour une seule version du corpus."""
+
+    def __init__(self):
+        self.version: int | None = None
+        self._entries: Dict[Hashable, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self, version: int | None = None):
+        self._entries.clear()
+        self.version = version
+
+    def get(self, key: Hashable, version: int, build: Callable[[], Any]) -> Any:
+        if version != self.version:
+            self.invalidate(version)
+        try:
+            value = self._entries[key]
+        except KeyError:
+            MISSES.inc()
+            value = self._entries[key] = build()
+            return value
+        HITS.inc()
+        return value
@@ -0,0 +1,63 @@
+"""
+Encodage compact de l'état des vues dans le custom_id des boutons.
+
+Discord limite un custom_id à 100 caractères : les entiers sont écrits en
+base 36 et l'ordre des réponses d'une question est l'indice d'une des six
+permutations de (bonne, mauvaise 1, mauvaise 2).
+"""
+import itertools
+import zlib
+from typing import Iterable, List, Sequence, Tuple
+
+CUSTOM_ID_MAX = 100
+# Taille de banque supposée pour borner un custom_id de quiz : indices sur 4 chiffres
+QUIZ_BANK_MAX = 36 ** 4
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+# PERMUTATIONS[p][i] = indice de la réponse d'origine affichée sur le bouton i
+PERMUTATIONS: Tuple[Tuple[int, ...], ...] = tuple(itertools.permutations(range(3)))
+
+
+def b36(number: int) -> str:
+    if number < 0:
+        raise ValueError("entier négatif")
+    if number == 0:
+        return "0"
+    out = []
+    while number:
+        number, rem = divmod(number, 36)
+        out.append(DIGITS[rem])
+    return "".join(reversed(out))
+
+def from_b36(text: str) -> int:
+    return int(text, 36)
+
+def encode_indices(indices: Iterable[int]) -> str:
+    return ".".join(b36(i) for i in indices)
+
+def decode_indices(text: str) -> List[int]:
+    return [from_b36(part) for part in text.split(".")] if text else []
+
+def fingerprint(entries: Sequence[Sequence[str]]) -> str:
+    """Empreinte courte d'une banque de questions, pour refuser un état périmé."""
+    crc = 0
+    for entry in entries:
+        crc = zlib.crc32("\x1f".join(entry).encode("utf-8"), crc)
+    return b36(crc)[:4]
+
+def check_length(custom_id: str) -> str:
+    if len(custom_id) > CUSTOM_ID_MAX:
+        raise ValueError(f"custom_id trop long ({len(custom_id)} > {CUSTOM_ID_MAX})")
+    return custom_id
+
+def quiz_id_length(questions: int, lang_length: int, bank_size: int = QUIZ_BANK_MAX) -> int:
+    """Longueur du plus long custom_id de quiz persistant (voir PersistentQuizButton)."""
+    return len(f"hs:q:{'X' * lang_length}:{b36(2 ** 64 - 1)}:xxxx:"
+               f"{encode_indices([bank_size - 1] * questions)}:{b36(max(questions - 1, 0))}:"
+               f"{b36(2 ** questions - 1)}:5:2")
+
+def max_quiz_length(lang_length: int, bank_size: int = QUIZ_BANK_MAX) -> int:
+    """Plus grand nombre de questions dont l'état tient dans un custom_id."""
+    questions = 1
+    while quiz_id_length(questions + 1, lang_length, bank_size) <= CUSTOM_ID_MAX:
+        questions += 1
+    return questions
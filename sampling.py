@@ -0,0 +1,83 @@
+"""
+Tirage des hadiths sans répétition : un « sac mélangé » par salon ou serveur.
+
+Chaque sac est une permutation incrémentale (Fisher-Yates) stockée dans un
+array('I') : un tirage coûte O(1) et tous les hadiths sortent une fois avant
+qu'un seul ne se répète. Les sacs inactifs sont évincés (LRU).
+"""
+import os
+import random
+from array import array
+from collections import OrderedDict
+from typing import Hashable, Tuple
+
+import metrics
+
+# --- Configuration ---
+
+MAX_BAGS = int(os.environ.get('HS_SAMPLER_MAX_BAGS', 10000))
+# "channel" ou "guild" : portée du sac
+SCOPE = os.environ.get('HS_SAMPLER_SCOPE', 'channel')
+
+BAGS = metrics.gauge('hs_sampler_bags', "Sacs de tirage actifs")
+EVICTIONS = metrics.counter('hs_sampler_evictions_total', "Sacs évincés (LRU)")
+
+
+class ShuffleBag:
+    """Permutation paresseuse de range(size) ; draw() est O(1)."""
+
+    __slots__ = ('order', 'pos')
+
+    def __init__(self, size: int):
+        self.order = array('I', range(size))
+        self.pos = 0
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def draw(self, rng: random.Random = random) -> int:
+        order = self.order
+        size = len(order)
+        if size == 0:
+            raise IndexError("sac vide")
+        if self.pos >= size:
+            # Nouveau tour : l'élément tiré en dernier est en fin de tableau,
+            # on l'exclut du premier tirage pour éviter une répétition immédiate.
+            self.pos = 0
+            j = rng.randrange(0, size - 1) if size > 1 else 0
+        else:
+            j = rng.randrange(self.pos, size)
+        pos = self.pos
+        order[pos], order[j] = order[j], order[pos]
+        self.pos = pos + 1
+        return order[pos]
+
+
+class HadithSampler:
+    """Sacs de tirage par (portée, langue), bornés par une éviction LRU."""
+
+    def __init__(self, max_bags: int = MAX_BAGS, rng: random.Random = random):
+        self.max_bags = max_bags
+        self.rng = rng
+        self._bags: "OrderedDict[Tuple[Hashable, str], ShuffleBag]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._bags)
+
+    def draw(self, scope: Hashable, lang: str, size: int) -> int:
+        """Indice du prochain hadith pour cette portée, dans range(size)."""
+        key = (scope, lang)
+        bag = self._bags.get(key)
+        if bag is None or len(bag) != size:
+            # Nouveau salon, ou corpus rechargé avec un autre nombre de hadiths
+            bag = self._bags[key] = ShuffleBag(size)
+            while len(self._bags) > self.max_bags:
+                self._bags.popitem(last=False)
+                EVICTIONS.inc()
+            BAGS.set(len(self._bags))
+        else:
+            self._bags.move_to_end(key)
+        return bag.draw(self.rng)
+
+
+sampler = HadithSampler()
@@ -0,0 +1,290 @@
+"""
+Scores des quiz : enregistrement différé et classements précalculés.
+
+Un quiz terminé est ajouté à une file en mémoire ; un worker l'écrit dans
+SQLite par lots (une transaction) depuis le thread de la base, la boucle
+d'événements n'attend jamais le disque. Les classements par serveur et le
+classement global sont tenus en mémoire et mis à jour à chaque résultat
+(O(log n) pour trouver la place, décalage mémoire pour insérer) : hs!leaderboard
+et hs!stats ne lisent jamais la base.
+
+En mode cluster, chaque processus ne voit que ses propres résultats entre
+deux relectures complètes (HS_SCORE_REFRESH secondes, 0 = jamais).
+"""
+import os
+import time
+import atexit
+import asyncio
+import logging
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import metrics
+import storage
+
+logger = logging.getLogger('HadithSahih.scores')
+
+# --- Configuration ---
+
+FLUSH_INTERVAL = float(os.environ.get('HS_SCORE_FLUSH_INTERVAL', 5))
+FLUSH_BATCH = int(os.environ.get('HS_SCORE_FLUSH_BATCH', 500))
+# Au-delà, les plus anciens résultats non écrits sont abandonnés
+MAX_PENDING = int(os.environ.get('HS_SCORE_MAX_PENDING', 50000))
+REFRESH_INTERVAL = float(os.environ.get('HS_SCORE_REFRESH', 0))
+GLOBAL = None  # clé du classement global
+# Boîte de Leitner la plus haute (quizengine.py)
+MAX_BOX = 5
+
+PENDING = metrics.gauge('hs_score_pending', "Résultats de quiz en attente d'écriture")
+FLUSHES = metrics.counter('hs_score_flushes_total', "Écritures groupées des résultats", ("result",))
+DROPPED = metrics.counter('hs_score_dropped_total', "Résultats abandonnés (file pleine)")
+FLUSH_SECONDS = metrics.histogram('hs_score_flush_seconds', "Durée d'une écriture groupée")
+
+storage.db.add_schema("""
+CREATE TABLE IF NOT EXISTS quiz_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    guild_id INTEGER NOT NULL,
+    lang TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    finished_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS quiz_totals (
+    user_id INTEGER NOT NULL,
+    guild_id INTEGER NOT NULL,
+    quizzes INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    answered INTEGER NOT NULL,
+    perfect INTEGER NOT NULL,
+    PRIMARY KEY (user_id, guild_id)
+);
+CREATE TABLE IF NOT EXISTS quiz_history (
+    user_id INTEGER NOT NULL,
+    lang TEXT NOT NULL,
+    question INTEGER NOT NULL,
+    box INTEGER NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (user_id, lang, question)
+);
+""")
+
+
+class QuizResult(NamedTuple):
+    user_id: int
+    guild_id: int  # 0 en message privé
+    lang: str
+    score: int
+    total: int
+    finished_at: float
+
+
+class Totals(NamedTuple):
+    quizzes: int = 0
+    correct: int = 0
+    answered: int = 0
+    perfect: int = 0
+
+    def add(self, other: "Totals") -> "Totals":
+        return Totals(*(a + b for a, b in zip(self, other)))
+
+    @property
+    def accuracy(self) -> float:
+        return self.correct / self.answered if self.answered else 0.0
+
+    @classmethod
+    def of(cls, result: QuizResult) -> "Totals":
+        return cls(1, result.score, result.total, int(result.score == result.total))
+
+
+class Ranking:
+    """Classement d'une portée : totaux par utilisateur et liste triée des clés."""
+
+    __slots__ = ('totals', 'order')
+
+    def __init__(self):
+        self.totals: Dict[int, Totals] = {}
+        # (-bonnes réponses, quiz joués, utilisateur) : plus de bonnes réponses
+        # d'abord, puis moins de quiz pour les départager
+        self.order: List[Tuple[int, int, int]] = []
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    @staticmethod
+    def _key(user_id: int, totals: Totals) -> Tuple[int, int, int]:
+        return (-totals.correct, totals.quizzes, user_id)
+
+    def update(self, user_id: int, delta: Totals):
+        old = self.totals.get(user_id)
+        if old is not None:
+            del self.order[bisect_left(self.order, self._key(user_id, old))]
+        new = old.add(delta) if old is not None else delta
+        self.totals[user_id] = new
+        insort(self.order, self._key(user_id, new))
+
+    def top(self, limit: int) -> List[Tuple[int, Totals]]:
+        return [(user_id, self.totals[user_id]) for _, _, user_id in self.order[:limit]]
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """Place de l'utilisateur (1 = premier), None s'il n'a jamais joué."""
+        totals = self.totals.get(user_id)
+        if totals is None:
+            return None
+        return bisect_left(self.order, self._key(user_id, totals)) + 1
+
+
+class ScoreStore:
+    """Tables quiz_results, quiz_totals et quiz_history ; appelé depuis le thread de la base."""
+
+    def __init__(self, db: storage.Database = storage.db):
+        self.db = db
+
+    def write_batch(self, results: List[QuizResult], history: Sequence[tuple] = ()):
+        """Résultats et historique par question (quizengine.py) en une transaction."""
+        conn = self.db.connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO quiz_results (user_id, guild_id, lang, score, total, finished_at) VALUES (?, ?, ?, ?, ?, ?)",
+                results)
+            conn.executemany(
+                "INSERT INTO quiz_totals (user_id, guild_id, quizzes, correct, answered, perfect) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(user_id, guild_id) DO UPDATE SET quizzes = quizzes + excluded.quizzes, "
+                "correct = correct + excluded.correct, answered = answered + excluded.answered, "
+                "perfect = perfect + excluded.perfect",
+                [(r.user_id, r.guild_id, *Totals.of(r)) for r in results])
+            # La boîte suivante se calcule sur la ligne enregistrée, pas sur le cache
+            # de quizengine (l'historique a pu en être évincé pendant le quiz)
+            conn.executemany(
+                "INSERT INTO quiz_history (user_id, lang, question, box, seen_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(user_id, lang, question) DO UPDATE SET "
+                f"box = CASE WHEN excluded.box THEN MIN(box + 1, {MAX_BOX}) ELSE 0 END, seen_at = excluded.seen_at",
+                history)
+
+    def load_totals(self) -> List[tuple]:
+        return self.db.fetchall("SELECT user_id, guild_id, quizzes, correct, answered, perfect FROM quiz_totals")
+
+    def load_history(self, user_id: int, lang: str) -> List[tuple]:
+        return self.db.fetchall("SELECT question, box, seen_at FROM quiz_history WHERE user_id = ? AND lang = ?",
+                                (user_id, lang))
+
+
+class ScoreBoard:
+    """File d'écriture différée et classements en mémoire."""
+
+    def __init__(self, store: Optional[ScoreStore] = None, flush_interval: float = FLUSH_INTERVAL,
+                 flush_batch: int = FLUSH_BATCH, max_pending: int = MAX_PENDING,
+                 refresh_interval: float = REFRESH_INTERVAL):
+        self.store = store or ScoreStore()
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.refresh_interval = refresh_interval
+        # Bornée par _trim() et non par maxlen : un lot remis en tête ne doit pas évincer les plus récents
+        self.max_pending = max_pending
+        self.pending: Deque[QuizResult] = deque()
+        # Lignes de quiz_history, écrites avec le lot de résultats suivant
+        self.pending_history: List[tuple] = []
+        self.rankings: Dict[Optional[int], Ranking] = {}
+        self._flush_now = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def ranking(self, guild_id: Optional[int]) -> Ranking:
+        ranking = self.rankings.get(guild_id)
+        if ranking is None:
+            ranking = self.rankings[guild_id] = Ranking()
+        return ranking
+
+    def _apply(self, user_id: int, guild_id: int, delta: Totals):
+        self.ranking(guild_id).update(user_id, delta)
+        self.ranking(GLOBAL).update(user_id, delta)
+
+    def record(self, user_id: int, guild_id: Optional[int], lang: str, score: int, total: int,
+               history: Sequence[Tuple[int, int, float]] = ()):
+        """Compte un quiz terminé ; écrit plus tard par le worker.
+
+        history : lignes (question, bonne réponse 0/1, vu le) produites par quizengine.
+        """
+        result = QuizResult(user_id, guild_id or 0, lang, score, total, time.time())
+        self.pending_history.extend((user_id, lang, *row) for row in history)
+        self.pending.append(result)
+        self._trim()
+        PENDING.set(len(self.pending))
+        self._apply(result.user_id, result.guild_id, Totals.of(result))
+        if len(self.pending) >= self.flush_batch:
+            self._flush_now.set()
+
+    def _trim(self) -> int:
+        """Abandonne les plus anciens résultats non écrits au-delà de max_pending ; renvoie leur nombre."""
+        dropped = 0
+        while len(self.pending) > self.max_pending:
+            self.pending.popleft()
+            dropped += 1
+        if dropped:
+            DROPPED.inc(dropped)
+        return dropped
+
+    # --- Worker ---
+
+    async def load(self):
+        rows = await storage.db.run(self.store.load_totals)
+        rankings: Dict[Optional[int], Ranking] = {}
+        self.rankings = rankings
+        for user_id, guild_id, *totals in rows:
+            self._apply(user_id, guild_id, Totals(*totals))
+        # Résultats arrivés pendant la lecture (pas encore écrits)
+        for result in self.pending:
+            self._apply(result.user_id, result.guild_id, Totals.of(result))
+        logger.info(f"Scores chargés : {len(self.ranking(GLOBAL))} joueur(s), {len(rankings) - 1} serveur(s).")
+
+    async def flush(self):
+        while self.pending or self.pending_history:
+            batch = [self.pending.popleft() for _ in range(min(self.flush_batch, len(self.pending)))]
+            history, self.pending_history = self.pending_history, []
+            started = time.perf_counter()
+            try:
+                await storage.db.run(self.store.write_batch, batch, history)
+            except Exception as e:
+                # Remis en tête de file ; nouvel essai au prochain cycle
+                self.pending.extendleft(reversed(batch))
+                self.pending_history[:0] = history
+                dropped = self._trim()
+                FLUSHES.inc(result="error")
+                logger.error(f"Écriture des scores impossible : {e!r}"
+                             + (f" ; file pleine, {dropped} résultat(s) abandonné(s)" if dropped else ""))
+                break
+            FLUSH_SECONDS.observe(time.perf_counter() - started)
+            FLUSHES.inc(result="ok")
+        PENDING.set(len(self.pending))
+
+    def flush_sync(self):
+        """Dernière écriture à la fermeture du processus (hors boucle)."""
+        if self.pending or self.pending_history:
+            self.store.write_batch(list(self.pending), self.pending_history)
+            self.pending.clear()
+            self.pending_history = []
+
+    def start(self):
+        if self._task is None:
+            atexit.register(self.flush_sync)
+            self._task = asyncio.create_task(self._run(), name="score-writer")
+
+    async def _run(self):
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Lecture des scores impossible : {e!r}")
+        last_refresh = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            await self.flush()
+            if self.refresh_interval and time.monotonic() - last_refresh >= self.refresh_interval:
+                last_refresh = time.monotonic()
+                await self.load()
+
+
+board = ScoreBoard()
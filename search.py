@@ -0,0 +1,125 @@
+"""
+Recherche plein texte dans les hadiths : index inversé et score BM25.
+
+L'index est construit au chargement du corpus (hors de la boucle), ou compilé
+avec le corpus binaire et mappé tel quel ; une requête ne parcourt que les
+listes de postings de ses termes.
+"""
+import re
+import math
+import heapq
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+TOKEN_RE = re.compile(r"\w+")
+# BM25 : saturation de la fréquence et normalisation par la longueur
+K1 = 1.2
+B = 0.75
+# À incrémenter si la tokenisation ou les tables changent : le corpus compilé est alors ignoré
+INDEX_VERSION = 1
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has he his in is it its of on or that the their them they this to was
+were will with who which you your i me my we our not no so but if all any one
+au aux avec ce ces dans de des du elle en et eux il ils je la le les leur lui ma mais me meme mes moi mon ne
+nos notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une vos votre vous
+c d j l m n s t y est sont ete etre fait a
+""".split())
+
+
+def fold(text: str) -> str:
+    """Minuscules sans accents : « Prière » et « priere » donnent le même terme."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_RE.findall(fold(text))
+            if len(token) > 1 and token not in STOPWORDS]
+
+
+class SearchIndex:
+    """Index inversé d'une langue : termes triés, postings à plat (documents, fréquences).
+
+    Les tables sont des séquences d'entiers et de textes : construites en
+    mémoire depuis les hadiths, ou mappées depuis le corpus compilé (tables()).
+    """
+
+    __slots__ = ('terms', 'starts', 'doc_ids', 'freqs', 'doc_lengths', 'avg_length', 'size')
+
+    def __init__(self, documents: Sequence[str]):
+        postings: Dict[str, Tuple[array, array]] = {}
+        doc_lengths = array('I')
+        for doc_id, text in enumerate(documents):
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            for term, freq in Counter(tokens).items():
+                entry = postings.get(term)
+                if entry is None:
+                    entry = postings[term] = (array('I'), array('I'))
+                entry[0].append(doc_id)
+                entry[1].append(freq)
+        # Postings du terme terms[i] : doc_ids[starts[i]:starts[i + 1]]
+        terms = sorted(postings)
+        starts, doc_ids, freqs = array('I', [0]), array('I'), array('I')
+        for term in terms:
+            doc_ids.extend(postings[term][0])
+            freqs.extend(postings[term][1])
+            starts.append(len(doc_ids))
+        self._set(terms, starts, doc_ids, freqs, doc_lengths)
+
+    def _set(self, terms: Sequence[str], starts: Sequence[int], doc_ids: Sequence[int], freqs: Sequence[int],
+             doc_lengths: Sequence[int]):
+        self.terms = terms
+        self.starts = starts
+        self.doc_ids = doc_ids
+        self.freqs = freqs
+        self.doc_lengths = doc_lengths
+        self.size = len(doc_lengths)
+        self.avg_length = (sum(doc_lengths) / self.size) if self.size else 0.0
+
+    @classmethod
+    def from_tables(cls, tables: Mapping[str, Sequence]) -> Optional["SearchIndex"]:
+        """Index relu depuis les tables du corpus compilé, None si absentes ou d'un autre format."""
+        if list(tables.get("search.version", ())) != [INDEX_VERSION]:
+            return None
+        index = cls.__new__(cls)
+        index._set(tables["search.terms"], tables["search.starts"], tables["search.doc_ids"],
+                   tables["search.freqs"], tables["search.lengths"])
+        return index
+
+    def tables(self) -> Dict[str, Sequence]:
+        """Tables à écrire dans le corpus compilé (corpusbin.py)."""
+        return {"search.version": array('I', [INDEX_VERSION]), "search.terms": self.terms,
+                "search.starts": self.starts, "search.doc_ids": self.doc_ids, "search.freqs": self.freqs,
+                "search.lengths": self.doc_lengths}
+
+    def postings(self, term: str) -> Optional[Tuple[Sequence[int], Sequence[int]]]:
+        i = bisect_left(self.terms, term)
+        if i == len(self.terms) or self.terms[i] != term:
+            return None
+        start, end = self.starts[i], self.starts[i + 1]
+        return self.doc_ids[start:end], self.freqs[start:end]
+
+    def search(self, query: str, limit: int = 25) -> List[Tuple[int, float]]:
+        """[(indice du hadith, score)] par score décroissant."""
+        if not self.size:
+            return []
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            entry = self.postings(term)
+            if entry is None:
+                continue
+            doc_ids, freqs = entry
+            idf = math.log(1 + (self.size - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            for doc_id, freq in zip(doc_ids, freqs):
+                norm = K1 * (1 - B + B * self.doc_lengths[doc_id] / self.avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (K1 + 1) / (freq + norm)
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+def build_index(language) -> SearchIndex:
+    """Index BM25 des hadiths d'une langue : mappé depuis le corpus compilé, sinon construit."""
+    return SearchIndex.from_tables(language.tables) or SearchIndex(language.hadiths)
@@ -0,0 +1,159 @@
+"""
+Registre des sessions interactives (vues BookBrowser, QuizView, LanguageSelect).
+
+Une vue reste en mémoire jusqu'à son timeout ; sans limite, une rafale de
+commandes en accumule autant. Le registre suit les vues vivantes par
+(utilisateur, salon) :
+
+  - une nouvelle vue du même utilisateur dans le même salon remplace l'ancienne ;
+  - au-delà de MAX_PER_USER vues pour un utilisateur, la plus ancienne est fermée ;
+  - au-delà de MAX_SESSIONS vues au total, la plus ancienne est fermée.
+
+`open` renvoie les vues évincées : à l'appelant de les arrêter et de désactiver
+leurs boutons. La mémoire de chaque vue est estimée à l'ouverture (`footprint`)
+et exposée avec le nombre de vues par type dans /metrics. Mesurer une vue
+coûte plus cher que de la créer : seule une ouverture sur SAMPLE_EVERY est
+mesurée, les autres reprennent la moyenne de leur type.
+"""
+import os
+import sys
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+import metrics
+
+# --- Configuration ---
+
+MAX_SESSIONS = int(os.environ.get('HS_MAX_SESSIONS', 10000))
+MAX_PER_USER = int(os.environ.get('HS_SESSIONS_PER_USER', 3))
+FOOTPRINT_DEPTH = 4
+SAMPLE_EVERY = int(os.environ.get('HS_SESSION_SAMPLE_EVERY', 32))
+
+SESSIONS = metrics.gauge('hs_sessions', "Vues interactives en mémoire", ("kind",))
+SESSION_BYTES = metrics.gauge('hs_session_bytes', "Mémoire estimée des vues interactives")
+EVICTIONS = metrics.counter('hs_session_evictions_total', "Vues fermées avant leur timeout", ("reason",))
+
+_ATOMS = (str, bytes, int, float, bool, type(None))
+_CONTAINERS = (list, tuple, set, frozenset)
+
+
+def footprint(obj: Any, exclude: Iterable[str] = (), depth: int = FOOTPRINT_DEPTH) -> int:
+    """Taille estimée des objets propres à obj, en octets.
+
+    sys.getsizeof récursif et borné : parcourt les conteneurs et les objets à
+    __dict__ (vue, boutons) ; les objets à __slots__ (messages, composants
+    discord.py) ne comptent que pour leur propre taille. Les attributs de obj
+    listés dans exclude (pages et questions du corpus, partagées) sont ignorés.
+    """
+    seen = set()
+    skip = set(exclude)
+
+    def walk(value: Any, level: int) -> int:
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+        size = sys.getsizeof(value)
+        if isinstance(value, _ATOMS) or level >= depth:
+            return size
+        if isinstance(value, dict):
+            return size + sum(walk(k, level + 1) + walk(v, level + 1) for k, v in value.items())
+        if isinstance(value, _CONTAINERS):
+            return size + sum(walk(item, level + 1) for item in value)
+        attrs = getattr(value, '__dict__', None)
+        if isinstance(attrs, dict):
+            seen.add(id(attrs))
+            size += sys.getsizeof(attrs)
+            size += sum(walk(v, level + 1) for k, v in attrs.items() if not (level == 0 and k in skip))
+        return size
+
+    return walk(obj, 0)
+
+
+class Session(NamedTuple):
+    kind: str
+    view: Any
+    size: int
+
+
+class SessionRegistry:
+    def __init__(self, max_sessions: int = MAX_SESSIONS, max_per_user: int = MAX_PER_USER,
+                 sample_every: int = SAMPLE_EVERY):
+        self.max_sessions = max_sessions
+        self.max_per_user = max_per_user
+        self.sample_every = max(1, sample_every)
+        # (utilisateur, salon) -> session, dans l'ordre d'ouverture
+        self._sessions: "OrderedDict[Tuple[int, int], Session]" = OrderedDict()
+        # utilisateur -> salons de ses sessions, du plus ancien au plus récent
+        self._by_user: Dict[int, List[int]] = {}
+        self._kinds: Dict[str, int] = {}
+        # type -> (ouvertures, moyenne mesurée en octets)
+        self._sizes: Dict[str, Tuple[int, float]] = {}
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self._kinds)
+
+    def _count(self, kind: str, delta: int):
+        self._kinds[kind] = self._kinds.get(kind, 0) + delta
+        SESSIONS.set(self._kinds[kind], kind=kind)
+        SESSION_BYTES.set(self.bytes)
+
+    def _estimate(self, kind: str, view: Any, exclude: Iterable[str]) -> int:
+        opened, average = self._sizes.get(kind, (0, 0.0))
+        if opened % self.sample_every == 0:
+            samples = opened // self.sample_every
+            average += (footprint(view, exclude) - average) / (samples + 1)
+        self._sizes[kind] = (opened + 1, average)
+        return int(average)
+
+    def _remove(self, key: Tuple[int, int]) -> Session:
+        session = self._sessions.pop(key)
+        user_id, channel_id = key
+        channels = self._by_user[user_id]
+        channels.remove(channel_id)
+        if not channels:
+            del self._by_user[user_id]
+        self.bytes -= session.size
+        self._count(session.kind, -1)
+        return session
+
+    def open(self, user_id: int, channel_id: int, kind: str, view: Any,
+             exclude: Iterable[str] = ()) -> List[Any]:
+        """Enregistre une vue ; renvoie les vues évincées pour lui faire place."""
+        evicted = []
+        key = (user_id, channel_id)
+        if key in self._sessions:
+            evicted.append(self._remove(key).view)
+            EVICTIONS.inc(reason="replaced")
+        channels = self._by_user.get(user_id, ())
+        while len(channels) >= self.max_per_user:
+            evicted.append(self._remove((user_id, channels[0])).view)
+            EVICTIONS.inc(reason="user_limit")
+            channels = self._by_user.get(user_id, ())
+        while len(self._sessions) >= self.max_sessions:
+            evicted.append(self._remove(next(iter(self._sessions))).view)
+            EVICTIONS.inc(reason="capacity")
+
+        session = Session(kind, view, self._estimate(kind, view, exclude))
+        self._sessions[key] = session
+        self._by_user.setdefault(user_id, []).append(channel_id)
+        self.bytes += session.size
+        self._count(kind, 1)
+        return evicted
+
+    def close(self, user_id: int, channel_id: int, view: Any):
+        """Retire la vue si c'est toujours elle qui occupe (utilisateur, salon)."""
+        key = (user_id, channel_id)
+        session = self._sessions.get(key)
+        if session is not None and session.view is view:
+            self._remove(key)
+
+    def get(self, user_id: int, channel_id: int) -> Any:
+        session = self._sessions.get((user_id, channel_id))
+        return session.view if session is not None else None
+
+
+registry = SessionRegistry()
@@ -0,0 +1,176 @@
+"""
+Sharding du bot : AutoShardedBot dans un processus, ou grappes de shards
+lancées comme processus séparés.
+
+HS_SHARDING :
+  - "off" (défaut) : un seul gateway, commands.Bot ;
+  - "auto" : AutoShardedBot, nombre de shards choisi par Discord ou HS_SHARD_COUNT ;
+  - "cluster" : le processus parent lance HS_CLUSTERS processus enfants, chacun
+    gérant une tranche des HS_SHARD_COUNT shards.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import subprocess
+from typing import Any, Dict, List, Optional
+
+import metrics
+
+logger = logging.getLogger('HadithSahih.sharding')
+
+# --- Configuration ---
+
+MODE = os.environ.get('HS_SHARDING', 'off')
+SHARD_COUNT = int(os.environ['HS_SHARD_COUNT']) if os.environ.get('HS_SHARD_COUNT') else None
+CLUSTERS = int(os.environ.get('HS_CLUSTERS', 1))
+# Défini par le lanceur dans chaque processus enfant
+CLUSTER_ID = int(os.environ['HS_CLUSTER_ID']) if os.environ.get('HS_CLUSTER_ID') else None
+STATE_DIR = os.environ.get('HS_CLUSTER_STATE_DIR', '.clusters')
+REPORT_INTERVAL = 30
+# Au-delà, l'état publié par une grappe est considéré comme mort
+STATE_TTL = 3 * REPORT_INTERVAL
+
+ENABLED = MODE in ("auto", "cluster")
+
+SHARD_LATENCY = metrics.gauge('hs_shard_latency_seconds', "Latence du heartbeat par shard", ("shard",))
+SHARD_EVENTS = metrics.counter('hs_shard_events_total', "Événements reçus par shard", ("shard", "event"))
+GUILDS = metrics.gauge('hs_guilds', "Serveurs vus par ce processus")
+
+
+def cluster_shard_ids(cluster_id: int, clusters: int, shard_count: int) -> List[int]:
+    """Shards d'une grappe : répartition en tranches contiguës."""
+    per_cluster, extra = divmod(shard_count, clusters)
+    start = cluster_id * per_cluster + min(cluster_id, extra)
+    size = per_cluster + (1 if cluster_id < extra else 0)
+    return list(range(start, start + size))
+
+def bot_options() -> Dict[str, Any]:
+    """Arguments supplémentaires pour AutoShardedBot selon le mode."""
+    if MODE == "cluster" and CLUSTER_ID is not None:
+        if not SHARD_COUNT:
+            raise RuntimeError("HS_SHARD_COUNT est requis en mode cluster.")
+        return {"shard_count": SHARD_COUNT,
+                "shard_ids": cluster_shard_ids(CLUSTER_ID, CLUSTERS, SHARD_COUNT)}
+    if MODE == "auto" and SHARD_COUNT:
+        return {"shard_count": SHARD_COUNT}
+    return {}
+
+def is_launcher() -> bool:
+    """Vrai pour le processus parent du mode cluster (il ne se connecte pas)."""
+    return MODE == "cluster" and CLUSTER_ID is None
+
+# --- Statistiques par shard ---
+
+def record_event(shard_id: Optional[int], event: str):
+    SHARD_EVENTS.inc(shard=shard_id if shard_id is not None else 0, event=event)
+
+def shard_latencies(bot) -> List[tuple]:
+    """[(shard_id, latence en secondes)], un seul élément sans sharding."""
+    latencies = getattr(bot, "latencies", None)
+    if latencies is not None:
+        return list(latencies)
+    return [(0, bot.latency)]
+
+def owns_guild(bot, guild_id: Optional[int]) -> bool:
+    """Vrai si le serveur est servi par un shard de ce processus."""
+    shard_ids = getattr(bot, "shard_ids", None)
+    if guild_id is None or not shard_ids or not bot.shard_count:
+        return True
+    return (guild_id >> 22) % bot.shard_count in shard_ids
+
+def _state_path(cluster_id: int) -> str:
+    return os.path.join(STATE_DIR, f"cluster_{cluster_id}.json")
+
+def publish_state(bot):
+    """Met à jour les jauges et publie le nombre de serveurs de la grappe."""
+    for shard_id, latency in shard_latencies(bot):
+        if latency == latency and latency != float("inf"):
+            SHARD_LATENCY.set(latency, shard=shard_id)
+    GUILDS.set(len(bot.guilds))
+    if CLUSTER_ID is None:
+        return
+    os.makedirs(STATE_DIR, exist_ok=True)
+    tmp_path = _state_path(CLUSTER_ID) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"guilds": len(bot.guilds), "updated": time.time()}, f)
+    os.replace(tmp_path, _state_path(CLUSTER_ID))
+
+def read_peer_guilds() -> int:
+    """Serveurs des autres grappes encore vivantes, d'après leurs fichiers d'état (lecture disque)."""
+    total = 0
+    now = time.time()
+    for cluster_id in range(CLUSTERS):
+        if cluster_id == CLUSTER_ID:
+            continue
+        try:
+            with open(_state_path(cluster_id), encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if now - state.get("updated", 0) < STATE_TTL:
+            total += int(state.get("guilds", 0))
+    return total
+
+# Relu par report_loop à chaque publication : les commandes ne touchent pas au disque
+_peer_guilds = 0
+
+def total_guild_count(local_count: int) -> int:
+    """Nombre total de serveurs, agrégé sur les grappes encore vivantes (à REPORT_INTERVAL près)."""
+    if CLUSTER_ID is None:
+        return local_count
+    return local_count + _peer_guilds
+
+async def report_loop(bot, interval: float = REPORT_INTERVAL):
+    global _peer_guilds
+    await bot.wait_until_ready()
+    loop = asyncio.get_running_loop()
+    while not bot.is_closed():
+        try:
+            await loop.run_in_executor(None, publish_state, bot)
+            if CLUSTER_ID is not None:
+                _peer_guilds = await loop.run_in_executor(None, read_peer_guilds)
+        except OSError as e:
+            logger.warning(f"Publication de l'état de la grappe impossible : {e}")
+        await asyncio.sleep(interval)
+
+# --- Lanceur de grappes ---
+
+def launch_clusters(script: str) -> int:
+    """Lance une grappe par processus et les relance si elles s'arrêtent."""
+    if not SHARD_COUNT:
+        logger.error("HS_SHARD_COUNT est requis en mode cluster.")
+        return 1
+    processes: Dict[int, subprocess.Popen] = {}
+
+    def spawn(cluster_id: int):
+        env = dict(os.environ, HS_CLUSTER_ID=str(cluster_id))
+        shards = cluster_shard_ids(cluster_id, CLUSTERS, SHARD_COUNT)
+        logger.info(f"Grappe {cluster_id} : shards {shards}")
+        processes[cluster_id] = subprocess.Popen([sys.executable, script], env=env)
+
+    for cluster_id in range(CLUSTERS):
+        spawn(cluster_id)
+    try:
+        while True:
+            time.sleep(5)
+            for cluster_id, process in list(processes.items()):
+                code = process.poll()
+                if code is None:
+                    continue
+                if code == 0:
+                    logger.info(f"Grappe {cluster_id} terminée.")
+                    del processes[cluster_id]
+                else:
+                    logger.warning(f"Grappe {cluster_id} arrêtée (code {code}), relance.")
+                    spawn(cluster_id)
+            if not processes:
+                return 0
+    except KeyboardInterrupt:
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.wait()
+    return 0
@@ -0,0 +1,107 @@
+"""
+Démarrage du bot : durée de chaque phase et porte de disponibilité.
+
+Le corpus et ses index se chargent dans un exécuteur pendant la poignée de
+main avec le gateway, au lieu de la précéder. Tant que tout ce qui est requis
+(REQUIREMENTS) n'est pas prêt, les commandes attendent (HS_READY_TIMEOUT
+secondes au plus) et /readyz répond 503.
+
+Les phases séquentielles (imports, connexion) sont des « checkpoints », les
+tâches parallèles (corpus, rendu) des « phases » chronométrées séparément ;
+les jalons (corpus prêt, gateway prêt) sont datés depuis le lancement. Le
+détail est écrit dans les logs une fois tous les jalons atteints (MILESTONES),
+exposé dans /metrics et /readyz.
+"""
+import os
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Optional
+
+import metrics
+
+logger = logging.getLogger('HadithSahih.startup')
+
+# --- Configuration ---
+
+READY_TIMEOUT = float(os.environ.get('HS_READY_TIMEOUT', 10))
+# Jalons nécessaires pour répondre aux commandes
+REQUIREMENTS = ("corpus",)
+# Jalons attendus avant d'écrire le détail du démarrage dans les logs
+MILESTONES = ("corpus", "gateway")
+
+PHASE_SECONDS = metrics.gauge('hs_startup_phase_seconds', "Durée des phases du démarrage", ("phase",))
+MILESTONE_SECONDS = metrics.gauge('hs_startup_milestone_seconds', "Jalons du démarrage, depuis le lancement", ("milestone",))
+
+
+class Startup:
+    def __init__(self, requirements: Iterable[str] = REQUIREMENTS, milestones: Iterable[str] = MILESTONES):
+        self.started = time.perf_counter()
+        self._last_checkpoint = self.started
+        self.phases: Dict[str, float] = {}
+        self.milestones: Dict[str, float] = {}
+        self.pending = set(requirements)
+        self.expected = set(milestones) | self.pending
+        self._ready = asyncio.Event()
+
+    @property
+    def ready(self) -> bool:
+        return not self.pending
+
+    def record(self, name: str, seconds: float):
+        self.phases[name] = seconds
+        PHASE_SECONDS.set(seconds, phase=name)
+
+    def checkpoint(self, name: str):
+        """Clôt une phase séquentielle : durée depuis le checkpoint précédent."""
+        now = time.perf_counter()
+        self.record(name, now - self._last_checkpoint)
+        self._last_checkpoint = now
+
+    @contextmanager
+    def phase(self, name: str):
+        """Chronomètre une phase qui peut se dérouler en parallèle d'autres."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def reach(self, milestone: str):
+        """Date un jalon ; le dernier jalon requis ouvre la porte, le dernier attendu clôt le détail."""
+        if milestone in self.milestones:
+            return
+        elapsed = time.perf_counter() - self.started
+        self.milestones[milestone] = elapsed
+        MILESTONE_SECONDS.set(elapsed, milestone=milestone)
+        if milestone in self.pending:
+            self.pending.discard(milestone)
+            if not self.pending:
+                self._ready.set()
+        # Le gateway peut arriver après le corpus : le détail attend tous les jalons
+        if milestone in self.expected and self.expected <= self.milestones.keys():
+            logger.info(f"Démarrage terminé en {elapsed:.2f} s ({self.breakdown()}).")
+
+    async def wait(self, timeout: Optional[float] = READY_TIMEOUT) -> bool:
+        """True dès que le bot est prêt, False si timeout s'écoule avant."""
+        if self.ready:
+            return True
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def breakdown(self) -> str:
+        phases = ", ".join(f"{name} {seconds:.3f} s" for name, seconds in self.phases.items())
+        milestones = ", ".join(f"{name} +{seconds:.2f} s" for name, seconds in self.milestones.items())
+        return "; ".join(part for part in (phases, milestones) if part)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"ready": self.ready,
+                "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+                "milestones": {name: round(seconds, 4) for name, seconds in self.milestones.items()}}
+
+
+profile = Startup()
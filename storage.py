@@ -0,0 +1,90 @@
+"""
+Stockage local SQLite (abonnements, préférences, scores).
+
+Une seule connexion, utilisée exclusivement depuis un thread dédié : les
+requêtes ne bloquent jamais la boucle d'événements et n'ont pas besoin de
+verrou. Chaque module déclare son schéma avec `db.add_schema`, appliqué à
+la première connexion.
+"""
+import os
+import asyncio
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence
+
+logger = logging.getLogger('HadithSahih.storage')
+
+DB_PATH = os.environ.get('HS_DB_PATH', 'hadithsahih.db')
+# Attente maximale d'un verrou tenu par une autre grappe de shards
+BUSY_TIMEOUT_MS = 5000
+
+# Petites valeurs clé -> texte (ex. empreinte des commandes slash publiées)
+SETTINGS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class Database:
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._schemas: List[str] = [SETTINGS_SCHEMA]
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hs-db")
+
+    def add_schema(self, sql: str):
+        """Déclare des tables (CREATE ... IF NOT EXISTS) ; à appeler à l'import."""
+        self._schemas.append(sql)
+        if self._conn is not None:
+            self._conn.executescript(sql)
+
+    def connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+            # WAL : les lectures des autres processus ne bloquent pas les écritures
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for sql in self._schemas:
+                conn.executescript(sql)
+            self._conn = conn
+            logger.info(f"Base SQLite ouverte : {self.path}")
+        return self._conn
+
+    # --- Appels synchrones (thread de la base uniquement) ---
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        conn = self.connection()
+        with conn:
+            return conn.execute(sql, params).rowcount
+
+    def executemany(self, sql: str, rows: Sequence[Sequence[Any]]) -> int:
+        conn = self.connection()
+        with conn:
+            return conn.executemany(sql, rows).rowcount
+
+    def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        return self.connection().execute(sql, params).fetchall()
+
+    def get_setting(self, key: str) -> Optional[str]:
+        rows = self.fetchall("SELECT value FROM settings WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    def set_setting(self, key: str, value: str):
+        self.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+
+    # --- Appels depuis la boucle d'événements ---
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """Exécute func(*args) dans le thread de la base."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+db = Database()
@@ -0,0 +1,289 @@
+"""
+Hadith quotidien : abonnements par salon et envoi à l'heure locale.
+
+`hs!subscribe FR 08:00 Europe/Paris` enregistre le salon dans SQLite. Le
+planificateur garde un tas (min-heap) des prochaines échéances et ne se
+réveille qu'à la plus proche. Les envois dus à la même minute partent par
+lots : concurrence bornée et débit global limité par un seau à jetons,
+pour ne pas déclencher de 429 quand des milliers de salons tombent ensemble.
+
+La date d'envoi est enregistrée avant l'envoi : après un redémarrage, un
+salon déjà servi aujourd'hui ne reçoit pas de second hadith. Un envoi
+manqué pendant un arrêt de moins de CATCH_UP secondes est rattrapé.
+Chaque lot part dans sa propre tâche : un salon lent ou limité (429) ne
+retarde pas les échéances suivantes, la concurrence et le débit restant
+partagés entre les lots.
+"""
+import os
+import time
+import heapq
+import asyncio
+import logging
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import metrics
+import storage
+from ratelimit import TokenBucket
+
+logger = logging.getLogger('HadithSahih.subscriptions')
+
+# --- Configuration ---
+
+DEFAULT_TZ = os.environ.get('HS_SUBSCRIBE_TZ', 'UTC')
+CONCURRENCY = int(os.environ.get('HS_SUBSCRIBE_CONCURRENCY', 8))
+# Envois par seconde, tous salons confondus (la limite globale de Discord est 50/s)
+SEND_RATE = float(os.environ.get('HS_SUBSCRIBE_RATE', 25))
+CATCH_UP = float(os.environ.get('HS_SUBSCRIBE_CATCH_UP', 3600))
+# Réveil périodique : absorbe les sauts d'horloge et les changements d'heure
+MAX_SLEEP = 60.0
+
+SUBSCRIPTIONS = metrics.gauge('hs_subscriptions', "Salons abonnés au hadith quotidien")
+DELIVERIES = metrics.counter('hs_daily_deliveries_total', "Envois du hadith quotidien", ("outcome",))
+DELIVERY_LAG = metrics.histogram('hs_daily_delivery_lag_seconds', "Retard de l'envoi sur l'heure prévue")
+
+storage.db.add_schema("""
+CREATE TABLE IF NOT EXISTS subscriptions (
+    channel_id INTEGER PRIMARY KEY,
+    guild_id INTEGER,
+    lang TEXT NOT NULL,
+    minute INTEGER NOT NULL,
+    tz TEXT NOT NULL,
+    last_sent TEXT
+);
+""")
+
+
+def parse_time(text: str) -> Optional[int]:
+    """"08:00" ou "8h30" -> minutes depuis minuit."""
+    hours, sep, minutes = text.strip().lower().replace("h", ":").partition(":")
+    if not hours.isdigit() or (minutes and not minutes.isdigit()):
+        return None
+    hours, minutes = int(hours), int(minutes or 0)
+    if hours > 23 or minutes > 59:
+        return None
+    return hours * 60 + minutes
+
+def parse_timezone(name: str) -> Optional[str]:
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+    return name
+
+
+class Subscription(NamedTuple):
+    channel_id: int
+    guild_id: Optional[int]
+    lang: str
+    minute: int  # minutes depuis minuit, heure locale
+    tz: str
+    last_sent: Optional[str] = None  # date locale ISO du dernier envoi
+
+    @property
+    def time_text(self) -> str:
+        return f"{self.minute // 60:02d}:{self.minute % 60:02d}"
+
+    def next_due(self, now: datetime) -> datetime:
+        """Prochaine échéance (heure locale) jamais envoyée.
+
+        Un abonnement déjà servi qui a manqué l'envoi du jour est rattrapé
+        pendant CATCH_UP secondes ; un nouvel abonnement commence à la
+        prochaine occurrence de son heure.
+        """
+        zone = ZoneInfo(self.tz)
+        local_now = now.astimezone(zone)
+        at = dt_time(self.minute // 60, self.minute % 60)
+        day = local_now.date()
+        catch_up = 0.0
+        if self.last_sent is not None:
+            day = max(day, date.fromisoformat(self.last_sent) + timedelta(days=1))
+            catch_up = CATCH_UP
+        due = datetime.combine(day, at, tzinfo=zone)
+        if (local_now - due).total_seconds() > catch_up:
+            due = datetime.combine(day + timedelta(days=1), at, tzinfo=zone)
+        return due
+
+
+class SubscriptionStore:
+    """Table subscriptions : un abonnement par salon et la date locale du dernier envoi."""
+
+    def __init__(self, db: storage.Database = storage.db):
+        self.db = db
+
+    def load_all(self) -> List[Subscription]:
+        rows = self.db.fetchall("SELECT channel_id, guild_id, lang, minute, tz, last_sent FROM subscriptions")
+        return [Subscription(*row) for row in rows]
+
+    def upsert(self, sub: Subscription):
+        # last_sent est conservé : changer l'heure ne provoque pas de second envoi le même jour
+        self.db.execute(
+            "INSERT INTO subscriptions (channel_id, guild_id, lang, minute, tz, last_sent) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(channel_id) DO UPDATE SET guild_id=excluded.guild_id, lang=excluded.lang, "
+            "minute=excluded.minute, tz=excluded.tz",
+            sub)
+
+    def delete(self, channel_id: int) -> bool:
+        return self.db.execute("DELETE FROM subscriptions WHERE channel_id = ?", (channel_id,)) > 0
+
+    def mark_sent(self, sent: List[Tuple[str, int]]):
+        """[(date locale, salon)] en une seule transaction."""
+        self.db.executemany("UPDATE subscriptions SET last_sent = ? WHERE channel_id = ?", sent)
+
+
+Deliver = Callable[[Subscription], Awaitable[bool]]
+
+
+class DailyScheduler:
+    """Tas des prochaines échéances, avec suppression paresseuse des entrées périmées.
+
+    deliver(sub) envoie le hadith et renvoie False si le salon n'existe plus
+    (l'abonnement est alors supprimé). owns(sub) filtre les abonnements gérés
+    par ce processus (grappes de shards).
+    """
+
+    def __init__(self, deliver: Deliver, store: Optional[SubscriptionStore] = None,
+                 owns: Callable[[Subscription], bool] = lambda sub: True,
+                 concurrency: int = CONCURRENCY, rate: float = SEND_RATE):
+        self.deliver = deliver
+        self.store = store or SubscriptionStore()
+        self.owns = owns
+        self.concurrency = concurrency
+        self.rate = rate
+        self._subs: Dict[int, Subscription] = {}
+        # Échéance valide par salon ; une entrée du tas qui ne correspond plus est ignorée
+        self._due: Dict[int, float] = {}
+        self._heap: List[Tuple[float, int]] = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._bucket: Optional[TokenBucket] = None
+        # Partagé par les lots en cours d'envoi
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._batches: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._subs)
+
+    def get(self, channel_id: int) -> Optional[Subscription]:
+        return self._subs.get(channel_id)
+
+    def schedule(self, sub: Subscription, now: Optional[datetime] = None) -> datetime:
+        due = sub.next_due(now or datetime.now(timezone.utc))
+        self._subs[sub.channel_id] = sub
+        self._due[sub.channel_id] = due.timestamp()
+        heapq.heappush(self._heap, (due.timestamp(), sub.channel_id))
+        SUBSCRIPTIONS.set(len(self._subs))
+        self._wakeup.set()
+        return due
+
+    def cancel(self, channel_id: int) -> bool:
+        self._due.pop(channel_id, None)
+        removed = self._subs.pop(channel_id, None) is not None
+        SUBSCRIPTIONS.set(len(self._subs))
+        return removed
+
+    async def subscribe(self, sub: Subscription) -> datetime:
+        """Enregistre (ou modifie) l'abonnement ; renvoie la prochaine échéance."""
+        previous = self._subs.get(sub.channel_id)
+        if previous is not None:
+            sub = sub._replace(last_sent=previous.last_sent)
+        await storage.db.run(self.store.upsert, sub)
+        return self.schedule(sub)
+
+    async def unsubscribe(self, channel_id: int) -> bool:
+        self.cancel(channel_id)
+        return await storage.db.run(self.store.delete, channel_id)
+
+    def pop_due(self, now: float) -> List[Tuple[Subscription, float]]:
+        """[(abonnement, échéance)] échus, dans l'ordre des échéances."""
+        batch = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            due, channel_id = heapq.heappop(heap)
+            if self._due.get(channel_id) == due:
+                del self._due[channel_id]
+                batch.append((self._subs[channel_id], due))
+        return batch
+
+    # --- Boucle ---
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="daily-scheduler")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in self._batches:
+            task.cancel()
+
+    async def _run(self):
+        subs = await storage.db.run(self.store.load_all)
+        for sub in subs:
+            if self.owns(sub):
+                self.schedule(sub)
+        logger.info(f"{len(self._subs)} abonnement(s) au hadith quotidien chargé(s).")
+        while True:
+            batch = self.pop_due(time.time())
+            if batch:
+                # La boucle repart aussitôt vers l'échéance suivante
+                task = asyncio.create_task(self._dispatch_logged(batch), name="daily-batch")
+                self._batches.add(task)
+                task.add_done_callback(self._batches.discard)
+                continue
+            timeout = min(MAX_SLEEP, self._heap[0][0] - time.time()) if self._heap else MAX_SLEEP
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, timeout))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch_logged(self, batch: List[Tuple[Subscription, float]]):
+        try:
+            await self.dispatch(batch)
+        except Exception as e:
+            logger.error(f"Erreur d'envoi du hadith quotidien : {e!r}", exc_info=e)
+
+    async def dispatch(self, batch: List[Tuple[Subscription, float]]):
+        now = datetime.now(timezone.utc)
+        sent = []
+        lags = []
+        for sub, due in batch:
+            lags.append(max(0.0, now.timestamp() - due))
+            local_day = datetime.fromtimestamp(due, ZoneInfo(sub.tz)).date()
+            sent.append(sub._replace(last_sent=local_day.isoformat()))
+        # Marqué avant l'envoi : au pire un envoi perdu, jamais un doublon
+        await storage.db.run(self.store.mark_sent, [(sub.last_sent, sub.channel_id) for sub in sent])
+        for sub in sent:
+            self.schedule(sub, now)
+
+        async def send(sub: Subscription, lag: float):
+            async with self._semaphore:
+                await self._pace()
+                try:
+                    delivered = await self.deliver(sub)
+                except Exception as e:
+                    DELIVERIES.inc(outcome="error")
+                    logger.warning(f"Hadith quotidien non envoyé dans {sub.channel_id} : {e!r}")
+                    return
+                if not delivered:
+                    DELIVERIES.inc(outcome="removed")
+                    logger.info(f"Salon {sub.channel_id} inaccessible : abonnement supprimé.")
+                    await self.unsubscribe(sub.channel_id)
+                    return
+                DELIVERIES.inc(outcome="sent")
+                DELIVERY_LAG.observe(lag)
+
+        await asyncio.gather(*(send(sub, lag) for sub, lag in zip(sent, lags)))
+
+    async def _pace(self):
+        """Réserve un jeton du débit global, puis attend son tour."""
+        now = time.monotonic()
+        if self._bucket is None:
+            self._bucket = TokenBucket(self.rate, 1.0, now)
+        delay = self._bucket.delay(now)
+        self._bucket.consume()
+        if delay:
+            await asyncio.sleep(delay)
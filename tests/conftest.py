@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Base en mémoire : les tests n'écrivent jamais hadithsahih.db
+os.environ.setdefault("HS_DB_PATH", ":memory:")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,68 @@
+import sys
+from array import array
+
+import corpus
+import corpusbin
+import references
+import search
+
+
+def test_compiled_corpus_matches_text_files(tmp_path):
+    store = corpus.CorpusStore(compiled_path=None)
+    path = str(tmp_path / "corpus.bin")
+    assert corpusbin.compile_corpus(store, path) > 0
+    compiled = corpusbin.CompiledCorpus(path)
+    for lang in store.languages:
+        text = corpus.load_language(lang, store.data_dir)
+        binary = compiled.language(lang)
+        assert list(binary.hadiths) == list(text.hadiths)
+        assert list(binary.books) == list(text.books)
+        assert list(binary.questions) == list(text.questions)
+        assert binary.questions[-1] == text.questions[-1]
+
+
+def test_compiled_indexes_match_built_ones(tmp_path):
+    store = corpus.CorpusStore(compiled_path=None)
+    path = str(tmp_path / "corpus.bin")
+    corpusbin.compile_corpus(store, path)
+    compiled = corpusbin.CompiledCorpus(path)
+    for lang in store.languages:
+        text = corpus.load_language(lang, store.data_dir)
+        binary = compiled.language(lang)
+        # Relus depuis le mmap, sans repasser sur les hadiths
+        refs = references.build_index(binary)
+        built_refs = references.build_index(text)
+        assert isinstance(refs.refs, references.LazyRefs) and isinstance(refs.by_token.sorted_keys, corpusbin.LazyRecords)
+        assert dict(refs.by_token) == dict(built_refs.by_token)
+        assert dict(refs.by_number) == dict(built_refs.by_number)
+        assert dict(refs.by_book) == dict(built_refs.by_book)
+        assert [refs.refs[i] for i in range(len(text.hadiths))] == list(built_refs.refs)
+        assert refs.body(0) == built_refs.body(0)
+        index = search.build_index(binary)
+        assert isinstance(index.terms, corpusbin.LazyRecords)
+        for query in ("prière", "prayer faith", "allah"):
+            assert index.search(query) == search.build_index(text).search(query)
+
+
+def test_index_tables_of_another_version_are_rebuilt():
+    hadiths = ("La prière est une lumière. ***[Sahih Muslim 223]***",)
+    tables = dict(search.SearchIndex(hadiths).tables(), **references.ReferenceIndex(hadiths).tables())
+    tables["search.version"] = tables["refs.version"] = [search.INDEX_VERSION + 1]
+    language = corpus.LanguageCorpus(hadiths, (), (), tables)
+    assert search.SearchIndex.from_tables(tables) is None
+    assert search.build_index(language).search("priere")[0][0] == 0
+    assert references.build_index(language).lookup("muslim", "223") == 0
+
+
+def test_offsets_are_read_little_endian_on_any_host():
+    expected = [0, 5, 300, 70000]
+    little = array('I', expected)
+    if sys.byteorder != "little":
+        little.byteswap()
+    data = memoryview(little.tobytes())
+    assert list(corpusbin.read_offsets(data, 0, len(data))) == expected
+    # Hôte gros-boutiste simulé : les mêmes octets lus dans l'autre ordre
+    swapped = array('I', expected)
+    swapped.byteswap()
+    other = "big" if sys.byteorder == "little" else "little"
+    assert list(corpusbin.read_offsets(memoryview(swapped.tobytes()), 0, len(data), byteorder=other)) == expected
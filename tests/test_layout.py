@@ -0,0 +1,55 @@
+from layout import (DESCRIPTION, ELLIPSIS, MESSAGE_TOTAL, embed_size, fit_total, pack_lines, paginate, split_text,
+                    truncate)
+
+SENTENCE = "Le Messager d'Allah (ﷺ) a dit : « La religion est facilité. » "
+
+
+def test_truncate_cuts_at_a_word():
+    assert truncate("court", 10) == "court"
+    cut = truncate("un deux trois quatre cinq", 12)
+    assert len(cut) <= 12 and cut.endswith(ELLIPSIS)
+    assert cut == "un deux" + ELLIPSIS
+    assert truncate("abcdef", 1) == "a"
+
+
+def test_split_text_respects_limit_and_keeps_text():
+    text = SENTENCE * 200
+    chunks = split_text(text, DESCRIPTION)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= DESCRIPTION for chunk in chunks)
+    # Coupé entre deux phrases, sans perdre de mots
+    assert all(chunk.endswith("»") for chunk in chunks[:-1])
+    assert " ".join(chunks).split() == text.split()
+    assert split_text("", DESCRIPTION) == [""]
+
+
+def test_split_text_without_spaces():
+    chunks = split_text("x" * 250, 100)
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+
+
+def test_paginate_by_size_and_count():
+    assert paginate([40, 40, 40, 40], 100) == [(0, 2), (2, 4)]
+    assert paginate([1] * 25, 1000, max_items=10) == [(0, 10), (10, 20), (20, 25)]
+    # Première page réduite par son en-tête
+    assert paginate([40, 40, 40], 100, first_budget=50) == [(0, 1), (1, 3)]
+    assert paginate([], 100) == []
+
+
+def test_pack_lines_splits_long_lines():
+    blocks = pack_lines(["a" * 30 + "\n", "b" * 30 + "\n", "mot " * 40 + "\n"], 64)
+    assert all(len(block) <= 64 for block in blocks)
+    assert "".join(blocks).replace(" ", "").replace("\n", "") == ("a" * 30 + "b" * 30 + "mot" * 40)
+
+
+def test_fit_total_shortens_longest_first():
+    texts = ["court", "x" * 3000, "y" * 5000]
+    fitted = fit_total(texts, MESSAGE_TOTAL)
+    assert sum(map(len, fitted)) <= MESSAGE_TOTAL
+    assert fitted[0] == "court"
+    assert len(fitted[1]) == len(fitted[2])
+    assert fit_total(["a", "b"], 10) == ["a", "b"]
+
+
+def test_embed_size_counts_every_text():
+    assert embed_size("titre", "description", [("nom", "valeur")], "pied") == 5 + 11 + 3 + 6 + 4
@@ -0,0 +1,113 @@
+import asyncio
+
+from aiohttp import web
+
+import storage
+from linkcheck import LinkChecker, LinkStatus, LinkStore
+
+PREFIX = "https://books.example/"
+
+
+def make_app(requests, missing):
+    async def ok(request):
+        requests.append((request.method, request.path, request.headers.get("If-None-Match")))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304, headers={"ETag": '"v1"'})
+        return web.Response(body=b"%" * 1234, headers={"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+    async def gone(request):
+        requests.append((request.method, request.path, None))
+        if missing:
+            return web.Response(status=404)
+        return web.Response(body=b"%" * 10)
+
+    async def head_refused(request):
+        requests.append((request.method, request.path, None))
+        return web.Response(status=405)
+
+    async def no_head(request):
+        requests.append((request.method, request.path, None))
+        return web.Response(body=b"%" * 99)
+
+    app = web.Application()
+    app.router.add_get("/ok.pdf", ok)
+    app.router.add_get("/gone.pdf", gone)
+    app.router.add_route("HEAD", "/nohead.pdf", head_refused)
+    app.router.add_get("/nohead.pdf", no_head, allow_head=False)
+    return app
+
+
+async def scenario():
+    # missing vide : /gone.pdf répond de nouveau 200
+    requests, missing = [], [True]
+    runner = web.AppRunner(make_app(requests, missing))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    changes = []
+    urls = [PREFIX + name for name in ("ok.pdf", "gone.pdf", "nohead.pdf")]
+    checker = LinkChecker(store=LinkStore(storage.db), urls=lambda: urls, interval=0,
+                          rewrite=(PREFIX, f"http://127.0.0.1:{port}/"), on_change=lambda: changes.append(1))
+    try:
+        first = await checker.check_all()
+        changes_after_first = len(changes)
+        second = await checker.check_all()
+        changes_after_second = len(changes)
+        missing.clear()
+        third = await checker.check_all()
+    finally:
+        await runner.cleanup()
+    stored = {s.url: s for s in await storage.db.run(checker.store.load_all) if s.url.startswith(PREFIX)}
+    return requests, first, second, third, stored, changes_after_first, changes_after_second, len(changes)
+
+
+def test_check_all_stores_statuses_and_reports_changes():
+    requests, first, second, third, stored, after_first, after_second, after_third = asyncio.run(scenario())
+    ok, gone, nohead = first
+    assert (ok.status, ok.size, ok.etag) == (200, 1234, '"v1"')
+    assert ok.last_modified == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert (gone.status, gone.ok) == (404, False)
+    # HEAD refusé : nouvel essai en GET
+    assert (nohead.status, nohead.size) == (200, 99)
+    assert ("HEAD", "/nohead.pdf", None) in requests and ("GET", "/nohead.pdf", None) in requests
+    assert after_first == 1
+
+    # Second passage : ETag renvoyé, 304, rien de changé à l'affichage
+    assert ("HEAD", "/ok.pdf", '"v1"') in requests
+    assert second[0].status == 200 and second[0].size == 1234
+    assert second[0].checked_at >= ok.checked_at
+    assert after_second == after_first
+
+    # Le lien cassé répond de nouveau : les pages doivent être refaites
+    assert third[1].ok
+    assert after_third == after_second + 1
+    assert set(stored) == {s.url for s in third}
+    assert all(isinstance(s, LinkStatus) for s in stored.values())
+    assert stored[PREFIX + "gone.pdf"].status == 200
+    assert stored[PREFIX + "ok.pdf"].etag == '"v1"'
+
+
+async def unreachable_scenario():
+    # Port libéré aussitôt : connexion refusée
+    runner = web.AppRunner(web.Application())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    await runner.cleanup()
+    known, unknown = PREFIX + "known.pdf", PREFIX + "unknown.pdf"
+    checker = LinkChecker(store=LinkStore(storage.db), urls=lambda: [known, unknown], interval=0,
+                          retries=1, retry_delay=0, rewrite=(PREFIX, f"http://127.0.0.1:{port}/"))
+    previous = LinkStatus(known, 200, 1234, "Mon, 01 Jan 2024 00:00:00 GMT", '"v1"', 1.0)
+    checker.statuses[known] = previous
+    results = await checker.check_all()
+    return previous, results, checker
+
+
+def test_network_error_keeps_previous_state():
+    previous, results, checker = asyncio.run(unreachable_scenario())
+    # Ni marqué cassé ni privé de son ETag ; un lien jamais joint reste sans état
+    assert results == [previous]
+    assert checker.get(previous.url) == previous and checker.get(previous.url).ok
+    assert checker.get(PREFIX + "unknown.pdf") is None
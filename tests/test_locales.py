@@ -0,0 +1,23 @@
+import string
+
+import corpus
+import locales
+
+
+def placeholders(text):
+    return {name for _, name, _, _ in string.Formatter().parse(text) if name}
+
+
+def test_fallback_table_covers_every_language():
+    fallback = locales.read_table(locales.locale_file(locales.FALLBACK))
+    for lang in corpus.LANGUAGES:
+        own = locales.read_table(locales.locale_file(lang))
+        assert own.keys() <= fallback.keys(), f"clés absentes de la table {locales.FALLBACK}"
+        # Mêmes champs {nom} qu'en anglais : sinon format() échoue au rendu
+        for key, text in own.items():
+            assert placeholders(text) == placeholders(fallback[key]), key
+
+
+def test_text_formats_values():
+    assert locales.text("FR", "search.usage", languages="FR|ENG") == "Usage : `hs!search [FR|ENG] <mots>`"
+    assert locales.text("XX", "error.internal") == locales.text(locales.DEFAULT, "error.internal")
@@ -0,0 +1,81 @@
+import asyncio
+import random
+
+import storage
+from corpus import QuizQuestion
+from quizengine import MAX_BOX, MISSED_WEIGHT, NEW_WEIGHT, FenwickTree, QuestionStat, QuizEngine, question_key
+from scores import ScoreStore
+
+QUESTIONS = [QuizQuestion(f"Question {i} ?", "oui", "non", "peut-être") for i in range(20)]
+
+
+def test_fenwick_prefix_sums_and_find():
+    tree = FenwickTree.uniform(10, 1.0)
+    assert tree.total() == 10.0
+    tree.add(3, 4.0)  # poids : 1 1 1 5 1 1 1 1 1 1
+    assert tree.total() == 14.0
+    assert tree.find(0.5) == 0
+    assert tree.find(2.9) == 2
+    assert tree.find(3.0) == 3
+    assert tree.find(7.9) == 3
+    assert tree.find(8.0) == 4
+    assert tree.find(13.9) == 9
+
+
+def test_fenwick_copy_is_independent():
+    base = FenwickTree.uniform(5, 1.0)
+    copy = base.copy()
+    copy.add(0, -1.0)
+    assert base.total() == 5.0
+    assert copy.total() == 4.0
+    assert copy.find(0.0) == 1
+
+
+def test_leitner_boxes_and_weights():
+    stat = QuestionStat(0, 0.0)
+    for expected in range(1, MAX_BOX + 2):
+        stat = stat.answered(True, 0.0)
+        assert stat.box == min(expected, MAX_BOX)
+    assert stat.answered(False, 0.0).box == 0
+    now = 10 ** 9
+    assert QuestionStat(0, 0.0).weight(now) == MISSED_WEIGHT
+    assert QuestionStat(2, 0.0).weight(now) == 0.25
+    # Vue récemment : beaucoup plus rare
+    assert QuestionStat(2, now).weight(now) < 0.25
+
+
+def test_select_returns_distinct_questions():
+    engine = QuizEngine(rng=random.Random(1))
+    for _ in range(20):
+        chosen = asyncio.run(engine.select(1, "fr", QUESTIONS, version=1, count=5))
+        assert len(chosen) == len(set(chosen)) == 5
+    # Toute la banque : chaque question exactement une fois
+    assert sorted(asyncio.run(engine.select(1, "fr", QUESTIONS, version=1, count=50))) == list(range(20))
+
+
+def test_select_favours_missed_questions():
+    engine = QuizEngine(rng=random.Random(2))
+    missed = question_key(QUESTIONS[7])
+    engine._histories[(1, "fr")] = {missed: QuestionStat(0, 0.0)}
+    draws = [asyncio.run(engine.select(1, "fr", QUESTIONS, version=1, count=1))[0] for _ in range(2000)]
+    share = draws.count(7) / len(draws)
+    expected = MISSED_WEIGHT / (MISSED_WEIGHT + NEW_WEIGHT * (len(QUESTIONS) - 1))
+    assert abs(share - expected) < 0.05
+
+
+def test_record_after_eviction_keeps_stored_box():
+    store = ScoreStore(storage.db)
+    key = question_key(QUESTIONS[0])
+    # Trois bonnes réponses enregistrées : boîte 3
+    for _ in range(3):
+        store.write_batch([], [(42, "fr", key, 1, 0.0)])
+    engine = QuizEngine(store=store, cache_size=1)
+    asyncio.run(engine.history(42, "fr"))
+    # Un autre joueur évince l'historique pendant le quiz
+    asyncio.run(engine.history(43, "fr"))
+    rows = engine.record(42, "fr", [QUESTIONS[0]], [True], now=1.0)
+    store.write_batch([], [(42, "fr", *row) for row in rows])
+    assert store.load_history(42, "fr") == [(key, 4, 1.0)]
+    # Une erreur renvoie en boîte 0
+    store.write_batch([], [(42, "fr", *row) for row in engine.record(42, "fr", [QUESTIONS[0]], [False], now=2.0)])
+    assert store.load_history(42, "fr") == [(key, 0, 2.0)]
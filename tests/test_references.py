@@ -0,0 +1,33 @@
+from references import ReferenceIndex, parse_reference, split_hadith
+
+HADITHS = [
+    "Les actes ne valent que par les intentions. ***[Sahih al-Bukhari 1 In-book reference : Book 1, Hadith 1]***",
+    "La religion est le bon conseil. ***[Sahih Muslim 55a In-book reference : Book 1, Hadith 105]***",
+    "La pudeur fait partie de la foi. ***[Al-Adab Al-Mufrad - Graded Sahih]***",
+]
+
+
+def test_parse_reference_fields():
+    text, ref = split_hadith(HADITHS[0])
+    assert text == "Les actes ne valent que par les intentions."
+    assert (ref.slug, ref.number, ref.book, ref.hadith) == ("bukhari", "1", 1, 1)
+    assert ref.display() == "Sahih al-Bukhari 1 • Book 1, Hadith 1"
+    assert parse_reference("Sahih Muslim 55a").key == ("muslim", "55a")
+
+
+def test_lookup_by_number_and_book():
+    index = ReferenceIndex(HADITHS)
+    assert index.lookup("Boukhari", "1") == 0
+    assert index.lookup("muslim", "55A") == 1
+    assert index.lookup("muslim", "1:105") == 1
+    assert index.lookup("muslim", "56") is None
+    assert index.body(1) == "La religion est le bon conseil."
+
+
+def test_tokens_survive_inserted_lines():
+    tokens = [split_hadith(line)[1].token for line in HADITHS]
+    assert tokens[:2] == ["bukhari.1", "muslim.55a"]
+    # Sans numéro : empreinte du texte de la référence
+    assert tokens[2].startswith("adabmufrad.~")
+    index = ReferenceIndex(["Nouveau hadith ***[Sahih Muslim 7]***"] + HADITHS)
+    assert [index.by_token[token] for token in tokens] == [1, 2, 3]
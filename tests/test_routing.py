@@ -0,0 +1,52 @@
+import pytest
+
+from routing import (CUSTOM_ID_MAX, PERMUTATIONS, b36, check_length, decode_indices, encode_indices,
+                     fingerprint, from_b36, max_quiz_length, quiz_id_length)
+
+
+def test_b36_round_trip():
+    for number in (0, 1, 35, 36, 1295, 2 ** 32 - 1, 1234567890123456789):
+        assert from_b36(b36(number)) == number
+    assert b36(35) == "z"
+    assert b36(36) == "10"
+    with pytest.raises(ValueError):
+        b36(-1)
+
+
+def test_indices_round_trip():
+    assert decode_indices(encode_indices([0, 17, 35, 400])) == [0, 17, 35, 400]
+    assert encode_indices([10, 36]) == "a.10"
+    assert decode_indices(encode_indices([])) == []
+
+
+def test_permutations_place_each_answer_once():
+    assert len(PERMUTATIONS) == 6
+    assert all(sorted(p) == [0, 1, 2] for p in PERMUTATIONS)
+    # Une seule position porte la bonne réponse (indice 0)
+    assert all(p.count(0) == 1 for p in PERMUTATIONS)
+
+
+def test_fingerprint_tracks_bank_changes():
+    bank = [("Question ?", "oui", "non", "peut-être")]
+    assert fingerprint(bank) == fingerprint(list(bank))
+    assert fingerprint(bank) != fingerprint([("Question ?", "non", "oui", "peut-être")])
+    assert len(fingerprint(bank)) <= 4
+
+
+def test_quiz_custom_id_fits_discord_limit():
+    # Pire cas de hs:q : identifiant Discord 64 bits, 10 questions d'une grande banque
+    custom_id = (f"hs:q:ENG:{b36(2 ** 64 - 1)}:{fingerprint([('q',)])}:"
+                 f"{encode_indices(range(99990, 100000))}:{b36(9)}:{b36(2 ** 10 - 1)}:5:2")
+    assert check_length(custom_id) == custom_id
+    with pytest.raises(ValueError):
+        check_length("x" * (CUSTOM_ID_MAX + 1))
+
+
+def test_max_quiz_length_fits_discord_limit():
+    longest = max_quiz_length(3)
+    # La longueur par défaut (HS_QUIZ_MAX_LENGTH=10) doit tenir
+    assert longest >= 10
+    assert quiz_id_length(longest, 3) <= CUSTOM_ID_MAX
+    assert quiz_id_length(longest + 1, 3) > CUSTOM_ID_MAX
+    # Des codes de langue plus longs laissent moins de place
+    assert max_quiz_length(8) <= longest
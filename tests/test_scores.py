@@ -0,0 +1,36 @@
+import asyncio
+
+from scores import DROPPED, ScoreBoard, ScoreStore
+
+
+class FailingStore(ScoreStore):
+    def __init__(self, during_write=lambda: None):
+        super().__init__()
+        self.during_write = during_write
+
+    def write_batch(self, results, history=()):
+        self.during_write()
+        raise OSError("disque plein")
+
+
+def test_failed_flush_keeps_newest_results():
+    store = FailingStore()
+    board = ScoreBoard(store=store, flush_batch=2, max_pending=3)
+    for user_id in range(3):
+        board.record(user_id, 1, "FR", 1, 1)
+    # Un quiz se termine pendant l'écriture du lot (0, 1), qui échoue
+    store.during_write = lambda: board.record(3, 1, "FR", 1, 1)
+    dropped = DROPPED.get()
+    asyncio.run(board.flush())
+    # Le plus ancien est abandonné et compté, le plus récent reste en file
+    assert [r.user_id for r in board.pending] == [1, 2, 3]
+    assert DROPPED.get() == dropped + 1
+
+
+def test_record_beyond_max_pending_drops_oldest():
+    board = ScoreBoard(store=FailingStore(), flush_batch=100, max_pending=2)
+    for user_id in range(4):
+        board.record(user_id, 0, "ENG", 0, 3)
+    assert [r.user_id for r in board.pending] == [2, 3]
+    # Classement en mémoire à jour malgré l'abandon
+    assert len(board.ranking(None)) == 4
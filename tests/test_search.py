@@ -0,0 +1,35 @@
+from search import SearchIndex, fold, tokenize
+
+DOCUMENTS = [
+    "La prière est la clé du Paradis.",
+    "Le jeûne est un bouclier ; la prière est une lumière, la prière en groupe vaut davantage.",
+    "L'aumône éteint les péchés comme l'eau éteint le feu.",
+    "Celui qui croit en Allah et au Jour dernier, qu'il dise du bien ou qu'il se taise.",
+]
+
+
+def test_fold_and_tokenize():
+    assert fold("Prière ÉTÉ") == "priere ete"
+    # Mots vides et lettres isolées écartés
+    assert tokenize("L'aumône et la prière") == ["aumone", "priere"]
+
+
+def test_bm25_ranks_term_frequency_first():
+    index = SearchIndex(DOCUMENTS)
+    results = index.search("prière")
+    assert [doc_id for doc_id, _ in results] == [1, 0]
+    assert results[0][1] > results[1][1] > 0
+
+
+def test_bm25_rare_terms_weigh_more():
+    index = SearchIndex(DOCUMENTS)
+    # « aumône » n'apparaît que dans un document, « prière » dans deux
+    (best, score), *_ = index.search("aumone priere")
+    assert best == 2
+    assert score > dict(index.search("priere"))[0]
+
+
+def test_search_without_match_or_documents():
+    assert SearchIndex(DOCUMENTS).search("zakat") == []
+    assert SearchIndex([]).search("prière") == []
+    assert len(SearchIndex(DOCUMENTS * 10).search("prière", limit=3)) == 3
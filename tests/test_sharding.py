@@ -0,0 +1,37 @@
+import json
+import time
+
+import sharding
+
+
+def write_state(directory, cluster_id, guilds, updated):
+    with open(directory / f"cluster_{cluster_id}.json", "w", encoding="utf-8") as f:
+        json.dump({"guilds": guilds, "updated": updated}, f)
+
+
+def test_cluster_shard_ids_cover_every_shard_once():
+    shards = [sharding.cluster_shard_ids(c, 3, 10) for c in range(3)]
+    assert shards == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+
+
+def test_guild_count_uses_peer_states_read_on_heartbeat(tmp_path, monkeypatch):
+    monkeypatch.setattr(sharding, "STATE_DIR", str(tmp_path))
+    monkeypatch.setattr(sharding, "CLUSTERS", 4)
+    monkeypatch.setattr(sharding, "CLUSTER_ID", 0)
+    monkeypatch.setattr(sharding, "_peer_guilds", 0)
+    now = time.time()
+    write_state(tmp_path, 0, 999, now)  # la grappe courante compte len(bot.guilds)
+    write_state(tmp_path, 1, 10, now)
+    write_state(tmp_path, 2, 20, now - 10 * sharding.STATE_TTL)  # grappe morte
+    (tmp_path / "cluster_3.json").write_text("{", encoding="utf-8")
+    assert sharding.read_peer_guilds() == 10
+    # Sans relecture, le nombre ne change pas : aucune lecture disque dans les commandes
+    assert sharding.total_guild_count(5) == 5
+    monkeypatch.setattr(sharding, "_peer_guilds", sharding.read_peer_guilds())
+    write_state(tmp_path, 3, 30, now)
+    assert sharding.total_guild_count(5) == 15
+
+
+def test_guild_count_without_clusters(monkeypatch):
+    monkeypatch.setattr(sharding, "CLUSTER_ID", None)
+    assert sharding.total_guild_count(7) == 7
@@ -0,0 +1,27 @@
+import asyncio
+import logging
+
+from startup import Startup
+
+
+def test_requirements_open_the_gate():
+    profile = Startup(requirements=("corpus",), milestones=("corpus", "gateway"))
+    assert not profile.ready
+    assert asyncio.run(profile.wait(0.01)) is False
+    profile.reach("corpus")
+    assert profile.ready
+    assert asyncio.run(profile.wait(0.01)) is True
+
+
+def test_breakdown_logged_once_every_milestone_is_reached(caplog):
+    profile = Startup(requirements=("corpus",), milestones=("corpus", "gateway"))
+    with profile.phase("corpus"):
+        pass
+    with caplog.at_level(logging.INFO, logger="HadithSahih.startup"):
+        profile.reach("corpus")
+        assert not caplog.records
+        profile.reach("gateway")
+        profile.reach("gateway")
+    assert len(caplog.records) == 1
+    message = caplog.records[0].getMessage()
+    assert "corpus +" in message and "gateway +" in message
@@ -0,0 +1,68 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime, timezone
+
+from subscriptions import CATCH_UP, DailyScheduler, Subscription, parse_time, parse_timezone
+
+SUB = Subscription(1, 10, "FR", 8 * 60, "Europe/Paris")
+# 29 mars 2026 : passage à l'heure d'été, 08:00 à Paris = 06:00 UTC
+AT_0859 = datetime(2026, 3, 29, 6, 59, tzinfo=timezone.utc)
+
+
+def test_parse_time_and_timezone():
+    assert parse_time("08:00") == 480
+    assert parse_time("8h30") == 510
+    assert parse_time("24:00") is None
+    assert parse_timezone("Europe/Paris") == "Europe/Paris"
+    assert parse_timezone("Nope/X") is None
+
+
+def test_new_subscription_starts_at_next_occurrence():
+    due = SUB.next_due(AT_0859)
+    assert due.astimezone(timezone.utc) == datetime(2026, 3, 30, 6, 0, tzinfo=timezone.utc)
+    # Avant l'heure : le jour même
+    assert SUB.next_due(datetime(2026, 3, 29, 5, 0, tzinfo=timezone.utc)).day == 29
+
+
+def test_existing_subscription_catches_up_missed_slot():
+    missed = SUB._replace(last_sent="2026-03-28")
+    assert missed.next_due(AT_0859).astimezone(timezone.utc) == datetime(2026, 3, 29, 6, 0, tzinfo=timezone.utc)
+    # Déjà servi aujourd'hui : demain
+    assert SUB._replace(last_sent="2026-03-29").next_due(AT_0859).day == 30
+    # Arrêt plus long que CATCH_UP : l'envoi du jour est abandonné
+    late = datetime.fromtimestamp(datetime(2026, 3, 29, 6, 0, tzinfo=timezone.utc).timestamp() + CATCH_UP + 60,
+                                  timezone.utc)
+    assert missed.next_due(late).day == 30
+
+
+def test_slow_channel_does_not_delay_later_slots():
+    delivered = {}
+    release = asyncio.Event()
+
+    async def deliver(sub):
+        if sub.channel_id == 1:
+            await release.wait()  # salon limité par Discord
+        delivered[sub.channel_id] = time.monotonic()
+        return True
+
+    async def scenario():
+        scheduler = DailyScheduler(deliver, rate=1000)
+        start = time.time()
+        for channel_id, delay in ((1, 0.0), (2, 0.3)):
+            scheduler._subs[channel_id] = SUB._replace(channel_id=channel_id)
+            scheduler._due[channel_id] = start + delay
+            heapq.heappush(scheduler._heap, (start + delay, channel_id))
+        started = time.monotonic()
+        scheduler.start()
+        try:
+            await asyncio.sleep(1.0)
+            assert 2 in delivered and 1 not in delivered
+            assert delivered[2] - started < 0.9
+            release.set()
+            await asyncio.sleep(0.1)
+            assert 1 in delivered
+        finally:
+            scheduler.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,74 @@
+"""
+Serveur HTTP de santé et de métriques, sur la boucle asyncio du bot.
+
+Remplace le serveur Flask lancé dans un Thread : aucun second thread, et les
+réponses reflètent l'état réel du gateway et du corpus.
+  - /         : maintien en vie (hébergeurs gratuits)
+  - /healthz  : gateway connecté et latence
+  - /readyz   : corpus chargé, durées du démarrage (voir startup.py)
+  - /metrics  : format texte Prometheus
+"""
+import os
+import math
+import logging
+from typing import TYPE_CHECKING, Optional
+
+import corpus
+import metrics
+import startup
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+logger = logging.getLogger('HadithSahih.web')
+
+HOST = os.environ.get('HOST', '0.0.0.0')
+PORT = int(os.environ.get('PORT', 8080))
+
+
+def build_app(bot) -> "web.Application":
+    # Import différé : aiohttp.web n'est chargé qu'au démarrage du serveur
+    from aiohttp import web
+
+    async def home(request: "web.Request") -> "web.Response":
+        return web.Response(text="Bot est en ligne !")
+
+    async def healthz(request: "web.Request") -> "web.Response":
+        latency = bot.latency
+        connected = bot.is_ready() and not bot.is_closed() and math.isfinite(latency)
+        body = {"connected": connected,
+                "latency_ms": round(latency * 1000) if math.isfinite(latency) else None}
+        return web.json_response(body, status=200 if connected else 503)
+
+    async def readyz(request: "web.Request") -> "web.Response":
+        loaded = corpus.store.loaded
+        body = {"corpus_loaded": loaded,
+                "corpus_version": corpus.store.snapshot.version if loaded else None,
+                "startup": startup.profile.summary()}
+        return web.json_response(body, status=200 if loaded and startup.profile.ready else 503)
+
+    async def metrics_endpoint(request: "web.Request") -> "web.Response":
+        return web.Response(body=metrics.render_prometheus().encode("utf-8"),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+    app = web.Application()
+    app.router.add_get('/', home)
+    app.router.add_get('/healthz', healthz)
+    app.router.add_get('/readyz', readyz)
+    app.router.add_get('/metrics', metrics_endpoint)
+    return app
+
+
+async def start(bot, host: str = HOST, port: int = PORT) -> Optional["web.AppRunner"]:
+    """Démarre le serveur sur la boucle courante ; renvoie le runner à nettoyer."""
+    from aiohttp import web
+    runner = web.AppRunner(build_app(bot), access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        logger.error(f"Serveur web impossible sur {host}:{port} : {e}")
+        await runner.cleanup()
+        return None
+    logger.info(f"Serveur web en écoute sur {host}:{port}")
+    return runner